@@ -1,15 +1,577 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-import requests
+import os
+import socket
+import sys
+
+# Dinlenen adres. PAUSETIME_PORT: ölçüm / test için farklı port.
+LISTEN_HOST = '127.0.0.1'
+LISTEN_PORT = int(os.environ.get('PAUSETIME_PORT', 5000))
+
+# Sidecar olarak çalışırken port, ağır importlardan ve disk I/O'sundan önce
+# dinlemeye başlar: UI'nin ilk fetchState() isteği "connection refused" almaz,
+# backlog'da bekler ve uygulama hazır olur olmaz cevaplanır.
+_listen_socket = None
+if __name__ == '__main__' and os.environ.get('PAUSETIME_WORKER_FD'):
+    # Çok süreçli modda işçi, sahip sürecin dinlediği socket'i devralır
+    _listen_socket = socket.socket(fileno=int(os.environ['PAUSETIME_WORKER_FD']))
+elif __name__ == '__main__' and '--dev' not in sys.argv:
+    _listen_socket = socket.create_server((LISTEN_HOST, LISTEN_PORT), backlog=128)
+
+# Sunucu motoru: varsayılan Flask + waitress; lite motor (--lite veya
+# PAUSETIME_ENGINE=lite) yalnızca standart kütüphane kullanan liteserver'dır.
+LITE_ENGINE = ((__name__ == '__main__' and '--lite' in sys.argv)
+               or os.environ.get('PAUSETIME_ENGINE') == 'lite')
+
+if LITE_ENGINE:
+    from liteserver import Blueprint, Response, jsonify, quote_etag, request
+else:
+    from flask import Blueprint, Response, jsonify, request
+    from werkzeug.http import quote_etag
+import atexit
+import io
 import json
 import logging
-import os
-from datetime import datetime, timedelta
-import pytz
-from cachetools import TTLCache
+import logging.handlers
+import mmap
+import queue
+import bisect
+import sqlite3
+import struct
+import threading
+import time
+import math
+import random
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from datetime import datetime, timedelta, timezone
+
+# requests, pytz, cachetools ve flask_cors ilk kullanıldıkları yerde import
+# edilir; açılışta yalnızca /state'in ihtiyaç duyduğu modüller yüklenir. Lite
+# motorda bunların yerine liteserver'daki standart kütüphane karşılıkları kullanılır.
+
+bp = Blueprint('pausetime', __name__)
+logger = logging.getLogger(__name__)
+
+_istanbul_tz = None
+
+
+def _tz():
+    """Europe/Istanbul saat dilimi (pytz ilk çağrıda yüklenir)."""
+    global _istanbul_tz
+    if _istanbul_tz is None:
+        if LITE_ENGINE:
+            from liteserver import IstanbulTZ
+            _istanbul_tz = IstanbulTZ()
+        else:
+            import pytz
+            _istanbul_tz = pytz.timezone('Europe/Istanbul')
+    return _istanbul_tz
+
+
+# Saat kaynağı: Europe/Istanbul'a göre tz-aware datetime döndüren fonksiyon.
+# None ise gerçek saat kullanılır; simülasyon ve testler set_clock() ile değiştirir.
+_clock = None
+
+
+def _now():
+    """State makinesinin "şimdi"si."""
+    if _clock is not None:
+        return _clock()
+    return datetime.now(_tz())
+
+
+def _now_ts():
+    """_now()'un epoch karşılığı; gerçek saatte datetime oluşturmaz."""
+    if _clock is not None:
+        return _clock().timestamp()
+    return time.time()
+
+
+def set_clock(clock):
+    """Saat kaynağını değiştirir (None: gerçek saat)."""
+    global _clock
+    _clock = clock
+
+
+# ============================================================
+# METRICS (Prometheus metin formatı)
+# ============================================================
+# Sayaçlar ve histogramlar düz dict'lerde tutulur; bir gözlem tek bir kilit
+# altında birkaç liste işlemidir (birkaç mikrosaniye). Metin formatına yalnızca
+# /metrics çağrıldığında çevrilir.
+
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# İsim → (tip, açıklama); /metrics çıktısı bu sırayla yazılır
+METRIC_DEFINITIONS = {
+    "pausetime_http_request_duration_seconds":
+        ("histogram", "HTTP request latency by route"),
+    "pausetime_http_requests_total":
+        ("counter", "HTTP requests by route and status"),
+    "pausetime_prayer_cache_requests_total":
+        ("counter", "prayer_times_cache lookups by result"),
+    "pausetime_prayer_cache_evictions_total":
+        ("counter", "Entries removed from prayer_times_cache by reason"),
+    "pausetime_prayer_fallback_total":
+        ("counter", "Prayer times served without Diyanet data by source"),
+    "pausetime_upstream_request_duration_seconds":
+        ("histogram", "Diyanet API request latency by outcome"),
+    "pausetime_upstream_requests_total":
+        ("counter", "Diyanet API requests by outcome"),
+    "pausetime_upstream_skipped_total":
+        ("counter", "Diyanet fetches skipped by reason (breaker, negative_cache)"),
+    "pausetime_upstream_breaker_open":
+        ("gauge", "1 while the Diyanet circuit breaker is open or half-open"),
+    "pausetime_provider_wins_total":
+        ("counter", "Prayer time fetches answered first by provider"),
+    "pausetime_provider_hedges_total":
+        ("counter", "Hedged requests started after the previous provider's p95 budget"),
+    "pausetime_provider_disagreements_total":
+        ("counter", "Provider answers differing from the winner beyond tolerance"),
+    "pausetime_save_duration_seconds":
+        ("histogram", "Disk write latency by target"),
+    "pausetime_schedules":
+        ("gauge", "Current number of schedules"),
+    "pausetime_log_dropped_total":
+        ("counter", "Log records dropped because the log queue was full"),
+    "pausetime_prayer_cache_entries":
+        ("gauge", "Current number of prayer_times_cache entries"),
+}
+
+# Yalnızca bu route'lar ölçülür (stream uzun ömürlü olduğu için hariç)
+METRICS_ROUTE_PREFIXES = ('/api/schedules',)
+METRICS_ROUTES = frozenset(('/state', '/settings'))
+
+_metrics_lock = threading.Lock()
+# (isim, etiketler) → değer
+_metric_counters = {}
+# (isim, etiketler) → [bucket sayıları (+Inf dahil, kümülatif değil)..., toplam süre]
+_metric_histograms = {}
+
+
+def _metric_inc(name, labels=(), value=1):
+    """Sayacı artırır. labels: ((anahtar, değer), ...) demeti."""
+    key = (name, labels)
+    with _metrics_lock:
+        _metric_counters[key] = _metric_counters.get(key, 0) + value
+
+
+def _metric_observe(name, labels, seconds):
+    """Histograma bir süre gözlemi ekler."""
+    idx = bisect.bisect_left(METRICS_LATENCY_BUCKETS, seconds)
+    key = (name, labels)
+    with _metrics_lock:
+        hist = _metric_histograms.get(key)
+        if hist is None:
+            hist = _metric_histograms[key] = [0] * (len(METRICS_LATENCY_BUCKETS) + 1) + [0.0]
+        hist[idx] += 1
+        hist[-1] += seconds
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels)
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _render_metrics(gauges):
+    """Tüm metrikleri Prometheus metin formatında döndürür.
+
+    gauges: {isim: değer} — anlık değerler, çağıran tarafından hesaplanır.
+    """
+    with _metrics_lock:
+        counters = dict(_metric_counters)
+        histograms = {key: list(hist) for key, hist in _metric_histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in METRIC_DEFINITIONS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        elif kind == "histogram":
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(METRICS_LATENCY_BUCKETS + ("+Inf",), hist[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        elif name in gauges:
+            lines.append(f"{name} {gauges[name]}")
+    return "\n".join(lines) + "\n"
+
+
+def _metric_route():
+    """Ölçülen bir route ise route şablonunu, değilse None döndürür."""
+    rule = request.url_rule
+    if rule is None:
+        return None
+    if rule.rule in METRICS_ROUTES or rule.rule.startswith(METRICS_ROUTE_PREFIXES):
+        return rule.rule
+    return None
+
+
+@bp.before_app_request
+def _metrics_request_start():
+    request.environ['pausetime.start'] = time.perf_counter()
+
+
+@bp.after_app_request
+def _metrics_request_end(response):
+    route = _metric_route()
+    if route is not None:
+        elapsed = time.perf_counter() - request.environ['pausetime.start']
+        _metric_observe("pausetime_http_request_duration_seconds",
+                        (("method", request.method), ("route", route)), elapsed)
+        _metric_inc("pausetime_http_requests_total",
+                    (("method", request.method), ("route", route),
+                     ("status", response.status_code)))
+    return response
+
+
+# ============================================================
+# PROFILING
+# ============================================================
+# İsteğe bağlı (ayar "profiling" veya PAUSETIME_PROFILE=1) istek profili:
+# - Açıkken her isteğin fazları (cache lookup, state hesabı, serileştirme,
+#   disk yazımı) ölçülür; eşiği aşan istekler diske yazılır. Fazlar iç içe
+#   olabilir; her faza yalnızca kendi süresi yazılır (alt fazlar düşülür).
+#   Diyanet çekimleri istek thread'inde yapılmadığı için faz değildir.
+# - İsteklerin profile_sample_rate kadarı ayrıca örnekleyen profiler ile
+#   izlenir: arka plan thread'i PROFILE_SAMPLE_INTERVAL_SECONDS'ta bir
+#   sys._current_frames() ile isteğin stack'ini okur (istek thread'ine kanca
+#   takılmaz). Sonuç flamegraph uyumlu "collapsed stack" sayımlarıdır.
+# Kayıtlar APP_DATA_DIR/profiles altında en fazla PROFILE_STORE_MAX_FILES dosya
+# olarak tutulur; en eskiler silinir. /debug/profiles'tan indirilebilir.
+
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILE_STACK_DEPTH = 64
+PROFILE_STORE_MAX_FILES = 50
+PROFILE_DEFAULT_SAMPLE_RATE = 0.05
+PROFILE_DEFAULT_SLOW_MS = 500
+# Profillenmeyen yollar (uzun ömürlü stream ve debug endpoint'leri)
+PROFILE_EXCLUDED_PREFIXES = ('/state/stream', '/debug/', '/metrics')
+
+_profile_local = threading.local()
+_profile_lock = threading.Lock()
+# Örneklenen isteklerin thread ident'i → collapsed stack sayaçları
+_profile_active = {}
+_profile_wakeup = threading.Event()
+_profile_sampler = None
+_profile_store_lock = threading.Lock()
+
+
+def _profile_env_number(name, minimum, maximum=None):
+    """Ortam değişkenindeki sayıyı okur; yoksa veya geçersizse None (ayar kullanılır)."""
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+    if number is None or not minimum <= number <= (math.inf if maximum is None else maximum):
+        logger.warning("Ignoring invalid %s=%r", name, value)
+        return None
+    return number
+
+
+# Ortam değişkenleri açılışta bir kez okunur; None ise ayarlardaki değer geçerlidir
+_PROFILE_ENV_ENABLED = os.environ.get('PAUSETIME_PROFILE')
+_PROFILE_ENV_SAMPLE_RATE = _profile_env_number('PAUSETIME_PROFILE_SAMPLE_RATE', 0, 1)
+_PROFILE_ENV_SLOW_MS = _profile_env_number('PAUSETIME_PROFILE_SLOW_MS', 0)
+
+
+def _profile_config():
+    """(açık mı, örnekleme oranı, yavaş istek eşiği ms). Ortam değişkenleri ayarları ezer."""
+    settings = _snapshot.settings
+    enabled = _PROFILE_ENV_ENABLED
+    enabled = settings.get("profiling", False) if enabled is None else enabled not in ('', '0')
+    rate = _PROFILE_ENV_SAMPLE_RATE
+    if rate is None:
+        rate = settings.get("profile_sample_rate", PROFILE_DEFAULT_SAMPLE_RATE)
+    slow_ms = _PROFILE_ENV_SLOW_MS
+    if slow_ms is None:
+        slow_ms = settings.get("profile_slow_ms", PROFILE_DEFAULT_SLOW_MS)
+    return enabled, rate, slow_ms
+
+
+class _profile_phase:
+    """İsteğin faz süresini biriktirir: `with _profile_phase("state"): ...`.
+
+    İç içe fazlarda dıştaki faza yalnızca kendi süresi yazılır; böylece fazlar
+    ve "other" toplamı istek süresine eşittir. Profil kapalıyken maliyeti iki
+    perf_counter çağrısı ve birkaç thread-local erişimidir.
+    """
+    __slots__ = ('name', 'started', 'outer')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        # Üst fazın o ana kadarki alt faz süresi saklanır, bu faz sıfırdan sayar
+        self.outer = getattr(_profile_local, 'nested', 0.0)
+        _profile_local.nested = 0.0
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        nested = _profile_local.nested
+        _profile_local.nested = self.outer + elapsed
+        phases = getattr(_profile_local, 'phases', None)
+        if phases is not None:
+            phases[self.name] = phases.get(self.name, 0.0) + elapsed - nested
+
+
+def _profile_add(name, seconds):
+    """Zaten ölçülmüş bir süreyi (ör. metrikler için) isteğin fazına ekler."""
+    phases = getattr(_profile_local, 'phases', None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+        # Açık bir fazın içindeyse o fazdan düşülür
+        _profile_local.nested = getattr(_profile_local, 'nested', 0.0) + seconds
+
+
+def _frame_stack(frame):
+    names = []
+    while frame is not None and len(names) < PROFILE_STACK_DEPTH:
+        code = frame.f_code
+        # Üst dizinle birlikte: flask/app.py ile bu app.py karışmasın
+        filename = code.co_filename
+        filename = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+        names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _profile_sampler_loop():
+    while True:
+        _profile_wakeup.wait()
+        time.sleep(PROFILE_SAMPLE_INTERVAL_SECONDS)
+        with _profile_lock:
+            if not _profile_active:
+                _profile_wakeup.clear()
+                continue
+            active = list(_profile_active.items())
+        frames = sys._current_frames()
+        for ident, samples in active:
+            frame = frames.get(ident)
+            if frame is not None:
+                stack = _frame_stack(frame)
+                samples[stack] = samples.get(stack, 0) + 1
+
+
+def _profile_start_sampling():
+    """Geçerli thread'i örneklemeye alır; sampler thread'i ilk kullanımda başlar."""
+    global _profile_sampler
+    samples = {}
+    with _profile_lock:
+        if _profile_sampler is None:
+            _profile_sampler = threading.Thread(target=_profile_sampler_loop,
+                                                name="profile-sampler", daemon=True)
+            _profile_sampler.start()
+        _profile_active[threading.get_ident()] = samples
+    _profile_wakeup.set()
+    return samples
+
+
+def _profile_stop_sampling():
+    with _profile_lock:
+        _profile_active.pop(threading.get_ident(), None)
+
+
+def _profiles_dir():
+    return os.path.join(APP_DATA_DIR, 'profiles')
+
+
+def _profile_write(record):
+    """Kaydı diske yazar ve store'u PROFILE_STORE_MAX_FILES dosyaya indirger."""
+    directory = _profiles_dir()
+    try:
+        with _profile_store_lock:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, record["id"] + '.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+            for name in names[:-PROFILE_STORE_MAX_FILES]:
+                os.remove(os.path.join(directory, name))
+    except OSError as e:
+        logger.error("Failed to write profile: %s", e)
+
+
+@bp.before_app_request
+def _profile_request_start():
+    enabled, rate, _slow_ms = _profile_config()
+    if not enabled or request.path.startswith(PROFILE_EXCLUDED_PREFIXES):
+        return
+    _profile_local.phases = {}
+    _profile_local.nested = 0.0
+    _profile_local.samples = _profile_start_sampling() if random.random() < rate else None
+
+
+@bp.after_app_request
+def _profile_request_end(response):
+    phases = getattr(_profile_local, 'phases', None)
+    if phases is None:
+        return response
+    samples = _profile_local.samples
+    _profile_local.phases = _profile_local.samples = None
+    if samples is not None:
+        _profile_stop_sampling()
+
+    elapsed = time.perf_counter() - request.environ['pausetime.start']
+    _enabled, _rate, slow_ms = _profile_config()
+    if elapsed * 1000 < slow_ms and not samples:
+        return response
+
+    now = time.time()
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    phases_ms = {name: round(seconds * 1000, 3) for name, seconds in phases.items()}
+    phases_ms["other"] = round(max(elapsed - sum(phases.values()), 0.0) * 1000, 3)
+    record = {
+        # Dosya adı sırası = zaman sırası
+        "id": f"{int(now * 1000):014d}-{threading.get_ident() % 100000:05d}",
+        "time": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+        "method": request.method,
+        "route": route,
+        "path": request.full_path.rstrip('?'),
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 3),
+        "slow": elapsed * 1000 >= slow_ms,
+        "phases_ms": phases_ms,
+        "sample_interval_ms": PROFILE_SAMPLE_INTERVAL_SECONDS * 1000,
+        "samples": samples or {},
+    }
+    # Yazım isteği bekletmez
+    threading.Thread(target=_profile_write, args=(record,), name="profile-write", daemon=True).start()
+    return response
+
+
+@bp.teardown_app_request
+def _profile_request_teardown(_exc):
+    """View hata fırlatırsa after_app_request çalışmaz; örnekleme burada durdurulur."""
+    if getattr(_profile_local, 'phases', None) is None:
+        return
+    if _profile_local.samples is not None:
+        _profile_stop_sampling()
+    _profile_local.phases = _profile_local.samples = None
+
+
+# ============================================================
+# LOGGING
+# ============================================================
+# İstek thread'leri kaydı yalnızca kuyruğa bırakır; biçimlendirme, dosyaya
+# yazma (boyut bazlı rotasyon) ve ring buffer arka plandaki QueueListener
+# thread'inde yapılır. Aynı uyarı/hata bir pencere içinde LOG_REPEAT_LIMIT'ten
+# fazla tekrarlanırsa kalanı bastırılır ve sonraki pencerede özetlenir.
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
+# Kuyruk doluysa (yazıcı yetişemiyorsa) kayıt düşürülür, istek beklemez
+LOG_QUEUE_SIZE = 10000
+LOG_RING_SIZE = 500
+LOG_REPEAT_WINDOW_SECONDS = 60
+LOG_REPEAT_LIMIT = 5
+# Bastırma tablosu bu kadar farklı mesajı aşarsa sıfırlanır
+LOG_REPEAT_MAX_KEYS = 1000
+
+# Son kayıtlar (/debug/logs): {"time", "level", "logger", "message"}
+_log_ring = deque(maxlen=LOG_RING_SIZE)
+_log_listener = None
+_log_repeat_lock = threading.Lock()
+# (logger, seviye, mesaj şablonu) → [pencere başlangıcı, pencerede görülen sayı]
+_log_repeats = {}
+
+
+def _log_repeat_filter(record):
+    """Tekrarlayan uyarı ve hataları pencere başına LOG_REPEAT_LIMIT ile sınırlar."""
+    if record.levelno < logging.WARNING:
+        return True
+    key = (record.name, record.levelno, str(record.msg))
+    now = time.monotonic()
+    with _log_repeat_lock:
+        entry = _log_repeats.get(key)
+        if entry is not None and now - entry[0] < LOG_REPEAT_WINDOW_SECONDS:
+            entry[1] += 1
+            return entry[1] <= LOG_REPEAT_LIMIT
+        if len(_log_repeats) >= LOG_REPEAT_MAX_KEYS:
+            _log_repeats.clear()
+        _log_repeats[key] = [now, 1]
+    if entry is not None and entry[1] > LOG_REPEAT_LIMIT:
+        record.msg = f"{record.msg} [{entry[1] - LOG_REPEAT_LIMIT} repeats suppressed]"
+    return True
+
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """Kaydı biçimlendirmeden kuyruğa bırakır; kuyruk doluysa düşürür."""
+
+    def prepare(self, record):
+        # Aynı süreç içinde kalan kuyruk: biçimlendirme listener thread'inde yapılır
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _metric_inc("pausetime_log_dropped_total")
+
+
+class _LogRingHandler(logging.Handler):
+    """Son kayıtları /debug/logs için bellekte tutar."""
+
+    def emit(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + logging.Formatter().formatException(record.exc_info)
+        _log_ring.append({
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+        })
+
 
-app = Flask(__name__)
-CORS(app)
+def _configure_logging():
+    """Kök logger'a kuyruk handler'ını bağlar ve yazıcı thread'i başlatır."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    formatter = logging.Formatter(LOG_FORMAT)
+    # İşçi süreçler aynı dosyayı döndürmeye çalışmasın diye ayrı dosyaya yazar
+    log_name = 'app.log' if WORKER_INDEX is None else f'app-worker{WORKER_INDEX}.log'
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(APP_DATA_DIR, log_name), maxBytes=LOG_FILE_MAX_BYTES,
+        backupCount=LOG_FILE_BACKUP_COUNT, encoding='utf-8'
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = _LogQueueHandler(log_queue)
+    queue_handler.addFilter(_log_repeat_filter)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, _LogRingHandler()
+    )
+    _log_listener.start()
+    # Çıkışta kuyrukta kalan kayıtlar diske yazılsın
+    atexit.register(_log_listener.stop)
 
 
 # ============================================================
@@ -17,15 +579,20 @@ CORS(app)
 # ============================================================
 
 APP_DATA_DIR = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'PauseTime')
-os.makedirs(APP_DATA_DIR, exist_ok=True)
 SETTINGS_FILE = os.path.join(APP_DATA_DIR, 'settings.json')
 SCHEDULES_FILE = os.path.join(APP_DATA_DIR, 'schedules.json')
 
 DEFAULT_SETTINGS = {
     "city": "ISTANBUL",
+    # İl merkezi dışındaki bir ilçe seçildiyse Diyanet ilçe id'si
+    "district": None,
     "launch_on_startup": False,
     "start_minimized_to_tray": False,
-    "close_to_tray": True
+    "close_to_tray": True,
+    # İstek profili (bkz. PROFILING); PAUSETIME_PROFILE* ortam değişkenleri ezer
+    "profiling": False,
+    "profile_sample_rate": PROFILE_DEFAULT_SAMPLE_RATE,
+    "profile_slow_ms": PROFILE_DEFAULT_SLOW_MS
 }
 
 # Diyanet İşleri Başkanlığı - Şehir → İlçe ID eşleştirmesi (il merkezleri)
@@ -74,86 +641,1094 @@ def _load_settings():
     return dict(DEFAULT_SETTINGS)
 
 
+# Ayar yazımları _write_lock dışında yapılır; bu kilit yalnızca yazımları
+# sıralar ki eşzamanlı iki güncellemede diske son yayınlanan ayarlar kalsın
+_settings_save_lock = threading.Lock()
+
+
 def _save_settings(settings):
     """Ayarları diske yaz."""
+    started = time.perf_counter()
     try:
         with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
             json.dump(settings, f, indent=2, ensure_ascii=False)
-        logger.info(f"Settings saved to {SETTINGS_FILE}")
+        logger.info("Settings saved to %s", SETTINGS_FILE)
     except Exception as e:
-        logger.error(f"Failed to save settings: {e}")
+        logger.error("Failed to save settings: %s", e)
+    elapsed = time.perf_counter() - started
+    _metric_observe("pausetime_save_duration_seconds", (("target", "settings"),), elapsed)
+    _profile_add("disk_write", elapsed)
+
+
+# Çok konumlu kullanımda yüzlerce ilçe × 2 gün sığsın
+PRAYER_CACHE_SIZE = 2048
+
+
+def _create_prayer_cache():
+    """Kapasite ve temizleme nedeniyle atılan kayıtları sayan TTLCache oluşturur."""
+    if LITE_ENGINE:
+        from liteserver import TTLCache
+    else:
+        from cachetools import TTLCache
+
+    class _MetricsTTLCache(TTLCache):
+        def popitem(self):
+            item = super().popitem()
+            _metric_inc("pausetime_prayer_cache_evictions_total", (("reason", "capacity"),))
+            return item
+
+        def clear(self):
+            count = 0
+            try:
+                while True:
+                    TTLCache.popitem(self)
+                    count += 1
+            except KeyError:
+                pass
+            if count:
+                _metric_inc("pausetime_prayer_cache_evictions_total", (("reason", "clear"),), count)
+
+    return _MetricsTTLCache(maxsize=PRAYER_CACHE_SIZE, ttl=3600)
+
+
+# create_app() tarafından oluşturulur
+prayer_times_cache = None
+# Store'a yeni vakit verisi girdikçe / şehir değiştikçe artar
+_prayer_revision = 0
+# İlçe id → o ilçenin verisinin son değiştiği _prayer_revision (timeline bunu izler)
+_district_revisions = {}
 
 
-# Uygulama başlangıcında yükle
-_settings = _load_settings()
+def _bump_prayer_revision(district_id=None):
+    """Vakit verisi değiştiğinde revizyonu artırır."""
+    global _prayer_revision
+    _prayer_revision += 1
+    if district_id is not None:
+        _district_revisions[district_id] = _prayer_revision
+    _shared_changed()
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(APP_DATA_DIR, 'app.log')),
-        logging.StreamHandler()
+# ============================================================
+# PRAYER TIMES STORE (SQLite)
+# ============================================================
+# Diyanet'ten çekilen vakitler ilçe + tarih bazında diskte tutulur; yeniden
+# başlatmada ve ağ yokken buradan okunur. Geçmiş günler periyodik olarak silinir.
+
+PRAYER_DB_FILE = os.path.join(APP_DATA_DIR, 'prayer_times.db')
+# Bugünden bu kadar gün öncesine kadar olan kayıtlar tutulur
+PRAYER_STORE_RETENTION_DAYS = 7
+# Store'da bugünden itibaren bu kadar gün yoksa arka planda aylık çekim yapılır
+PRAYER_PREFETCH_MIN_DAYS = 7
+
+_store_lock = threading.Lock()
+_store_conn = None
+
+
+def _store_db():
+    """SQLite bağlantısını (tek, thread'ler arası paylaşılan) döndürür."""
+    global _store_conn
+    if _store_conn is None:
+        conn = sqlite3.connect(PRAYER_DB_FILE, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prayer_times ("
+            " district_id TEXT NOT NULL, date TEXT NOT NULL,"
+            " fajr TEXT NOT NULL, dhuhr TEXT NOT NULL, asr TEXT NOT NULL,"
+            " maghrib TEXT NOT NULL, isha TEXT NOT NULL,"
+            " fetched_at INTEGER NOT NULL,"
+            " PRIMARY KEY (district_id, date)) WITHOUT ROWID"
+        )
+        conn.commit()
+        _store_conn = conn
+    return _store_conn
+
+
+def _store_get(district_id, date_str):
+    """Store'dan tek günün vakitlerini okur: (times, fetched_at). Yoksa None."""
+    try:
+        with _store_lock:
+            row = _store_db().execute(
+                "SELECT fajr, dhuhr, asr, maghrib, isha, fetched_at FROM prayer_times"
+                " WHERE district_id = ? AND date = ?", (district_id, date_str)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.error("Prayer store read error: %s", e)
+        return None
+    if row is None:
+        return None
+    return dict(zip(VAKIT_ORDER, row[:5])), row[5]
+
+
+def _store_put_many(district_id, rows):
+    """[(date_str, times), ...] kayıtlarını store'a yazar (varsa üzerine)."""
+    if not rows:
+        return
+    now_ts = int(time.time())
+    values = [
+        (district_id, date_str, *(times[key] for key in VAKIT_ORDER), now_ts)
+        for date_str, times in rows
     ]
-)
-logger = logging.getLogger(__name__)
-logger.info(f"Settings file: {SETTINGS_FILE}")
+    try:
+        with _store_lock:
+            conn = _store_db()
+            conn.executemany(
+                "INSERT OR REPLACE INTO prayer_times VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error("Prayer store write error: %s", e)
+
+
+def _store_days_ahead(district_id, date_str):
+    """Store'da date_str'den itibaren kesintisiz kaç gün olduğunu sayar."""
+    try:
+        with _store_lock:
+            dates = [r[0] for r in _store_db().execute(
+                "SELECT date FROM prayer_times WHERE district_id = ? AND date >= ?"
+                " ORDER BY date LIMIT ?", (district_id, date_str, PRAYER_PREFETCH_MIN_DAYS)
+            )]
+    except sqlite3.Error as e:
+        logger.error("Prayer store read error: %s", e)
+        return 0
+    day = datetime.strptime(date_str, '%Y-%m-%d')
+    count = 0
+    for d in dates:
+        if d != (day + timedelta(days=count)).strftime('%Y-%m-%d'):
+            break
+        count += 1
+    return count
 
-prayer_times_cache = TTLCache(maxsize=100, ttl=3600)
+
+def _store_evict(before_date_str):
+    """before_date_str'den eski kayıtları siler."""
+    try:
+        with _store_lock:
+            conn = _store_db()
+            deleted = conn.execute(
+                "DELETE FROM prayer_times WHERE date < ?", (before_date_str,)
+            ).rowcount
+            conn.commit()
+        if deleted:
+            logger.info("Prayer store: evicted %s old rows", deleted)
+    except sqlite3.Error as e:
+        logger.error("Prayer store evict error: %s", e)
+
+
+def _evict_old_prayer_times():
+    """Saklama süresini aşmış günleri store'dan siler."""
+    tz = _tz()
+    now = datetime.now(tz)
+    _store_evict((now - timedelta(days=PRAYER_STORE_RETENTION_DAYS)).strftime('%Y-%m-%d'))
+
+
+def _start_prayer_prefetch(district_id=None):
+    """İlçe için store'u en az PRAYER_PREFETCH_MIN_DAYS gün ileriye doldurur.
+
+    Yalnızca yerel store'a bakar; eksik varsa çekim arka planda yapılır.
+    district_id verilmezse ayarlardaki şehir kullanılır.
+    """
+    try:
+        tz = _tz()
+        now = datetime.now(tz)
+        if district_id is None:
+            district_id = _default_district_id()
+        ahead = _store_days_ahead(district_id, now.strftime('%Y-%m-%d'))
+        if ahead < PRAYER_PREFETCH_MIN_DAYS:
+            _fetch_prayer_times_async(district_id, now + timedelta(days=ahead))
+    except Exception as e:
+        logger.error("Prayer prefetch failed: %s", e)
 
 
 # ============================================================
 # PRAYER TIMES
 # ============================================================
 
-DIYANET_API_BASE = "https://ezanvakti.imsakiyem.com/api"
+# PAUSETIME_DIYANET_API: benchmark / test için yerel stub sunucusuna yönlendirme
+DIYANET_API_BASE = os.environ.get('PAUSETIME_DIYANET_API', "https://ezanvakti.imsakiyem.com/api")
 
 
-def get_prayer_times(city=None, date=None):
-    """Diyanet İşleri Başkanlığı verilerinden vakit bilgilerini al."""
-    if city is None:
-        city = _settings.get("city", "ISTANBUL")
+def _parse_api_times(times):
+    """API'nin vakit objesini iç formata çevirir."""
+    return {
+        "Fajr": times["imsak"],
+        "Dhuhr": times["ogle"],
+        "Asr": times["ikindi"],
+        "Maghrib": times["aksam"],
+        "Isha": times["yatsi"]
+    }
 
-    district_id = DIYANET_DISTRICT_IDS.get(city.upper(), "9541")
 
-    tz = pytz.timezone('Europe/Istanbul')
-    if date is None:
-        date = datetime.now(tz)
+# Upstream istekleri tek, havuzlu bir session üzerinden gider. Aynı ilçe ve
+# başlangıç günü için eşzamanlı eksikler tek bir arka plan çekimine birleştirilir
+# (single-flight); istek thread'leri ağı hiç beklemez — veri gelene kadar offline
+# hesap döner.
+
+# Store'daki kayıt bu kadar eskiyse sunulmaya devam eder ama arka planda yenilenir
+PRAYER_STALE_SECONDS = 24 * 3600
+# Gece yarısından bu kadar önce yarının verisi hazırlanır
+PRAYER_PREMIDNIGHT_REFRESH_SECONDS = 15 * 60
+HTTP_POOL_SIZE = 4
+
+_http_session = None
+_inflight_lock = threading.Lock()
+# Çekimi süren (ilçe id, başlangıç günü) çiftleri
+_inflight_fetches = set()
+
+
+def _requests():
+    """requests modülü; lite motorda aynı arayüzü sunan liteserver."""
+    if LITE_ENGINE:
+        import liteserver
+        return liteserver
+    import requests
+    return requests
+
+
+def _http():
+    """Diyanet istekleri için paylaşılan, bağlantı havuzlu requests session."""
+    global _http_session
+    if _http_session is None:
+        if LITE_ENGINE:
+            # urllib her istekte yeni bağlantı açar; havuz yok
+            import liteserver
+            _http_session = liteserver.Session()
+            _http_session.headers['Accept'] = 'application/json'
+            return _http_session
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE,
+                                                pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Accept'] = 'application/json'
+        _http_session = session
+    return _http_session
+
+
+def _record_upstream(outcome, started):
+    labels = (("outcome", outcome),)
+    elapsed = time.perf_counter() - started
+    _metric_observe("pausetime_upstream_request_duration_seconds", labels, elapsed)
+    _metric_inc("pausetime_upstream_requests_total", labels)
 
-    date_str = date.strftime('%Y-%m-%d')
-    cache_key = f"diyanet_{district_id}_{date_str}"
-    if cache_key in prayer_times_cache:
-        return prayer_times_cache[cache_key]
 
-    url = f"{DIYANET_API_BASE}/prayer-times/{district_id}/daily"
-    params = {"startDate": date_str}
+# ============================================================
+# UPSTREAM CIRCUIT BREAKER
+# ============================================================
+# Diyanet erişilemezken her poll yeni bir çekim başlatmasın diye:
+# - Art arda UPSTREAM_BREAKER_THRESHOLD hatada devre açılır. Açıkken hiç istek
+#   gitmez; bekleme süresi her başarısız denemede ikiye katlanır (üst sınırlı,
+#   jitter'lı). Süre dolunca tek bir deneme isteğine izin verilir (half-open);
+#   başarılıysa devre kapanır, değilse daha uzun süre için yeniden açılır.
+# - Başarısız (ilçe, tarih) çekimleri kısa süre negatif cache'te tutulur; devre
+#   kapalıyken de aynı eksik gün için art arda istek atılmaz.
+# Bu sürede vakitler offline hesaplanır; durum /api/upstream'den okunabilir.
+
+UPSTREAM_BREAKER_THRESHOLD = 3
+UPSTREAM_BACKOFF_BASE_SECONDS = 10
+UPSTREAM_BACKOFF_MAX_SECONDS = 15 * 60
+UPSTREAM_NEGATIVE_CACHE_SECONDS = 60
+UPSTREAM_NEGATIVE_CACHE_MAX_ENTRIES = 1024
+# Half-open deneme çekimi bu sürede sonuçlanmazsa (thread takıldıysa) yeni
+# denemeye izin verilir; devre sonsuza kadar half-open kalmaz
+UPSTREAM_PROBE_TIMEOUT_SECONDS = 60
+
+_breaker_lock = threading.Lock()
+_breaker = {
+    "state": "closed",         # closed | open | half_open
+    "failures": 0,             # art arda hata sayısı
+    "open_until": 0.0,         # açıkken bir sonraki denemeye, half-open'da yeni denemeye izin verilen epoch
+    "last_error": None,
+    "last_failure_at": None,
+    "last_success_at": None,
+}
+# (district_id, date_str) → geçerlilik sonu (epoch)
+_negative_cache = {}
+
+
+def _breaker_allow():
+    """Upstream'e istek atılabilir mi? Half-open'da yalnızca tek denemeye izin verir."""
+    with _breaker_lock:
+        state = _breaker["state"]
+        if state == "closed":
+            return True
+        now = time.time()
+        if state == "half_open" and now >= _breaker["open_until"]:
+            logger.warning("Upstream probe did not report back in %ss, probing again",
+                           UPSTREAM_PROBE_TIMEOUT_SECONDS)
+        elif state == "open" and now >= _breaker["open_until"]:
+            logger.info("Upstream circuit half-open, probing")
+        else:
+            return False
+        _breaker.update(state="half_open", open_until=now + UPSTREAM_PROBE_TIMEOUT_SECONDS)
+        return True
+
+
+def _breaker_success():
+    with _breaker_lock:
+        if _breaker["state"] != "closed":
+            logger.info("Upstream circuit closed")
+        _breaker.update(state="closed", failures=0, last_success_at=time.time())
+    _shared_changed()
+
+
+def _breaker_failure(error):
+    with _breaker_lock:
+        _breaker["failures"] += 1
+        _breaker["last_error"] = str(error)
+        _breaker["last_failure_at"] = now = time.time()
+        failures = _breaker["failures"]
+        if _breaker["state"] == "half_open" or failures >= UPSTREAM_BREAKER_THRESHOLD:
+            # Eşik aşıldıktan sonraki her hata bekleme süresini ikiye katlar
+            exponent = max(failures - UPSTREAM_BREAKER_THRESHOLD, 0)
+            delay = min(UPSTREAM_BACKOFF_BASE_SECONDS * 2 ** exponent, UPSTREAM_BACKOFF_MAX_SECONDS)
+            # Yarı sabit, yarı rastgele bekleme
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            if _breaker["state"] != "open":
+                logger.warning("Upstream circuit open after %s failures, retry in %.0fs",
+                               failures, delay)
+            _breaker.update(state="open", open_until=now + delay)
+    _shared_changed()
+
+
+def _breaker_status():
+    """Devre durumunun API'de gösterilecek kopyası."""
+    with _breaker_lock:
+        status = dict(_breaker)
+    status["open_until"] = status["open_until"] if status["state"] == "open" else None
+    status["offline"] = status["state"] != "closed"
+    return status
+
+
+def _negative_cached(district_id, date_str):
+    expires = _negative_cache.get((district_id, date_str))
+    return expires is not None and time.time() < expires
+
+
+def _negative_cache_put(district_id, date_str):
+    now = time.time()
+    if len(_negative_cache) >= UPSTREAM_NEGATIVE_CACHE_MAX_ENTRIES:
+        for key, expires in list(_negative_cache.items()):
+            if expires <= now:
+                _negative_cache.pop(key, None)
+        if len(_negative_cache) >= UPSTREAM_NEGATIVE_CACHE_MAX_ENTRIES:
+            _negative_cache.clear()
+    _negative_cache[(district_id, date_str)] = now + UPSTREAM_NEGATIVE_CACHE_SECONDS
+
+
+def _negative_cache_clear(district_id):
+    for key in [key for key in list(_negative_cache) if key[0] == district_id]:
+        _negative_cache.pop(key, None)
+
+
+# ============================================================
+# PRAYER PROVIDERS
+# ============================================================
+# Vakitler sıralı bir sağlayıcı zincirinden çekilir (PAUSETIME_PRAYER_PROVIDERS,
+# virgülle ayrılmış):
+#   imsakiyem[=<api kökü>]  ezanvakti.imsakiyem.com biçimli HTTP API
+#   file=<yol>              {ilçe_id: [{"date": ..., "times": {...}}, ...]} JSON dosyası
+#   computed                yerel astronomik hesap; yalnızca karşılaştırma içindir
+# İstekler hedge'lenir: sıradaki sağlayıcı, öncekinin gözlenen p95 gecikmesi
+# dolduğu halde cevap gelmediyse (veya hata / boş cevap geldiyse) başlatılır ve
+# ilk geçerli cevap kazanır. Geç gelen cevaplar ve hesaplanan vakitler
+# kazananla karşılaştırılır; fark toleransı aşarsa uyuşmazlık işaretlenir
+# (log, metrik ve /api/providers).
+
+PRAYER_PROVIDERS_SPEC = os.environ.get('PAUSETIME_PRAYER_PROVIDERS', 'imsakiyem,computed')
+# Hedge bütçesi için tutulan son gecikme örnekleri
+PROVIDER_LATENCY_WINDOW = 100
+# Bu kadar örnek birikene kadar sabit bütçe kullanılır
+PROVIDER_HEDGE_MIN_SAMPLES = 10
+PROVIDER_HEDGE_DEFAULT_SECONDS = 1.0
+PROVIDER_HEDGE_MIN_SECONDS = 0.1
+PROVIDER_HEDGE_MAX_SECONDS = 5.0
+# Dosya ve hesap sağlayıcılarının döndürdüğü gün sayısı (aylık endpoint gibi)
+PROVIDER_FETCH_DAYS = 30
+# İki uzak / dosya sağlayıcı arasında kabul edilen fark; hesapla karşılaştırmada
+# OFFLINE_TOLERANCE_MINUTES kullanılır
+PROVIDER_DISAGREE_TOLERANCE_MINUTES = 1
+PROVIDER_DISAGREEMENT_HISTORY = 50
+
+_providers = None
+_providers_lock = threading.Lock()
+_provider_disagreements = deque(maxlen=PROVIDER_DISAGREEMENT_HISTORY)
+
+
+class _PrayerProvider:
+    """Sağlayıcı arayüzü.
+
+    fetch() start_date'ten itibaren [(date_str, times), ...] döner; veri yoksa
+    boş liste, erişim / biçim hatasında OSError veya ValueError fırlatır.
+    hedged=False olanlar zincirde yarışmaz, yalnızca karşılaştırılır.
+    """
+    kind = None
+    hedged = True
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = deque(maxlen=PROVIDER_LATENCY_WINDOW)
+        self.wins = 0
+        self.errors = 0
+
+    def fetch(self, district_id, start_date):
+        raise NotImplementedError
+
+    def hedge_budget(self):
+        """Sıradaki sağlayıcı başlatılmadan önce beklenecek süre (gözlenen p95)."""
+        samples = sorted(self.latencies)
+        if len(samples) < PROVIDER_HEDGE_MIN_SAMPLES:
+            return PROVIDER_HEDGE_DEFAULT_SECONDS
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return min(max(p95, PROVIDER_HEDGE_MIN_SECONDS), PROVIDER_HEDGE_MAX_SECONDS)
+
+    def status(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "hedged": self.hedged,
+            "hedge_budget_ms": round(self.hedge_budget() * 1000, 1) if self.hedged else None,
+            "samples": len(self.latencies),
+            "wins": self.wins,
+            "errors": self.errors,
+        }
+
+
+class _ImsakiyemProvider(_PrayerProvider):
+    """ezanvakti.imsakiyem.com API'si (veya aynı biçimdeki bir ayna / stub)."""
+    kind = "imsakiyem"
+
+    def __init__(self, name, base_url):
+        super().__init__(name)
+        self.base_url = base_url.rstrip('/')
+
+    def fetch(self, district_id, start_date):
+        """Aylık endpoint hata verir veya veri döndürmezse tek günlük endpoint'e düşer."""
+        requests = _requests()
+        start_str = start_date.strftime('%Y-%m-%d')
+        rows = []
+        monthly_error = None
+        for period in ("monthly", "daily"):
+            url = f"{self.base_url}/prayer-times/{district_id}/{period}"
+            started = time.perf_counter()
+            try:
+                response = _http().get(url, params={"startDate": start_str}, timeout=15)
+                response.raise_for_status()
+                data = response.json()
+            except requests.HTTPError as e:
+                _record_upstream("request_exception", started)
+                if period != "monthly":
+                    raise
+                logger.error("%s monthly endpoint error for %s: %s", self.name, district_id, e)
+                monthly_error = e
+                continue
+            except requests.RequestException:
+                _record_upstream("request_exception", started)
+                raise
+            except ValueError:
+                _record_upstream("invalid_response", started)
+                raise
+            if not (data.get("success") and data.get("data")):
+                _record_upstream("api_error", started)
+                logger.error("%s API error for %s (%s): %s", self.name, district_id, period, data)
+                continue
+            _record_upstream("success", started)
+
+            for i, item in enumerate(data["data"]):
+                # Kayıtta tarih yoksa ardışık günler varsayılır
+                date_str = str(item.get("date") or "")[:10]
+                if not date_str:
+                    date_str = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
+                rows.append((date_str, _parse_api_times(item["times"])))
+            break
+        if not rows and monthly_error is not None:
+            # Günlük endpoint de veri döndürmedi; aylık hatası upstream hatası sayılır
+            raise monthly_error
+        return rows
+
+
+class _FileProvider(_PrayerProvider):
+    """API'nin "data" dizisiyle aynı biçimde, ilçe id'sine göre gruplanmış JSON dosyası.
+
+    Dosya değiştikçe (mtime) yeniden okunur.
+    """
+    kind = "file"
+
+    def __init__(self, name, path):
+        super().__init__(name)
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._days = {}
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                days = {}
+                try:
+                    for district_id, items in data.items():
+                        days[str(district_id)] = {
+                            str(item["date"])[:10]: _parse_api_times(item["times"]) for item in items
+                        }
+                except (AttributeError, KeyError, TypeError) as e:
+                    raise ValueError(f"invalid prayer times file {self.path}: {e}") from e
+                self._days, self._mtime = days, mtime
+            return self._days
+
+    def fetch(self, district_id, start_date):
+        days = self._load().get(str(district_id), {})
+        rows = []
+        for i in range(PROVIDER_FETCH_DAYS):
+            date_str = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
+            if date_str not in days:
+                break
+            rows.append((date_str, days[date_str]))
+        return rows
+
+
+class _ComputedProvider(_PrayerProvider):
+    """Yerel astronomik hesap. Yalnızca il merkezleri için (koordinatı bilinen)
+    cevap verir; zincirde yarışmaz, kazananla karşılaştırılır."""
+    kind = "computed"
+    hedged = False
+
+    def fetch(self, district_id, start_date):
+        city = next((c for c, d in DIYANET_DISTRICT_IDS.items() if d == district_id), None)
+        if city is None or city not in CITY_COORDINATES:
+            return []
+        return compute_prayer_times_bulk([city], start_date, PROVIDER_FETCH_DAYS)[city]
 
+
+_PROVIDER_KINDS = {
+    "imsakiyem": lambda name, arg: _ImsakiyemProvider(name, arg or DIYANET_API_BASE),
+    "file": lambda name, arg: _FileProvider(name, arg) if arg else None,
+    "computed": lambda name, arg: _ComputedProvider(name),
+}
+
+
+def _build_providers(spec):
+    """PAUSETIME_PRAYER_PROVIDERS tanımından sağlayıcı listesini kurar.
+
+    Aynı türden birden fazla sağlayıcı "imsakiyem-2" gibi adlandırılır.
+    Yarışan sağlayıcı kalmazsa varsayılan API eklenir.
+    """
+    providers = []
+    counts = {}
+    for entry in spec.split(','):
+        kind, _, arg = entry.strip().partition('=')
+        kind = kind.strip().lower()
+        if not kind:
+            continue
+        counts[kind] = counts.get(kind, 0) + 1
+        name = kind if counts[kind] == 1 else f"{kind}-{counts[kind]}"
+        factory = _PROVIDER_KINDS.get(kind)
+        provider = factory(name, arg.strip()) if factory else None
+        if provider is None:
+            logger.error("Ignoring invalid prayer provider %r", entry.strip())
+            continue
+        providers.append(provider)
+    if not any(p.hedged for p in providers):
+        providers.insert(0, _ImsakiyemProvider("imsakiyem", DIYANET_API_BASE))
+    return providers
+
+
+def _get_providers():
+    """Sağlayıcı zinciri (ilk kullanımda kurulur)."""
+    global _providers
+    if _providers is None:
+        with _providers_lock:
+            if _providers is None:
+                _providers = _build_providers(PRAYER_PROVIDERS_SPEC)
+    return _providers
+
+
+def _provider_compare(district_id, winner, winner_rows, other, other_rows, tolerance):
+    """İki sağlayıcının ortak günlerini karşılaştırır; fark toleransı aşarsa işaretler."""
+    theirs = dict(other_rows)
+    worst, worst_date, worst_vakit = 0, None, None
+    for date_str, times in winner_rows:
+        other_times = theirs.get(date_str)
+        if other_times is None:
+            continue
+        for key in VAKIT_ORDER:
+            diff = abs(_time_to_minutes(times[key]) - _time_to_minutes(other_times[key]))
+            if diff > worst:
+                worst, worst_date, worst_vakit = diff, date_str, key
+    if worst <= tolerance:
+        return
+    _metric_inc("pausetime_provider_disagreements_total", (("provider", other.name),))
+    logger.warning("Prayer providers disagree for %s on %s: %s vs %s differ by %s min (%s)",
+                   district_id, worst_date, winner.name, other.name, worst, worst_vakit)
+    _provider_disagreements.append({
+        "at": time.time(),
+        "district_id": district_id,
+        "date": worst_date,
+        "vakit": worst_vakit,
+        "winner": winner.name,
+        "provider": other.name,
+        "diff_minutes": worst,
+    })
+
+
+def _provider_validate(rows):
+    """Her kaydın tarihi ve vakitleri geçerli mi; değilse ValueError."""
+    for date_str, times in rows:
+        datetime.strptime(date_str, '%Y-%m-%d')
+        for key in VAKIT_ORDER:
+            h, m = map(int, times[key].split(':'))
+            if not (0 <= h < 24 and 0 <= m < 60):
+                raise ValueError(f"invalid {key} time {times[key]!r} on {date_str}")
+
+
+def _fetch_prayer_times_range(district_id, start_date):
+    """Sağlayıcı zincirinden hedge'li çekim: [(date_str, times), ...] döner.
+
+    Hatalar OSError veya ValueError olarak fırlatılır. Hiçbir sağlayıcı veri
+    döndürmediyse: birincil sağlayıcı cevap verdiyse boş liste döner, hata
+    verdiyse onun hatası fırlatılır. Böylece ikincil bir kaynağın boş cevabı
+    upstream ayakta sayılmaz (devre kesici).
+    """
+    providers = _get_providers()
+    chain = [p for p in providers if p.hedged]
+    results = queue.Queue()
+    race_lock = threading.Lock()
+    race = {"winner": None, "rows": None}
+    launched = []
+
+    def run(provider):
+        started = time.perf_counter()
+        try:
+            rows = provider.fetch(district_id, start_date)
+            _provider_validate(rows)
+        except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+            provider.errors += 1
+            logger.error("Prayer provider %s failed for %s: %s", provider.name, district_id, e)
+            if not isinstance(e, (OSError, ValueError)):
+                # Bozuk cevap (eksik alan vb.); çağıran yalnızca bu iki türü ayırt eder
+                wrapped = ValueError(f"invalid answer from {provider.name}: {e!r}")
+                wrapped.__cause__ = e
+                e = wrapped
+            results.put((provider, None, e))
+            return
+        provider.latencies.append(time.perf_counter() - started)
+        with race_lock:
+            winner = race["winner"]
+            if rows and winner is None:
+                race.update(winner=provider, rows=rows)
+        if rows and winner is not None:
+            # Kazanan belli; geç gelen cevap yalnızca karşılaştırılır
+            _provider_compare(district_id, winner, race["rows"], provider, rows,
+                              PROVIDER_DISAGREE_TOLERANCE_MINUTES)
+        results.put((provider, rows, None))
+
+    def launch():
+        provider = chain[len(launched)]
+        launched.append(provider)
+        threading.Thread(target=run, args=(provider,), name=f"provider-{provider.name}",
+                         daemon=True).start()
+        # Sıradaki sağlayıcı bu sağlayıcının p95 gecikmesi dolunca başlatılır
+        return time.monotonic() + provider.hedge_budget()
+
+    hedge_at = launch()
+    finished = 0
+    primary_error = None
+    while finished < len(launched):
+        timeout = None
+        if len(launched) < len(chain):
+            timeout = max(hedge_at - time.monotonic(), 0)
+        try:
+            provider, rows, error = results.get(timeout=timeout)
+        except queue.Empty:
+            _metric_inc("pausetime_provider_hedges_total", (("provider", chain[len(launched)].name),))
+            hedge_at = launch()
+            continue
+        finished += 1
+        if rows and race["winner"] is provider:
+            provider.wins += 1
+            _metric_inc("pausetime_provider_wins_total", (("provider", provider.name),))
+            for reference in providers:
+                if not reference.hedged:
+                    _provider_reference_check(district_id, start_date, provider, rows, reference)
+            return rows
+        if provider is chain[0]:
+            primary_error = error
+        if len(launched) < len(chain):
+            # Hata veya boş cevap: bütçeyi beklemeden sıradakine geçilir
+            hedge_at = launch()
+    if primary_error is not None:
+        raise primary_error
+    return []
+
+
+def _provider_reference_check(district_id, start_date, winner, rows, reference):
+    """Kazanan cevabı yarışmayan (hesaplanan) kaynakla karşılaştırır."""
     try:
-        response = requests.get(url, params=params, headers={"Accept": "application/json"}, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        reference_rows = reference.fetch(district_id, start_date)
+    except (OSError, ValueError) as e:
+        reference.errors += 1
+        logger.error("Prayer provider %s failed for %s: %s", reference.name, district_id, e)
+        return
+    _provider_compare(district_id, winner, rows, reference, reference_rows,
+                      OFFLINE_TOLERANCE_MINUTES)
 
-        if data.get("success") and data.get("data"):
-            times = data["data"][0]["times"]
-            result = {
-                "Fajr": times["imsak"],
-                "Dhuhr": times["ogle"],
-                "Asr": times["ikindi"],
-                "Maghrib": times["aksam"],
-                "Isha": times["yatsi"]
-            }
-            prayer_times_cache[cache_key] = result
-            logger.info(f"Diyanet prayer times for {city} ({date_str}): {result}")
-            return result
+
+def _providers_status():
+    """Sağlayıcıların durumu ve son uyuşmazlıklar (/api/providers)."""
+    return {
+        "providers": [p.status() for p in _get_providers()],
+        "disagreements": list(_provider_disagreements),
+    }
+
+
+def _fetch_prayer_times_async(district_id, start_date):
+    """İlçe için aylık çekimi arka planda başlatır; zaten sürüyorsa birleştirir.
+
+    Aynı gün yakın zamanda başarısız olduysa veya devre açıksa hiçbir şey yapmaz.
+    İşçi süreçte çekim sahip sürece devredilir.
+    """
+    if WORKER_OWNER_PORT is not None:
+        _worker_request_fetch(district_id, start_date)
+        return
+    key = (district_id, start_date.strftime('%Y-%m-%d'))
+    if _negative_cached(*key):
+        _metric_inc("pausetime_upstream_skipped_total", (("reason", "negative_cache"),))
+        return
+    with _inflight_lock:
+        if key in _inflight_fetches:
+            return
+        if not _breaker_allow():
+            _metric_inc("pausetime_upstream_skipped_total", (("reason", "breaker"),))
+            return
+        _inflight_fetches.add(key)
+    threading.Thread(target=_fetch_prayer_times_worker, args=(district_id, start_date),
+                     name=f"prayer-fetch-{district_id}", daemon=True).start()
+
+
+def _fetch_prayer_times_worker(district_id, start_date):
+    start_str = start_date.strftime('%Y-%m-%d')
+    try:
+        try:
+            rows = _fetch_prayer_times_range(district_id, start_date)
+        except Exception as e:
+            # Beklenmeyen hatalar da (bozuk cevap vb.) hata sayılır; aksi halde
+            # half-open deneme hiç sonuçlanmaz
+            _breaker_failure(e)
+            _negative_cache_put(district_id, start_str)
+            raise
+        _breaker_success()
+        if rows:
+            _negative_cache_clear(district_id)
         else:
-            logger.error(f"Diyanet API error for {city}: {data}")
-            return _get_default_times()
-    except requests.RequestException as e:
-        logger.error(f"Diyanet request error for {city}: {str(e)}")
-        return _get_default_times()
+            # Upstream ayakta ama bu ilçe / gün için veri yok
+            _negative_cache_put(district_id, start_str)
+        _store_put_many(district_id, rows)
+        # Cache'teki eski / eksik kayıtlar bir sonraki okumada store'dan gelsin
+        for date_str, _times in rows:
+            prayer_times_cache.pop(f"diyanet_{district_id}_{date_str}", None)
+        if rows:
+            _bump_prayer_revision(district_id)
+            _notify_state_change()
+        logger.info("Prayer times for %s: %s days from %s stored",
+                    district_id, len(rows), start_str)
+    except (OSError, ValueError) as e:
+        logger.error("Prayer times fetch error for %s: %s", district_id, e)
     except Exception as e:
-        logger.error(f"Unexpected error for {city}: {str(e)}")
-        return _get_default_times()
+        logger.error("Unexpected error fetching %s: %s", district_id, e)
+    finally:
+        with _inflight_lock:
+            _inflight_fetches.discard((district_id, start_str))
+
+
+def _prayer_refresh_loop():
+    """Açılışta store'u temizleyip doldurur; ardından her gece yarısından önce
+    yarının verisini store'dan cache'e hazırlar."""
+    _evict_old_prayer_times()
+    _start_prayer_prefetch()
+    tz = _tz()
+    while True:
+        now = datetime.now(tz)
+        tomorrow = now + timedelta(days=1)
+        midnight = tz.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day))
+        wake = midnight - timedelta(seconds=PRAYER_PREMIDNIGHT_REFRESH_SECONDS)
+        if wake <= now:
+            wake += timedelta(days=1)
+        time.sleep((wake - now).total_seconds())
+
+        _evict_old_prayer_times()
+        # Varsayılan konum ve son sunulan tüm ilçeler için ortak ısınma
+        district_ids = {_default_district_id(), *list(_timelines)}
+        tomorrow = datetime.now(tz) + timedelta(days=1)
+        for district_id in district_ids:
+            _start_prayer_prefetch(district_id)
+            get_prayer_times(date=tomorrow, district_id=district_id)
+
+
+def _start_prayer_refresh():
+    """Açılış prefetch'ini ve gece yarısı öncesi yenileme döngüsünü arka planda başlatır."""
+    threading.Thread(target=_prayer_refresh_loop, name="prayer-refresh", daemon=True).start()
+
+
+def _default_location():
+    """Ayarlardaki konumun (district_id, city) çifti.
+
+    Ayarlarda ilçe seçiliyse o, değilse şehrin il merkezi kullanılır.
+    """
+    settings = _snapshot.settings
+    city = settings.get("city", "ISTANBUL").upper()
+    district_id = settings.get("district")
+    if district_id:
+        return district_id, city
+    return DIYANET_DISTRICT_IDS.get(city, "9541"), city
+
+
+def _default_district_id():
+    """Ayarlardaki konumun Diyanet ilçe id'si."""
+    return _default_location()[0]
+
+
+def _resolve_district(value):
+    """Şehir / ilçe adı veya ilçe id'sini (district_id, city) çiftine çevirir. Bilinmiyorsa None."""
+    raw = str(value).strip()
+    value = raw.upper()
+    if value in DIYANET_DISTRICT_IDS:
+        return DIYANET_DISTRICT_IDS[value], value
+    for city, district_id in DIYANET_DISTRICT_IDS.items():
+        if district_id == value:
+            return district_id, city
+
+    # İl merkezi değilse ilçe index'ine bakılır (ilk kullanımda yüklenir)
+    index = _get_district_index()
+    n = index["by_id"].get(raw)
+    if n is None:
+        n = index["by_name"].get(_fold_tr(raw))
+    if n is None:
+        return None
+    district_id, _name, city = index["entries"][n]
+    return district_id, city
+
+
+# ============================================================
+# DISTRICT INDEX
+# ============================================================
+# 81 il merkezi ve (varsa) harici ilçe tablosu için arama index'i. Adlar
+# Türkçe büyük/küçük harf ve aksan katlamasıyla ("İstanbul", "ISTANBUL",
+# "istanbul" → "istanbul") tek biçime indirgenir; sıralı anahtar listesi
+# üzerinde bisect ile önek araması yapılır. Index soğuk başlangıca bir şey
+# eklemesin diye ilk aramada / ilk bilinmeyen ilçede kurulur.
+#
+# İlçe tablosu: app.py'nin yanındaki districts.tsv (veya PAUSETIME_DISTRICTS_FILE),
+# her satırda "IL_ANAHTARI<TAB>İlçe adı<TAB>Diyanet ilçe id". # ile başlayan
+# satırlar yok sayılır. Depo bir ilçe tablosu içermez; dosya yoksa yalnızca il
+# merkezleri aranır ve ilçe adları / id'leri çözülmez.
+
+DISTRICTS_FILE = os.environ.get(
+    'PAUSETIME_DISTRICTS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'districts.tsv'))
+
+DISTRICT_SEARCH_DEFAULT_LIMIT = 10
+DISTRICT_SEARCH_MAX_LIMIT = 50
+
+# İl anahtarı → Türkçe yazımı
+PROVINCE_NAMES = {
+    "ADANA": "Adana", "ADIYAMAN": "Adıyaman", "AFYONKARAHISAR": "Afyonkarahisar",
+    "AGRI": "Ağrı", "AKSARAY": "Aksaray", "AMASYA": "Amasya",
+    "ANKARA": "Ankara", "ANTALYA": "Antalya", "ARDAHAN": "Ardahan",
+    "ARTVIN": "Artvin", "AYDIN": "Aydın", "BALIKESIR": "Balıkesir",
+    "BARTIN": "Bartın", "BATMAN": "Batman", "BAYBURT": "Bayburt",
+    "BILECIK": "Bilecik", "BINGOL": "Bingöl", "BITLIS": "Bitlis",
+    "BOLU": "Bolu", "BURDUR": "Burdur", "BURSA": "Bursa",
+    "CANAKKALE": "Çanakkale", "CANKIRI": "Çankırı", "CORUM": "Çorum",
+    "DENIZLI": "Denizli", "DIYARBAKIR": "Diyarbakır", "DUZCE": "Düzce",
+    "EDIRNE": "Edirne", "ELAZIG": "Elazığ", "ERZINCAN": "Erzincan",
+    "ERZURUM": "Erzurum", "ESKISEHIR": "Eskişehir", "GAZIANTEP": "Gaziantep",
+    "GIRESUN": "Giresun", "GUMUSHANE": "Gümüşhane", "HAKKARI": "Hakkari",
+    "HATAY": "Hatay", "IGDIR": "Iğdır", "ISPARTA": "Isparta",
+    "ISTANBUL": "İstanbul", "IZMIR": "İzmir", "KAHRAMANMARAS": "Kahramanmaraş",
+    "KARABUK": "Karabük", "KARAMAN": "Karaman", "KARS": "Kars",
+    "KASTAMONU": "Kastamonu", "KAYSERI": "Kayseri", "KILIS": "Kilis",
+    "KIRIKKALE": "Kırıkkale", "KIRKLARELI": "Kırklareli", "KIRSEHIR": "Kırşehir",
+    "KOCAELI": "Kocaeli", "KONYA": "Konya", "KUTAHYA": "Kütahya",
+    "MALATYA": "Malatya", "MANISA": "Manisa", "MARDIN": "Mardin",
+    "MERSIN": "Mersin", "MUGLA": "Muğla", "MUS": "Muş",
+    "NEVSEHIR": "Nevşehir", "NIGDE": "Niğde", "ORDU": "Ordu",
+    "OSMANIYE": "Osmaniye", "RIZE": "Rize", "SAKARYA": "Sakarya",
+    "SAMSUN": "Samsun", "SANLIURFA": "Şanlıurfa", "SIIRT": "Siirt",
+    "SINOP": "Sinop", "SIRNAK": "Şırnak", "SIVAS": "Sivas",
+    "TEKIRDAG": "Tekirdağ", "TOKAT": "Tokat", "TRABZON": "Trabzon",
+    "TUNCELI": "Tunceli", "USAK": "Uşak", "VAN": "Van",
+    "YALOVA": "Yalova", "YOZGAT": "Yozgat", "ZONGULDAK": "Zonguldak",
+}
+
+# Büyük/küçük harf ve aksan katlaması; İ ve I'nın ikisi de "i" olur
+_TR_FOLD = str.maketrans("İIıŞşĞğÜüÖöÇçÂâÎîÛû", "iiissgguuooccaaiiuu")
+
+_district_index = None
+_district_index_lock = threading.Lock()
+
+
+def _fold_tr(text):
+    """Arama için Türkçe katlama: "Kadıköy" → "kadikoy", "İĞDIR" → "igdir"."""
+    return " ".join(text.translate(_TR_FOLD).lower().split())
+
+
+def _read_district_table(path):
+    """districts.tsv satırlarını (district_id, ad, il_anahtarı) olarak okur."""
+    rows = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 3 or parts[0].upper() not in DIYANET_DISTRICT_IDS:
+                    continue
+                rows.append((parts[2].strip(), parts[1].strip(), parts[0].upper()))
+    except FileNotFoundError:
+        pass
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error("District table read error: %s", e)
+    return rows
+
+
+def _build_district_index():
+    """İl merkezleri ve ilçe tablosundan arama index'ini kurar."""
+    entries = [(district_id, PROVINCE_NAMES.get(city, city.title()), city)
+               for city, district_id in DIYANET_DISTRICT_IDS.items()]
+    centers = set(DIYANET_DISTRICT_IDS.values())
+    entries.extend(row for row in _read_district_table(DISTRICTS_FILE) if row[0] not in centers)
+
+    folded_names = [_fold_tr(name) for _id, name, _city in entries]
+    name_counts = {}
+    for folded in folded_names:
+        name_counts[folded] = name_counts.get(folded, 0) + 1
+
+    # Sıralama katmanları: il merkezi adları, ilçe adları, diğer anahtarlar
+    tiers = ([], [], [])
+    by_id = {}
+    by_name = {}
+    for n, (district_id, _name, city) in enumerate(entries):
+        folded = folded_names[n]
+        by_id[district_id] = n
+        # Ad içindeki sonraki kelimelerden başlayan kısımlar da önekle aranabilir
+        # ("efendi" → "Merkez Efendi")
+        words = folded.split()
+        tiers[2].extend((" ".join(words[i:]), n) for i in range(1, len(words)))
+        if district_id in centers:
+            tiers[0].append((folded, n))
+            by_name[folded] = n
+            continue
+        tiers[1].append((folded, n))
+        # İlçeler "il ilçe" biçiminde de bulunur ("izmir bornova"); aynı adlı
+        # ilçeler (ör. "Merkez") ada göre yalnızca il ile birlikte çözülür
+        qualified = f"{_fold_tr(PROVINCE_NAMES.get(city, city))} {folded}"
+        tiers[2].append((qualified, n))
+        by_name[qualified] = n
+        if name_counts[folded] == 1:
+            by_name.setdefault(folded, n)
+
+    index = {
+        "tiers": [],
+        "entries": entries,
+        "centers": centers,
+        "by_id": by_id,
+        "by_name": by_name,
+    }
+    for tier in tiers:
+        tier.sort()
+        index["tiers"].append(([key for key, _n in tier], array('i', [n for _key, n in tier])))
+    logger.info("District index built: %s locations, %s keys",
+                len(entries), sum(len(tier) for tier in tiers))
+    return index
+
+
+def _get_district_index():
+    global _district_index
+    index = _district_index
+    if index is None:
+        with _district_index_lock:
+            if _district_index is None:
+                _district_index = _build_district_index()
+            index = _district_index
+    return index
+
+
+def search_districts(query, limit=DISTRICT_SEARCH_DEFAULT_LIMIT):
+    """Önek araması: [(district_id, ad, il_anahtarı, il merkezi mi), ...].
+
+    Sıralama: adı önekle başlayan il merkezleri, sonra ilçeler, sonra adın
+    içinden ya da "il ilçe" biçiminde eşleşenler; her grup alfabetik. Katmanlar
+    ayrı sıralı listeler olduğundan tarama limit dolunca durur.
+    """
+    prefix = _fold_tr(query)
+    if not prefix or limit < 1:
+        return []
+    index = _get_district_index()
+    entries, centers = index["entries"], index["centers"]
+
+    seen = set()
+    results = []
+    for keys, refs in index["tiers"]:
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            n = refs[i]
+            i += 1
+            if n in seen:
+                continue
+            seen.add(n)
+            district_id = entries[n][0]
+            results.append((*entries[n], district_id in centers))
+            if len(results) >= limit:
+                return results
+    return results
+
+
+_CACHE_HIT = (("result", "hit"),)
+_CACHE_MISS = (("result", "miss"),)
+
+
+def get_prayer_times(city=None, date=None, district_id=None):
+    """Diyanet İşleri Başkanlığı verilerinden vakit bilgilerini al.
+
+    Sıra: bellek cache → yerel store (SQLite). Store'da yoksa veya kayıt
+    eskiyse Diyanet'ten arka planda aylık çekim başlatılır; veri gelene kadar
+    vakitler offline olarak hesaplanır (cache'lenmez). Ağı hiç beklemez.
+    district_id verilirse city yalnızca offline hesap için kullanılır.
+    """
+    if district_id is None:
+        if city is None:
+            district_id, city = _default_location()
+        else:
+            district_id = DIYANET_DISTRICT_IDS.get(city.upper(), "9541")
+    elif city is None:
+        resolved = _resolve_district(district_id)
+        city = resolved[1] if resolved else "ISTANBUL"
+
+    if date is None:
+        date = _now()
+
+    date_str = date.strftime('%Y-%m-%d')
+    cache_key = f"diyanet_{district_id}_{date_str}"
+    result = prayer_times_cache.get(cache_key)
+    if result is not None:
+        _metric_inc("pausetime_prayer_cache_requests_total", _CACHE_HIT)
+        return result
+    _metric_inc("pausetime_prayer_cache_requests_total", _CACHE_MISS)
+
+    with _profile_phase("cache_lookup"):
+        stored = _store_get(district_id, date_str)
+    if stored is not None:
+        result, fetched_at = stored
+        prayer_times_cache[cache_key] = result
+        if time.time() - fetched_at > PRAYER_STALE_SECONDS:
+            # Stale-while-revalidate: eski veri sunulur, yenisi arka planda gelir
+            _fetch_prayer_times_async(district_id, date)
+        return result
+
+    _fetch_prayer_times_async(district_id, date)
+    _metric_inc("pausetime_prayer_fallback_total", (("source", "offline"),))
+    return _get_offline_times(city, date)
 
 
 def _get_default_times():
@@ -166,6 +1741,192 @@ def _get_default_times():
     }
 
 
+# ============================================================
+# OFFLINE PRAYER TIMES (astronomik hesap)
+# ============================================================
+# API'ye ulaşılamadığında vakitler güneş konumundan hesaplanır. Diyanet
+# yöntemi: İmsak 18°, Yatsı 17°, İkindi gölge boyu 1 (asr-ı evvel) ve
+# temkin süreleri. Güneşe ait terimler (deklinasyon, zaman denklemi) güne
+# bağlıdır; bir kez hesaplanıp tüm şehirler için paylaşılır.
+
+# İl merkezlerinin enlem / boylamı (derece)
+CITY_COORDINATES = {
+    "ADANA": (37.00, 35.32), "ADIYAMAN": (37.76, 38.28), "AFYONKARAHISAR": (38.76, 30.54),
+    "AGRI": (39.72, 43.05), "AKSARAY": (38.37, 34.03), "AMASYA": (40.65, 35.83),
+    "ANKARA": (39.93, 32.86), "ANTALYA": (36.89, 30.71), "ARDAHAN": (41.11, 42.70),
+    "ARTVIN": (41.18, 41.82), "AYDIN": (37.85, 27.85), "BALIKESIR": (39.65, 27.88),
+    "BARTIN": (41.64, 32.34), "BATMAN": (37.89, 41.13), "BAYBURT": (40.26, 40.23),
+    "BILECIK": (40.14, 29.98), "BINGOL": (38.88, 40.50), "BITLIS": (38.40, 42.11),
+    "BOLU": (40.74, 31.61), "BURDUR": (37.72, 30.29), "BURSA": (40.19, 29.06),
+    "CANAKKALE": (40.16, 26.41), "CANKIRI": (40.60, 33.62), "CORUM": (40.55, 34.96),
+    "DENIZLI": (37.78, 29.09), "DIYARBAKIR": (37.91, 40.24), "DUZCE": (40.84, 31.16),
+    "EDIRNE": (41.68, 26.56), "ELAZIG": (38.68, 39.22), "ERZINCAN": (39.75, 39.49),
+    "ERZURUM": (39.90, 41.27), "ESKISEHIR": (39.78, 30.52), "GAZIANTEP": (37.07, 37.38),
+    "GIRESUN": (40.91, 38.39), "GUMUSHANE": (40.46, 39.48), "HAKKARI": (37.58, 43.74),
+    "HATAY": (36.20, 36.16), "IGDIR": (39.92, 44.05), "ISPARTA": (37.76, 30.55),
+    "ISTANBUL": (41.01, 28.98), "IZMIR": (38.42, 27.14), "KAHRAMANMARAS": (37.58, 36.94),
+    "KARABUK": (41.20, 32.63), "KARAMAN": (37.18, 33.22), "KARS": (40.60, 43.10),
+    "KASTAMONU": (41.38, 33.78), "KAYSERI": (38.72, 35.49), "KILIS": (36.72, 37.12),
+    "KIRIKKALE": (39.85, 33.51), "KIRKLARELI": (41.74, 27.23), "KIRSEHIR": (39.15, 34.16),
+    "KOCAELI": (40.77, 29.92), "KONYA": (37.87, 32.48), "KUTAHYA": (39.42, 29.98),
+    "MALATYA": (38.36, 38.31), "MANISA": (38.61, 27.43), "MARDIN": (37.31, 40.74),
+    "MERSIN": (36.81, 34.64), "MUGLA": (37.22, 28.36), "MUS": (38.74, 41.49),
+    "NEVSEHIR": (38.62, 34.71), "NIGDE": (37.97, 34.68), "ORDU": (40.98, 37.88),
+    "OSMANIYE": (37.07, 36.25), "RIZE": (41.02, 40.52), "SAKARYA": (40.78, 30.40),
+    "SAMSUN": (41.29, 36.33), "SANLIURFA": (37.16, 38.79), "SIIRT": (37.93, 41.94),
+    "SINOP": (42.03, 35.15), "SIRNAK": (37.52, 42.46), "SIVAS": (39.75, 37.02),
+    "TEKIRDAG": (40.98, 27.51), "TOKAT": (40.31, 36.55), "TRABZON": (41.00, 39.72),
+    "TUNCELI": (39.11, 39.55), "USAK": (38.68, 29.41), "VAN": (38.49, 43.38),
+    "YALOVA": (40.66, 29.27), "YOZGAT": (39.82, 34.81), "ZONGULDAK": (41.45, 31.79),
+}
+
+# Diyanet hesap parametreleri
+FAJR_ANGLE = 18.0
+ISHA_ANGLE = 17.0
+SUNSET_ANGLE = 0.833
+ASR_SHADOW_FACTOR = 1
+# Temkin süreleri (dakika)
+DIYANET_TEMKIN_MINUTES = {"Fajr": 0, "Dhuhr": 5, "Asr": 4, "Maghrib": 7, "Isha": 0}
+# Türkiye saat dilimi (2016'dan beri sabit UTC+3)
+TURKEY_UTC_OFFSET_HOURS = 3
+# Offline hesap ile Diyanet verisi arasında kabul edilen fark (dakika)
+OFFLINE_TOLERANCE_MINUTES = 3
+
+
+def _solar_terms(day):
+    """Günün öğle saatindeki güneş deklinasyonu (sin, cos) ve zaman denklemi (saat)."""
+    # 2000-01-01 12:00 UT'den bu yana gün sayısı (öğle, Türkiye saati)
+    d = (day.toordinal() - 730120) + (12 - TURKEY_UTC_OFFSET_HOURS) / 24.0 - 0.5
+    g = math.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    lam = math.radians(q + 1.915 * math.sin(g) + 0.020 * math.sin(2 * g))
+    eps = math.radians(23.439 - 0.00000036 * d)
+
+    sin_decl = math.sin(eps) * math.sin(lam)
+    ra = math.degrees(math.atan2(math.cos(eps) * math.sin(lam), math.cos(lam))) / 15.0
+    eqt = q / 15.0 - ra % 24
+    eqt = (eqt + 12) % 24 - 12
+    return sin_decl, math.sqrt(1 - sin_decl * sin_decl), eqt
+
+
+def _hour_angle(sin_alt, sin_lat, cos_lat, sin_decl, cos_decl):
+    """Güneşin verilen yüksekliğe ulaştığı saat açısı (saat). Ulaşmıyorsa None."""
+    cos_h = (sin_alt - sin_decl * sin_lat) / (cos_decl * cos_lat)
+    if cos_h < -1 or cos_h > 1:
+        return None
+    return math.degrees(math.acos(cos_h)) / 15.0
+
+
+def _format_minutes(hours):
+    """Ondalık saati en yakın dakikaya yuvarlayıp "HH:MM" döndürür."""
+    total = int(round(hours * 60)) % (24 * 60)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def compute_prayer_times_bulk(cities, start_date, days):
+    """Şehirler ve ardışık günler için vakitleri hesaplar.
+
+    {city: [(date_str, times), ...]} döner. Günlük güneş terimleri tüm
+    şehirler için bir kez hesaplanır.
+    """
+    start = start_date.date() if isinstance(start_date, datetime) else start_date
+    day_terms = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        day_terms.append((day.strftime('%Y-%m-%d'), _solar_terms(day)))
+
+    sin_fajr = math.sin(math.radians(-FAJR_ANGLE))
+    sin_isha = math.sin(math.radians(-ISHA_ANGLE))
+    sin_sunset = math.sin(math.radians(-SUNSET_ANGLE))
+    temkin = {key: minutes / 60.0 for key, minutes in DIYANET_TEMKIN_MINUTES.items()}
+
+    result = {}
+    for city in cities:
+        lat, lon = CITY_COORDINATES.get(city.upper(), CITY_COORDINATES["ISTANBUL"])
+        sin_lat, cos_lat = math.sin(math.radians(lat)), math.cos(math.radians(lat))
+        tan_lat = math.tan(math.radians(lat))
+        noon_base = 12 + TURKEY_UTC_OFFSET_HOURS - lon / 15.0
+
+        rows = []
+        for date_str, (sin_d, cos_d, eqt) in day_terms:
+            noon = noon_base - eqt
+            # İkindi: gölge boyu = faktör + öğle gölgesi
+            tan_noon_shadow = abs((tan_lat - sin_d / cos_d) / (1 + tan_lat * sin_d / cos_d))
+            sin_asr = math.sin(math.atan(1.0 / (ASR_SHADOW_FACTOR + tan_noon_shadow)))
+
+            fajr = _hour_angle(sin_fajr, sin_lat, cos_lat, sin_d, cos_d)
+            asr = _hour_angle(sin_asr, sin_lat, cos_lat, sin_d, cos_d)
+            sunset = _hour_angle(sin_sunset, sin_lat, cos_lat, sin_d, cos_d)
+            isha = _hour_angle(sin_isha, sin_lat, cos_lat, sin_d, cos_d)
+            # Türkiye enlemlerinde tüm açılara ulaşılır; yine de güvenli varsayılan
+            fajr = 7.5 if fajr is None else fajr
+            isha = 7.5 if isha is None else isha
+
+            rows.append((date_str, {
+                "Fajr": _format_minutes(noon - fajr + temkin["Fajr"]),
+                "Dhuhr": _format_minutes(noon + temkin["Dhuhr"]),
+                "Asr": _format_minutes(noon + asr + temkin["Asr"]),
+                "Maghrib": _format_minutes(noon + sunset + temkin["Maghrib"]),
+                "Isha": _format_minutes(noon + isha + temkin["Isha"]),
+            }))
+        result[city] = rows
+    return result
+
+
+def _get_offline_times(city, date):
+    """Tek gün için offline hesaplanmış vakitler; hesap başarısızsa sabit varsayılanlar."""
+    try:
+        return compute_prayer_times_bulk([city], date, 1)[city][0][1]
+    except Exception as e:
+        logger.error("Offline prayer time calculation failed for %s: %s", city, e)
+        _metric_inc("pausetime_prayer_fallback_total", (("source", "default"),))
+        return _get_default_times()
+
+
+def _verify_offline_times(tolerance_minutes=OFFLINE_TOLERANCE_MINUTES):
+    """Store'daki Diyanet verisini offline hesapla karşılaştırır."""
+    city_by_district = {d: c for c, d in DIYANET_DISTRICT_IDS.items()}
+    try:
+        with _store_lock:
+            rows = _store_db().execute(
+                "SELECT district_id, date, fajr, dhuhr, asr, maghrib, isha FROM prayer_times"
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.error("Prayer store read error: %s", e)
+        rows = []
+
+    checked = 0
+    within = 0
+    max_diff = {key: 0 for key in VAKIT_ORDER}
+    outliers = []
+    for district_id, date_str, *api_times in rows:
+        city = city_by_district.get(district_id)
+        if city is None:
+            continue
+        day = datetime.strptime(date_str, '%Y-%m-%d')
+        computed = compute_prayer_times_bulk([city], day, 1)[city][0][1]
+        worst = 0
+        for key, api_value in zip(VAKIT_ORDER, api_times):
+            ah, am = map(int, api_value.split(':'))
+            ch, cm = map(int, computed[key].split(':'))
+            diff = abs((ah * 60 + am) - (ch * 60 + cm))
+            max_diff[key] = max(max_diff[key], diff)
+            worst = max(worst, diff)
+        checked += 1
+        if worst <= tolerance_minutes:
+            within += 1
+        elif len(outliers) < 20:
+            outliers.append({"city": city, "date": date_str, "max_diff_minutes": worst})
+
+    return {
+        "checked": checked,
+        "within_tolerance": within,
+        "tolerance_minutes": tolerance_minutes,
+        "max_diff_minutes": max_diff,
+        "outliers": outliers,
+    }
+
+
 # ============================================================
 # STATE ENGINE
 # ============================================================
@@ -185,8 +1946,8 @@ PRE_PAUSE_OFFSET_SECONDS = 60
 # Duraklatma süresi: 9 dakika (540 saniye)
 PAUSE_DURATION_SECONDS = 9 * 60
 
-# Global state
-_system_enabled = True
+# Son hesaplanan varsayılan konum state'i (DISABLED cevabı için). Türetilmiş
+# bir değerdir; her seferinde yeni bir dict ile bütün olarak değiştirilir.
 _last_known_state = {
     "time": "--:--",
     "vakit": "Bilinmiyor",
@@ -207,10 +1968,25 @@ _last_known_state = {
 #   enabled: bool
 
 SCHEDULES_BACKUP_FILE = SCHEDULES_FILE + '.bak'
-
-
-def _load_schedules():
-    """Disk'ten zamanlamaları yükle. Ana dosya bozuksa yedekten oku."""
+# Değişiklik günlüğü: her satır bir işlem (put / delete). Snapshot'a
+# (schedules.json) periyodik olarak sıkıştırılır ve sonra yeni bir günlüğe geçilir.
+SCHEDULES_JOURNAL_FILE = SCHEDULES_FILE + '.journal'
+# Önceki günlük nesli. Yedek (.bak) bir önceki sıkıştırmanın snapshot'ıdır;
+# yedek + bu nesil + güncel günlük, ana dosya bozulduğunda son durumu verir.
+SCHEDULES_JOURNAL_BACKUP_FILE = SCHEDULES_FILE + '.journal.bak'
+# Sıkıştırılmakta olan günlük nesli; snapshot yazılınca .journal.bak olur
+SCHEDULES_JOURNAL_COMPACTING_FILE = SCHEDULES_FILE + '.journal.compacting'
+# Günlükte bu kadar kayıt birikince snapshot'a sıkıştır
+SCHEDULES_COMPACT_THRESHOLD = 500
+# Bu kadar saniye yeni yazma olmazsa bekleyen kayıtları sıkıştır
+SCHEDULES_COMPACT_IDLE_SECONDS = 60
+
+
+def _load_schedules_snapshot():
+    """Snapshot dosyasını yükle. Ana dosya bozuksa yedekten oku.
+
+    (schedules, next_id, yedekten_mi) döner.
+    """
     for filepath in [SCHEDULES_FILE, SCHEDULES_BACKUP_FILE]:
         try:
             if os.path.exists(filepath):
@@ -224,23 +2000,87 @@ def _load_schedules():
                 if schedules:
                     max_id = max(s.get("id", 0) for s in schedules)
                     next_id = max(next_id, max_id + 1)
-                if filepath == SCHEDULES_BACKUP_FILE:
-                    logger.warning(f"Loaded schedules from backup file (main file was corrupted)")
+                from_backup = filepath == SCHEDULES_BACKUP_FILE
+                if from_backup:
+                    logger.warning("Loaded schedules from backup file (main file was corrupted)")
                 else:
-                    logger.info(f"Loaded {len(schedules)} schedules from {filepath}")
-                return schedules, next_id
+                    logger.info("Loaded %s schedules from %s", len(schedules), filepath)
+                return schedules, next_id, from_backup
         except Exception as e:
-            logger.error(f"Failed to load schedules from {filepath}: {e}")
-    return [], 1
+            logger.error("Failed to load schedules from %s: %s", filepath, e)
+    return [], 1, False
+
+
+def _replay_schedule_journal(schedules, next_id, path=SCHEDULES_JOURNAL_FILE):
+    """Günlükteki işlemleri snapshot üzerine uygular.
+
+    İşlemler idempotent'tir (put: id'ye göre yaz, delete: id'yi sil); bu yüzden
+    sıkıştırma sırasında kesilen bir günlüğün tekrar oynatılması güvenlidir.
+    Yarım yazılmış son satır (çökme) atlanır.
+    """
+    if not os.path.exists(path):
+        return schedules, next_id, 0
+
+    positions = {s["id"]: i for i, s in enumerate(schedules)}
+    applied = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping torn schedules journal entry")
+                continue
+            if record.get("op") == "put":
+                schedule = record["schedule"]
+                if schedule["id"] in positions:
+                    schedules[positions[schedule["id"]]] = schedule
+                else:
+                    positions[schedule["id"]] = len(schedules)
+                    schedules.append(schedule)
+            elif record.get("op") == "delete" and record["id"] in positions:
+                schedules = [s for s in schedules if s["id"] != record["id"]]
+                positions = {s["id"]: i for i, s in enumerate(schedules)}
+            next_id = max(next_id, record.get("next_id", 1))
+            applied += 1
+
+    if schedules:
+        next_id = max(next_id, max(s.get("id", 0) for s in schedules) + 1)
+    if applied:
+        logger.info("Replayed %s schedule journal entries from %s", applied, path)
+    return schedules, next_id, applied
+
+
+def _load_schedules():
+    """Snapshot'ı yükle ve üzerine günlüğü oynat.
+
+    Yedekten yüklendiyse önce önceki günlük nesli oynatılır; yedek bir önceki
+    sıkıştırmanın snapshot'ı olduğu için aradaki değişiklikler oradadır.
+    Sıkıştırma sırasında kapanıldıysa sıkıştırılan nesil de oynatılır.
+    """
+    schedules, next_id, from_backup = _load_schedules_snapshot()
+    paths = [SCHEDULES_JOURNAL_COMPACTING_FILE, SCHEDULES_JOURNAL_FILE]
+    if from_backup:
+        paths.insert(0, SCHEDULES_JOURNAL_BACKUP_FILE)
+    applied = 0
+    try:
+        for path in paths:
+            schedules, next_id, count = _replay_schedule_journal(schedules, next_id, path)
+            applied += count
+    except Exception as e:
+        logger.error("Failed to replay schedules journal: %s", e)
+    return schedules, next_id, applied
 
 
-def _save_schedules():
-    """Zamanlamaları atomik olarak diske yaz (temp -> rename)."""
+def _save_schedules(snap=None):
+    """Zamanlamaları atomik olarak diske yaz (temp -> rename). Başarılıysa True."""
     import tempfile
+    started = time.perf_counter()
+    if snap is None:
+        snap = _snapshot
     try:
         data = {
-            "schedules": _schedules,
-            "next_id": _schedule_next_id
+            "schedules": list(snap.schedules),
+            "next_id": snap.next_id
         }
         json_str = json.dumps(data, indent=2, ensure_ascii=False)
 
@@ -249,8 +2089,8 @@ def _save_schedules():
             try:
                 import shutil
                 shutil.copy2(SCHEDULES_FILE, SCHEDULES_BACKUP_FILE)
-            except Exception:
-                pass
+            except Exception as e:
+                logger.warning("Failed to back up schedules file: %s", e)
 
         # Atomik yazma: önce temp dosyaya yaz, sonra rename et
         fd, tmp_path = tempfile.mkstemp(dir=APP_DATA_DIR, suffix='.tmp')
@@ -266,12 +2106,136 @@ def _save_schedules():
                 os.remove(tmp_path)
             raise
 
-        logger.info(f"Schedules saved to {SCHEDULES_FILE}")
+        logger.info("Schedules saved to %s", SCHEDULES_FILE)
+        _metric_observe("pausetime_save_duration_seconds", (("target", "schedules"),),
+                        time.perf_counter() - started)
+        return True
+    except Exception as e:
+        logger.error("Failed to save schedules: %s", e)
+        return False
+
+
+# ============================================================
+# SCHEDULE JOURNAL (group commit)
+# ============================================================
+# Değişiklikler tüm listeyi yeniden yazmak yerine günlüğe eklenir. İstek
+# thread'i kaydını kuyruğa bırakıp fsync'i bekler; yazıcı thread o ana kadar
+# biriken tüm kayıtları tek write + fsync ile diske indirir (group commit).
+# Snapshot yazımı (yedekleme dahil) yalnızca sıkıştırmada yapılır ve ayrı bir
+# thread'de çalışır; yazıcı yalnızca günlüğü döndürür, böylece fsync bekleyen
+# istekler snapshot yazımının arkasında kalmaz. Biten günlük bir sonraki
+# sıkıştırmaya kadar yedeğin yanında (.journal.bak) tutulur.
+
+_journal_cond = threading.Condition()
+# [(kayıtlar, tamamlandı_event), ...]
+_journal_pending = []
+_journal_thread = None
+
+
+def _journal_enqueue(records):
+    """Kayıtları günlük kuyruğuna ekler; fsync tamamlanınca set edilen Event döner.
+
+    Kuyruk sırası günlük sırasıdır: yazıcılar snapshot'ı yayınladıkları
+    _write_lock altında çağırır, beklemeyi kilidi bıraktıktan sonra yapar.
+    Kayıtlar kilidi uzatmamak için yazıcı thread'de serileştirilir; bu yüzden
+    kuyruğa girdikten sonra değiştirilmemelidir.
+    """
+    global _journal_thread
+    done = threading.Event()
+    with _journal_cond:
+        if _journal_thread is None:
+            _journal_thread = threading.Thread(target=_journal_writer, name="schedule-journal",
+                                               daemon=True)
+            _journal_thread.start()
+        _journal_pending.append((records, done))
+        _journal_cond.notify()
+    return done
+
+
+def _compact_schedules(snap):
+    """Döndürülmüş günlüğün snapshot'ını yazar (sıkıştırma thread'i).
+
+    Snapshot yazılınca sıkıştırılan nesil .journal.bak olur: _save_schedules'ın
+    bıraktığı yedek bu neslin başındaki durumdur. Yazma başarısız olursa nesil
+    yerinde kalır; bir sonraki rotasyon yeni kayıtları onun sonuna ekler.
+    """
+    if not _save_schedules(snap):
+        return
+    try:
+        os.replace(SCHEDULES_JOURNAL_COMPACTING_FILE, SCHEDULES_JOURNAL_BACKUP_FILE)
     except Exception as e:
-        logger.error(f"Failed to save schedules: {e}")
+        logger.error("Failed to rotate schedules journal: %s", e)
+
 
+def _rotate_schedules_journal():
+    """Günlüğü sıkıştırılacak nesle taşır ve snapshot'ı sıkıştırma thread'ine verir.
 
-_schedules, _schedule_next_id = _load_schedules()
+    Yalnızca günlük yazıcı thread'inden çağrılır; rotasyon sırasında günlüğe
+    ekleme yapılmaz. Alınan snapshot, taşınan günlükteki tüm kayıtları içerir
+    (kayıtlar snapshot yayınlandıktan sonra kuyruğa girer).
+    """
+    global _journal_entries, _compact_thread
+    try:
+        if not os.path.exists(SCHEDULES_JOURNAL_COMPACTING_FILE):
+            if os.path.exists(SCHEDULES_JOURNAL_FILE):
+                os.replace(SCHEDULES_JOURNAL_FILE, SCHEDULES_JOURNAL_COMPACTING_FILE)
+        elif os.path.exists(SCHEDULES_JOURNAL_FILE):
+            # Önceki sıkıştırma yazamadı: yeni kayıtlar aynı nesle eklenir
+            with open(SCHEDULES_JOURNAL_FILE, 'rb') as src, \
+                    open(SCHEDULES_JOURNAL_COMPACTING_FILE, 'ab') as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(SCHEDULES_JOURNAL_FILE)
+        _journal_entries = 0
+    except Exception as e:
+        logger.error("Failed to rotate schedules journal: %s", e)
+        return
+    _compact_thread = threading.Thread(target=_compact_schedules, args=(_snapshot,),
+                                       name="schedule-compact", daemon=True)
+    _compact_thread.start()
+
+
+def _journal_writer():
+    global _journal_entries
+    last_write = time.monotonic()
+    while True:
+        with _journal_cond:
+            if not _journal_pending:
+                _journal_cond.wait(SCHEDULES_COMPACT_IDLE_SECONDS)
+            batch = _journal_pending[:]
+            del _journal_pending[:]
+
+        if batch:
+            started = time.perf_counter()
+            try:
+                data = ''.join(json.dumps(r, ensure_ascii=False) + '\n'
+                               for records, _done in batch for r in records)
+                with open(SCHEDULES_JOURNAL_FILE, 'ab') as f:
+                    f.write(data.encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                _journal_entries += sum(len(records) for records, _done in batch)
+                _metric_observe("pausetime_save_duration_seconds", (("target", "journal"),),
+                                time.perf_counter() - started)
+            except Exception as e:
+                logger.error("Failed to write schedules journal: %s", e)
+            finally:
+                for _records, done in batch:
+                    done.set()
+            last_write = time.monotonic()
+
+        idle = time.monotonic() - last_write >= SCHEDULES_COMPACT_IDLE_SECONDS
+        compacting = _compact_thread is not None and _compact_thread.is_alive()
+        if not compacting and (_journal_entries >= SCHEDULES_COMPACT_THRESHOLD
+                               or (_journal_entries and idle)):
+            _rotate_schedules_journal()
+
+
+# Son rotasyondan beri günlüğe yazılan kayıt sayısı
+_journal_entries = 0
+# Son başlatılan sıkıştırma thread'i
+_compact_thread = None
 
 DAY_NAMES_TR = {
     0: "Pazartesi", 1: "Salı", 2: "Çarşamba",
@@ -288,46 +2252,327 @@ def _validate_time_format(time_str):
         return False
 
 
-def _check_schedule_active(schedule):
-    """Tek bir zamanlamanın şu an aktif olup olmadığını kontrol eder."""
-    if not schedule.get("enabled", True):
-        return False
+def _validate_schedule_fields(data, partial=False):
+    """Zamanlama alanlarını doğrular; (alanlar, hata) döner, hata yoksa None.
 
-    tz = pytz.timezone('Europe/Istanbul')
-    now = datetime.now(tz)
+    partial=False (ekleme): pause_time zorunlu, eksik alanlar varsayılanla dolar.
+    partial=True (güncelleme): yalnızca verilen alanlar döner.
+    """
+    if not isinstance(data, dict):
+        return None, "Zamanlama bir obje olmalı"
 
-    # Gün kontrolü (0=Pazartesi, 6=Pazar)
-    days = schedule.get("days", [])
-    if days and now.weekday() not in days:
-        return False
+    fields = {}
+    if 'pause_time' in data:
+        if not _validate_time_format(data['pause_time']):
+            return None, "Geçersiz pause_time formatı (HH:MM)"
+        fields['pause_time'] = data['pause_time']
+    elif not partial:
+        return None, "pause_time gerekli"
+
+    if 'resume_time' in data or not partial:
+        resume_time = data.get('resume_time')
+        if resume_time and not _validate_time_format(resume_time):
+            return None, "Geçersiz resume_time formatı (HH:MM)"
+        fields['resume_time'] = resume_time
+
+    if 'days' in data or not partial:
+        days = data.get('days', [])
+        if not isinstance(days, list):
+            return None, "days bir liste olmalı"
+        for d in days:
+            if not isinstance(d, int) or isinstance(d, bool) or d < 0 or d > 6:
+                return None, "days 0-6 arası integer olmalı"
+        fields['days'] = sorted(set(days))
+
+    if 'label' in data or not partial:
+        label = data.get('label', '')
+        if not isinstance(label, str):
+            return None, "label metin olmalı"
+        fields['label'] = label
+
+    if 'enabled' in data or not partial:
+        fields['enabled'] = bool(data.get('enabled', True))
 
-    current_minutes = now.hour * 60 + now.minute
-    pause_h, pause_m = map(int, schedule["pause_time"].split(':'))
-    pause_minutes = pause_h * 60 + pause_m
+    return fields, None
 
+
+# ============================================================
+# SCHEDULE INDEX
+# ============================================================
+# Zamanlamalar haftalık, dakika çözünürlüklü bir sayaç dizisine derlenir:
+# index[gün * 1440 + dakika] = o dakikada aktif zamanlama sayısı. Index
+# snapshot'ın parçasıdır; her değişiklikte kopyası üzerinde yalnızca ilgili
+# zamanlamanın aralıkları güncellenir. Toplu değişikliklerde aralıklar bir fark
+# dizisinde biriktirilip index'e tek geçişte uygulanır. "Şu an kaç zamanlama
+# aktif" sorgusu zamanlama sayısından bağımsız O(1)'dir.
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+# Bu kadar değişiklikten büyük yazmalar index'i fark dizisiyle günceller
+SCHEDULE_INDEX_DIFF_THRESHOLD = 32
+
+
+def _time_to_minutes(time_str):
+    h, m = map(int, time_str.split(':'))
+    return h * 60 + m
+
+
+def _schedule_week_intervals(schedule):
+    """Zamanlamanın aktif olduğu haftalık dakika aralıkları (yarı açık)."""
+    if not schedule.get("enabled", True):
+        return []
+
+    pause_minutes = _time_to_minutes(schedule["pause_time"])
     resume_minutes = None
     if schedule.get("resume_time"):
-        resume_h, resume_m = map(int, schedule["resume_time"].split(':'))
-        resume_minutes = resume_h * 60 + resume_m
+        resume_minutes = _time_to_minutes(schedule["resume_time"])
 
     if resume_minutes is None:
         # Süresiz: pause_time'dan sonra gün sonuna kadar aktif
-        return current_minutes >= pause_minutes
-
-    # Zaman penceresi kontrolü
-    if pause_minutes <= resume_minutes:
-        return pause_minutes <= current_minutes < resume_minutes
+        day_ranges = [(pause_minutes, DAY_MINUTES)]
+    elif pause_minutes <= resume_minutes:
+        day_ranges = [(pause_minutes, resume_minutes)]
     else:
-        # Gece yarısı geçişi (ör: 23:00 → 09:00)
-        return current_minutes >= pause_minutes or current_minutes < resume_minutes
+        # Gece yarısı geçişi (ör: 23:00 → 09:00) — aynı günün sabahı da aktif
+        day_ranges = [(pause_minutes, DAY_MINUTES), (0, resume_minutes)]
+
+    # Gün kontrolü (0=Pazartesi, 6=Pazar, boş = her gün)
+    days = schedule.get("days") or range(7)
+    return [
+        (day * DAY_MINUTES + start, day * DAY_MINUTES + end)
+        for day in days
+        for start, end in day_ranges
+        if start < end
+    ]
 
 
-def _is_any_schedule_active():
-    """Herhangi bir zamanlama aktif mi?"""
-    return any(_check_schedule_active(s) for s in _schedules)
+def _build_schedule_index(schedules):
+    """Zamanlamalardan indexi baştan kurar (fark dizisi ile O(n + hafta)).
 
+    (index, {id: aralıklar}) döner.
+    """
+    diff = [0] * (WEEK_MINUTES + 1)
+    intervals = {}
+    for schedule in schedules:
+        ranges = _schedule_week_intervals(schedule)
+        intervals[schedule["id"]] = ranges
+        for start, end in ranges:
+            diff[start] += 1
+            diff[end] -= 1
+
+    counts = array('i', bytes(4 * WEEK_MINUTES))
+    running = 0
+    for minute in range(WEEK_MINUTES):
+        running += diff[minute]
+        counts[minute] = running
+    return counts, intervals
+
+
+def _index_apply(counts, ranges, delta, diff=None):
+    """Aralıkları index'e ekler (delta=1) veya çıkarır (delta=-1).
+
+    diff verilirse yalnızca fark dizisine işlenir; _index_apply_diff uygular.
+    """
+    if diff is not None:
+        for start, end in ranges:
+            diff[start] += delta
+            diff[end] -= delta
+        return
+    for start, end in ranges:
+        for minute in range(start, end):
+            counts[minute] += delta
 
-def _format_remaining(minutes):
+
+def _index_apply_diff(counts, diff):
+    """Biriken fark dizisini index'e tek geçişte uygular (O(hafta))."""
+    running = 0
+    for minute in range(WEEK_MINUTES):
+        running += diff[minute]
+        if running:
+            counts[minute] += running
+
+
+def _week_minute(now):
+    return now.weekday() * DAY_MINUTES + now.hour * 60 + now.minute
+
+
+def _check_schedule_active(schedule, now=None, snap=None):
+    """Tek bir zamanlamanın şu an aktif olup olmadığını kontrol eder."""
+    if now is None:
+        now = _now()
+    minute = _week_minute(now)
+    ranges = (snap or _snapshot).intervals.get(schedule.get("id"))
+    if ranges is None:
+        ranges = _schedule_week_intervals(schedule)
+    return any(start <= minute < end for start, end in ranges)
+
+
+def _active_schedule_count(now=None, snap=None):
+    """Şu an aktif olan zamanlama sayısı (index üzerinden O(1))."""
+    if now is None:
+        now = _now()
+    return (snap or _snapshot).index[_week_minute(now)]
+
+
+def _is_any_schedule_active(now=None):
+    """Herhangi bir zamanlama aktif mi?"""
+    return _active_schedule_count(now) > 0
+
+
+# ============================================================
+# REVISIONS
+# ============================================================
+# Zamanlama, ayar ve vakit verisi için monoton revizyon sayaçları. ETag'ler
+# ve /api/schedules?since=<rev> delta senkronu bunlara dayanır. Sayaçlar
+# bellekte tutulur; ETag'lere eklenen _BOOT_ID sayesinde yeniden başlatma
+# sonrası eski ETag'ler eşleşmez.
+
+_BOOT_ID = format(int(time.time() * 1000), 'x')
+
+# Silinen zamanlamalar en fazla bu kadar hatırlanır (tombstone)
+SCHEDULE_TOMBSTONE_LIMIT = 1000
+
+
+def _bump_schedule_revision(draft, schedule_id, deleted=False):
+    """Zamanlama değişikliğini taslağın revizyon geçmişine işler."""
+    draft["revision"] += 1
+    revision = draft["revision"]
+    if deleted:
+        draft["revs"].pop(schedule_id, None)
+        tombstones = draft["tombstones"]
+        tombstones[schedule_id] = revision
+        if len(tombstones) > SCHEDULE_TOMBSTONE_LIMIT:
+            # Bir id yalnızca bir kez silinir; ekleme sırası revizyon sırasıdır
+            oldest = next(iter(tombstones))
+            # Bu revizyondan eski silmeler unutuldu; daha eski since için tam liste döner
+            draft["floor"] = tombstones.pop(oldest)
+    else:
+        draft["tombstones"].pop(schedule_id, None)
+        draft["revs"][schedule_id] = revision
+
+
+# ============================================================
+# STATE SNAPSHOT
+# ============================================================
+# Zamanlamalar, index, revizyonlar, ayarlar ve sistem açık/kapalı durumu tek
+# bir değişmez snapshot'ta tutulur. Okuyucular `snap = _snapshot` ile tek bir
+# referans alır ve kilitsiz çalışır; yazıcılar _write_lock altında kopya
+# üzerinde değişiklik yapıp yeni snapshot'ı tek atamayla yayınlar. Bir okuyucu
+# yarım uygulanmış bir değişikliği asla görmez. Snapshot içindeki dict'ler ve
+# zamanlama dict'leri yayınlandıktan sonra değiştirilmez.
+
+_Snapshot = namedtuple('_Snapshot', [
+    'version',             # her yayında artar (/state cache anahtarı)
+    'schedules',           # zamanlama dict'lerinden tuple (oluşturma sırasıyla)
+    'next_id',
+    'index',               # haftalık dakika index'i (array)
+    'intervals',           # id → haftalık aralıklar
+    'schedules_revision',
+    'schedule_revs',       # id → zamanlamanın son değiştiği revizyon
+    'tombstones',          # silinen id → silindiği revizyon
+    'tombstone_floor',
+    'settings',
+    'settings_revision',
+    'system_enabled',
+])
+
+_write_lock = threading.Lock()
+_snapshot = _Snapshot(
+    version=1, schedules=(), next_id=1, index=array('i', bytes(4 * WEEK_MINUTES)),
+    intervals={}, schedules_revision=1, schedule_revs={}, tombstones={}, tombstone_floor=0,
+    settings=dict(DEFAULT_SETTINGS), settings_revision=1, system_enabled=True,
+)
+
+
+def _publish(**changes):
+    """Değişikliklerle yeni snapshot'ı yayınlar. Çağıran _write_lock'u tutmalıdır."""
+    global _snapshot
+    _snapshot = _snapshot._replace(version=_snapshot.version + 1, **changes)
+    if _shared_writer is not None:
+        # İşçiler yazıyı, isteği yapan cevabı almadan önce görür
+        _shared_write()
+        _shared_changed()
+
+
+def _schedule_fields(schedules, next_id, revision):
+    """Zamanlama listesinden snapshot alanlarını (index dahil) kurar."""
+    index, intervals = _build_schedule_index(schedules)
+    return {
+        "schedules": tuple(schedules),
+        "next_id": next_id,
+        "index": index,
+        "intervals": intervals,
+        "schedule_revs": {s["id"]: revision for s in schedules},
+    }
+
+
+def _schedule_draft(snap, changes=1):
+    """Snapshot'ın zamanlama alanlarının yazılabilir kopyası.
+
+    changes, uygulanacak değişiklik sayısının tahminidir; eşiği aşarsa index
+    güncellemeleri yayında tek geçişte uygulanmak üzere biriktirilir.
+    """
+    batch = changes > SCHEDULE_INDEX_DIFF_THRESHOLD
+    return {
+        "schedules": {s["id"]: s for s in snap.schedules},
+        "next_id": snap.next_id,
+        "index": snap.index[:],
+        "index_diff": [0] * (WEEK_MINUTES + 1) if batch else None,
+        "intervals": dict(snap.intervals),
+        "revision": snap.schedules_revision,
+        "revs": dict(snap.schedule_revs),
+        "tombstones": dict(snap.tombstones),
+        "floor": snap.tombstone_floor,
+    }
+
+
+def _draft_put(draft, schedule):
+    """Eklenen / güncellenen zamanlamayı taslağa ve indexine işler."""
+    schedule_id = schedule["id"]
+    _index_apply(draft["index"], draft["intervals"].get(schedule_id, ()), -1, draft["index_diff"])
+    ranges = _schedule_week_intervals(schedule)
+    _index_apply(draft["index"], ranges, 1, draft["index_diff"])
+    draft["intervals"][schedule_id] = ranges
+    draft["schedules"][schedule_id] = schedule
+    _bump_schedule_revision(draft, schedule_id)
+
+
+def _draft_delete(draft, schedule_id):
+    """Zamanlamayı taslaktan ve indexinden çıkarır."""
+    _index_apply(draft["index"], draft["intervals"].pop(schedule_id, ()), -1, draft["index_diff"])
+    del draft["schedules"][schedule_id]
+    _bump_schedule_revision(draft, schedule_id, deleted=True)
+
+
+def _publish_schedule_draft(draft):
+    if draft["index_diff"] is not None:
+        _index_apply_diff(draft["index"], draft["index_diff"])
+    _publish(
+        schedules=tuple(draft["schedules"].values()),
+        next_id=draft["next_id"],
+        index=draft["index"],
+        intervals=draft["intervals"],
+        schedules_revision=draft["revision"],
+        schedule_revs=draft["revs"],
+        tombstones=draft["tombstones"],
+        tombstone_floor=draft["floor"],
+    )
+
+
+def _conditional_response(tag, build):
+    """If-None-Match ETag ile eşleşirse gövdesiz 304, değilse build() cevabı."""
+    tag = f"{_BOOT_ID}-{tag}"
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(tag, weak=True)
+    # Tarayıcı cache'i her seferinde ETag ile doğrulasın
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _format_remaining(minutes):
     """Kalan süreyi formatlar"""
     if minutes < 0:
         minutes = 0
@@ -338,74 +2583,163 @@ def _format_remaining(minutes):
     return f"{mins} dakika"
 
 
-def _get_current_state(prayer_times):
-    """
-    Bir sonraki vakti, kalan süreyi ve state'i hesaplar.
-
-    State:
-    - PAUSING: Ezan vakti geldi, pause penceresi içinde
-    - ACTIVE: Normal çalışma
-    """
-    tz = pytz.timezone('Europe/Istanbul')
-    now = datetime.now(tz)
-    current_minutes = now.hour * 60 + now.minute
-    current_seconds = now.hour * 3600 + now.minute * 60 + now.second
-
-    # Vakitleri saniyeye çevir
-    times_in_seconds = []
+# ============================================================
+# TIMELINE
+# ============================================================
+# Bugün + yarının vakitleri tek seferde derlenir:
+#   points: pause pencerelerinin sıralı [başlangıç, bitiş, başlangıç, bitiş, ...]
+#           epoch saniyeleri — bisect sonucu tek ise PAUSING
+#   vakit_epochs / vakit_keys: sıralı vakit zamanları — bir sonraki vakit için
+# Her ilçenin kendi timeline'ı vardır; gün veya o ilçenin vakit verisi
+# (_district_revisions) değişince yeniden derlenir.
+
+# Varsayılan vakitlerle derlenen timeline bu kadar saniye sonra yeniden denenir
+TIMELINE_FALLBACK_TTL_SECONDS = 60
+# İlçe başına timeline'ların toplam bellek bütçesi (LRU). Bir timeline sabit
+# boyutludur (~en fazla 30 pause sınırı + 10 vakit); yaklaşık 1 KB.
+TIMELINE_CACHE_MAX_BYTES = 1024 * 1024
+
+# district_id → timeline (en son kullanılan sonda)
+_timelines = OrderedDict()
+_timelines_bytes = 0
+_timelines_lock = threading.Lock()
+
+
+def _parse_day_times(prayer_times, day, tz):
+    """Bir günün "HH:MM" vakitlerini (vakit_key, epoch) listesine çevirir."""
+    result = []
     for key in VAKIT_ORDER:
         t = prayer_times.get(key, "00:00")
         h, m = map(int, t.split(':'))
-        times_in_seconds.append((key, h * 3600 + m * 60))
-
-    # PAUSING kontrolü — ezan vaktinden PRE_PAUSE_OFFSET_SECONDS önce başlar
-    state = "ACTIVE"
-    day_seconds = 24 * 3600
-    for _vakit_key, vakit_seconds in times_in_seconds:
-        pause_start = vakit_seconds - PRE_PAUSE_OFFSET_SECONDS
-        pause_end = pause_start + PAUSE_DURATION_SECONDS
-
-        if pause_start >= 0 and pause_end <= day_seconds:
-            # Normal aralık
-            if pause_start <= current_seconds < pause_end:
-                state = "PAUSING"
-                break
-        elif pause_start < 0:
-            # Gece yarısı öncesine sarkan başlangıç
-            if current_seconds >= (pause_start + day_seconds) or current_seconds < pause_end:
-                state = "PAUSING"
-                break
+        dt = tz.localize(datetime(day.year, day.month, day.day, h, m))
+        result.append((key, int(dt.timestamp())))
+    return result
+
+
+def _merge_intervals(intervals):
+    """[(başlangıç, bitiş), ...] aralıklarını sıralayıp çakışan / bitişik olanları
+    birleştirir; düz [başlangıç, bitiş, ...] dizisi döner (bisect sonucu tek ise içeride)."""
+    points = array('q')
+    for start, end in sorted(intervals):
+        if points and start <= points[-1]:
+            points[-1] = max(points[-1], end)
         else:
-            # Gece yarısını geçen bitiş
-            adjusted_end = pause_end - day_seconds
-            if current_seconds >= pause_start or current_seconds < adjusted_end:
-                state = "PAUSING"
-                break
+            points.extend([start, end])
+    return points
+
+
+def _pause_points(vakit_epochs):
+    """Vakit epoch'larından birleştirilmiş pause pencerelerini derler."""
+    windows = []
+    for epoch in vakit_epochs:
+        pause_start = epoch - PRE_PAUSE_OFFSET_SECONDS
+        windows.append((pause_start, pause_start + PAUSE_DURATION_SECONDS))
+    return _merge_intervals(windows)
+
+
+def _build_timeline(now, district_id, city):
+    """Bugün ve yarın için pause pencerelerini ve vakit zamanlarını derler."""
+    tz = now.tzinfo
+    tomorrow = now + timedelta(days=1)
+    today_times = get_prayer_times(city=city, date=now, district_id=district_id)
+    tomorrow_times = get_prayer_times(city=city, date=tomorrow, district_id=district_id)
 
-    # Bir sonraki vakti bul
-    next_vakit = None
-    remaining_minutes = 0
+    today = _parse_day_times(today_times, now.date(), tz)
+    upcoming = _parse_day_times(tomorrow_times, tomorrow.date(), tz)
 
-    for vakit_key, vakit_seconds in times_in_seconds:
-        vakit_minutes = vakit_seconds // 60
-        if vakit_minutes > current_minutes:
-            next_vakit = vakit_key
-            remaining_minutes = vakit_minutes - current_minutes
+    # Dünün pencereleri bugünün vakitleriyle yaklaşıklanır (gece yarısına sarkan
+    # pencereler için); ek bir upstream isteği yapılmaz.
+    yesterday = [(key, epoch - 24 * 3600) for key, epoch in today]
+
+    points = _pause_points(epoch for _vakit_key, epoch in yesterday + today + upcoming)
+
+    # Gün döndükçe store'un ileri tarihleri arka planda tamamlanır
+    _start_prayer_prefetch(district_id)
+
+    vakits = today + upcoming
+    midnight = tz.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day))
+    valid_until = int(midnight.timestamp())
+
+    # Vakitlerden biri offline hesaptan geldiyse kısa süre sonra tekrar dene
+    for day in (now, tomorrow):
+        if f"diyanet_{district_id}_{day.strftime('%Y-%m-%d')}" not in prayer_times_cache:
+            valid_until = min(valid_until, int(now.timestamp()) + TIMELINE_FALLBACK_TTL_SECONDS)
             break
 
-    # Bugün kalan vakit yoksa → yarının İmsak vakti
-    if next_vakit is None:
+    tl = {
+        "district_id": district_id,
+        "revision": _district_revisions.get(district_id, 0),
+        "valid_until": valid_until,
+        "points": points,
+        "vakit_epochs": array('q', (epoch for _key, epoch in vakits)),
+        "vakit_keys": tuple(key for key, _epoch in vakits),
+    }
+    return tl
+
+
+def _get_timeline(now, district_id=None, city=None):
+    """İlçenin geçerli timeline'ını döndürür, gerekirse yeniden derler."""
+    if district_id is None:
+        district_id, city = _default_location()
+
+    tl = _timelines.get(district_id)
+    if (tl is not None and tl["revision"] == _district_revisions.get(district_id, 0)
+            and now.timestamp() < tl["valid_until"]):
+        return tl
+
+    tl = _build_timeline(now, district_id, city)
+    _timeline_put(tl)
+    return tl
+
+
+def _timeline_put(tl):
+    """Timeline'ı LRU'ya ekler (varsa eskisinin yerine) ve bütçeyi uygular."""
+    global _timelines_bytes
+    tl["nbytes"] = (sys.getsizeof(tl) + sys.getsizeof(tl["points"])
+                    + sys.getsizeof(tl["vakit_epochs"]) + sys.getsizeof(tl["vakit_keys"]))
+    with _timelines_lock:
+        old = _timelines.pop(tl["district_id"], None)
+        if old is not None:
+            _timelines_bytes -= old["nbytes"]
+        _timelines[tl["district_id"]] = tl
+        _timelines_bytes += tl["nbytes"]
+        # Bellek bütçesi aşıldıysa en uzun süredir kullanılmayanları at
+        while _timelines_bytes > TIMELINE_CACHE_MAX_BYTES and len(_timelines) > 1:
+            _old_id, evicted = _timelines.popitem(last=False)
+            _timelines_bytes -= evicted["nbytes"]
+
+
+def _touch_timeline(district_id):
+    """LRU sırasını günceller (timeline kullanıldı)."""
+    with _timelines_lock:
+        if district_id in _timelines:
+            _timelines.move_to_end(district_id)
+
+
+def _get_current_state(district_id=None, city=None):
+    """
+    Bir sonraki vakti, kalan süreyi ve state'i hesaplar.
+
+    State:
+    - PAUSING: Ezan vakti geldi, pause penceresi içinde
+    - ACTIVE: Normal çalışma
+    """
+    now = _now()
+    tl = _get_timeline(now, district_id, city)
+    _touch_timeline(tl["district_id"])
+
+    now_ts = now.timestamp()
+    state = "PAUSING" if bisect.bisect_right(tl["points"], now_ts) % 2 else "ACTIVE"
+
+    # Bir sonraki vakit: dakika başından sonraki ilk vakit (bugün veya yarın)
+    minute_ts = int(now_ts) - now.second
+    idx = bisect.bisect_right(tl["vakit_epochs"], minute_ts)
+    if idx < len(tl["vakit_epochs"]):
+        next_vakit = tl["vakit_keys"][idx]
+        remaining_minutes = (tl["vakit_epochs"][idx] - minute_ts) // 60
+    else:
         next_vakit = "Fajr"
-        # Yarının gerçek İmsak vaktini al
-        try:
-            tomorrow = now + timedelta(days=1)
-            tomorrow_times = get_prayer_times(date=tomorrow)
-            fajr_str = tomorrow_times.get("Fajr", "06:00")
-            fh, fm = map(int, fajr_str.split(':'))
-            fajr_minutes = fh * 60 + fm
-        except Exception:
-            fajr_minutes = times_in_seconds[0][1] // 60
-        remaining_minutes = (24 * 60 - current_minutes) + fajr_minutes
+        remaining_minutes = 0
 
     vakit_display = VAKIT_NAMES.get(next_vakit, next_vakit)
     remaining_str = _format_remaining(remaining_minutes)
@@ -417,285 +2751,1965 @@ def _get_current_state(prayer_times):
 # ROUTES
 # ============================================================
 
-@app.route('/state')
-def get_state():
+def _district_arg():
+    """?district= parametresini çözer.
+
+    (district_id, city, hata) döner; parametre yoksa ayarlardaki şehir kullanılır
+    ve district_id None olur.
     """
-    Ana state endpoint'i — Tauri UI 5 saniyede bir poll eder.
+    value = request.args.get('district')
+    if value is None or not value.strip():
+        return None, None, None
+    resolved = _resolve_district(value)
+    if resolved is None:
+        return None, None, f"Bilinmeyen ilçe: {value}"
+    return resolved[0], resolved[1], None
 
-    State modeli:
-    - ACTIVE: Normal çalışma
-    - PAUSING: Ezan vakti, pause penceresi içinde
-    - MANUAL_PAUSE: Zamanlama tarafından durduruldu
-    - DISABLED: Kullanıcı sistemi kapattı
+
+# /state cevap cache'i: district_id (varsayılan konum için None) →
+# (anahtar, geçerlilik sonu epoch, JSON gövdesi, ETag, başlıklar). Anahtar dakika,
+# snapshot sürümü ve vakit revizyonundan oluşur; kayıt bir sonraki state
+# geçişinde geçersizleşir.
+_state_response_cache = {}
+
+
+def _compute_state_payload(district_id=None, city=None, snap=None):
+    """/state cevabını verilen (yoksa güncel) snapshot'a göre hesaplar.
+
+    Varsayılan konum için _last_known_state'i günceller; başka bir ilçe
+    istendiğinde değerler her seferinde hesaplanır.
+    Hata durumunda son bilinen state "stale": True ile döner.
     """
     global _last_known_state
 
-    if not _system_enabled:
-        return jsonify({
+    if snap is None:
+        snap = _snapshot
+    default = district_id is None or district_id == _default_district_id()
+
+    if not snap.system_enabled and default:
+        return {
             "time": _last_known_state["time"],
             "vakit": _last_known_state["vakit"],
             "remaining": _last_known_state["remaining"],
             "state": "DISABLED"
-        })
+        }
 
     try:
-        prayer_times = get_prayer_times()
-
-        tz = pytz.timezone('Europe/Istanbul')
-        now = datetime.now(tz)
+        now = _now()
         current_time = now.strftime('%H:%M')
 
-        vakit, remaining, state = _get_current_state(prayer_times)
+        vakit, remaining, state = _get_current_state(district_id, city)
+
+        if not snap.system_enabled:
+            return {"time": current_time, "vakit": vakit, "remaining": remaining,
+                    "state": "DISABLED"}
 
         # Zamanlama önceliği: MANUAL_PAUSE > PAUSING
-        if _is_any_schedule_active():
+        active_schedules = _active_schedule_count(now, snap)
+        if active_schedules:
             state = "MANUAL_PAUSE"
 
-        active_schedules = sum(1 for s in _schedules if s.get("enabled") and _check_schedule_active(s))
-
-        _last_known_state = {
+        payload = {
             "time": current_time,
             "vakit": vakit,
             "remaining": remaining,
             "state": state,
             "schedules_active": active_schedules,
-            "schedules_total": len(_schedules)
+            "schedules_total": len(snap.schedules)
         }
-
-        return jsonify(_last_known_state)
+        if default:
+            _last_known_state = payload
+        return payload
 
     except Exception as e:
-        logger.error(f"Error in get_state: {str(e)}")
-        return jsonify(_last_known_state)
+        logger.error("Error in get_state: %s", e)
+        # Geçici hatanın cevabı önbelleğe/ETag'e girmesin diye işaretlenir
+        return dict(_last_known_state, stale=True)
+
+
+def _prayer_tag(district_id=None):
+    """Konumun vakit verisi revizyonu (None = ayarlardaki konum)."""
+    if district_id is None:
+        return _prayer_revision
+    return f"{district_id}.{_district_revisions.get(district_id, 0)}"
+
+
+@bp.route('/state')
+def get_state():
+    """
+    Ana state endpoint'i — stream kullanılamadığında Tauri UI 5 saniyede bir poll eder.
+
+    ?district=<şehir adı veya Diyanet ilçe id> verilirse o konumun vakitleri
+    kullanılır; verilmezse ayarlardaki şehir.
+
+    State modeli:
+    - ACTIVE: Normal çalışma
+    - PAUSING: Ezan vakti, pause penceresi içinde
+    - MANUAL_PAUSE: Zamanlama tarafından durduruldu
+    - DISABLED: Kullanıcı sistemi kapattı
+    """
+    district_id, city, error = _district_arg()
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    # Pause sınırları ve zamanlamalar dakika başlarına denk gelir; aynı dakika
+    # ve aynı revizyonlarda cevap değişmez.
+    prayer_tag = _prayer_tag(district_id)
+    snap = _snapshot
+    now_ts = _now_ts()
+    key = (int(now_ts) // 60, snap.version, prayer_tag)
+
+    cached = _state_response_cache.get(district_id)
+    if cached is None or cached[0] != key or now_ts >= cached[1]:
+        with _profile_phase("state"):
+            payload = _compute_state_payload(district_id, city, snap)
+        with _profile_phase("serialization"):
+            body = jsonify(payload).get_data()
+        if payload.get("stale"):
+            # Hata yedeği: bir sonraki istek yeniden hesaplamayı denemeli
+            return Response(body, mimetype='application/json',
+                            headers=[('Cache-Control', 'no-store')])
+        tag = f"{_BOOT_ID}-st-{key[0]}-{key[1]}-{key[2]}"
+        headers = [('ETag', quote_etag(tag, weak=True)), ('Cache-Control', 'no-cache')]
+        cached = (key, _next_transition_ts(now_ts, district_id), body, tag, headers)
+        _state_response_cache[district_id] = cached
+
+    # _conditional_response ile aynı cevap; başlıklar önceden hazırlandığı için
+    # isabet yolu bir sözlük araması ve tampon yazımıdır.
+    if request.if_none_match.contains_weak(cached[3]):
+        return Response(status=304, headers=cached[4])
+    return Response(cached[2], mimetype='application/json', headers=cached[4])
+
+
+# ============================================================
+# STATE STREAM (Server-Sent Events)
+# ============================================================
+# Her abone bir waitress thread'ini bağlantı boyunca tutar; bu yüzden abone
+# sayısı sınırlıdır ve normal istekler için en az iki thread boşta kalır.
+# Stream, state değiştiğinde (toggle, zamanlama, ayar) uyandırılır; aksi halde
+# bir sonraki bilinen geçişe (pause sınırı / dakika başı) kadar uyur.
 
+# Okuyucular kilitsiz snapshot kullandığından thread sayısı güvenle artırılabilir
+WAITRESS_THREADS = 8
+STREAM_MAX_SUBSCRIBERS = 2
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_RETRY_MS = 3000
 
-@app.route('/state/toggle', methods=['POST'])
+_state_changed = threading.Condition()
+_state_version = 0
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_SUBSCRIBERS)
+
+
+def _notify_state_change():
+    """Stream abonelerini uyandırır (toggle, zamanlama veya ayar değişikliği)."""
+    global _state_version
+    with _state_changed:
+        _state_version += 1
+        _state_changed.notify_all()
+
+
+def _next_transition_ts(now_ts, district_id=None):
+    """now_ts'ten sonraki ilk bilinen state geçişinin epoch'u.
+
+    /state cevabındaki saat ve kalan süre dakika çözünürlüklü olduğundan dakika
+    başı da bir geçiştir; zamanlamalar da dakika sınırlarında değişir.
+    """
+    next_ts = (int(now_ts) // 60 + 1) * 60
+    tl = _timelines.get(district_id or _default_district_id())
+    if tl is not None:
+        idx = bisect.bisect_right(tl["points"], now_ts)
+        if idx < len(tl["points"]):
+            next_ts = min(next_ts, tl["points"][idx])
+        next_ts = min(next_ts, tl["valid_until"])
+    return next_ts
+
+
+def _seconds_until_next_transition():
+    """Bir sonraki bilinen state geçişine kalan süre (varsayılan konum)."""
+    now_ts = _now_ts()
+    return max(_next_transition_ts(now_ts) - now_ts, 0.05)
+
+
+def _state_stream():
+    """State değiştikçe SSE event'leri üretir."""
+    last_body = None
+    last_prayer_key = None
+    last_sent = time.monotonic()
+
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    while True:
+        with _state_changed:
+            version = _state_version
+
+        body = json.dumps(_compute_state_payload(), ensure_ascii=False)
+        if body != last_body:
+            last_body = body
+            last_sent = time.monotonic()
+            yield f"event: state\ndata: {body}\n\n"
+
+        # Vakit verisi veya şehir değiştiyse UI'nin vakit tablosunu yenilemesini iste
+        prayer_key = (_default_district_id(), _prayer_revision)
+        if prayer_key != last_prayer_key:
+            if last_prayer_key is not None:
+                last_sent = time.monotonic()
+                yield "event: prayer-times\ndata: {}\n\n"
+            last_prayer_key = prayer_key
+
+        heartbeat_in = STREAM_HEARTBEAT_SECONDS - (time.monotonic() - last_sent)
+        if heartbeat_in <= 0:
+            last_sent = time.monotonic()
+            yield ": heartbeat\n\n"
+            continue
+
+        timeout = min(_seconds_until_next_transition(), heartbeat_in)
+        with _state_changed:
+            if _state_version == version:
+                _state_changed.wait(timeout)
+
+
+@bp.route('/state/stream')
+def stream_state():
+    """State değişikliklerini Server-Sent Events olarak yayınlar."""
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({"success": False, "error": "Stream abone sınırına ulaşıldı"}), 503
+
+    response = Response(_state_stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(_stream_slots.release)
+    return response
+
+
+@bp.route('/state/toggle', methods=['POST'])
 def toggle_state():
     """Sistemi aç/kapat."""
-    global _system_enabled
-
     try:
         data = request.get_json() or {}
         if 'enabled' in data:
-            _system_enabled = bool(data['enabled'])
-            logger.info(f"System {'enabled' if _system_enabled else 'disabled'}")
+            enabled = bool(data['enabled'])
+            with _write_lock:
+                _publish(system_enabled=enabled)
+            _notify_state_change()
+            logger.info("System %s", 'enabled' if enabled else 'disabled')
 
-        return jsonify({"success": True, "enabled": _system_enabled})
+        return jsonify({"success": True, "enabled": _snapshot.system_enabled})
     except Exception as e:
-        logger.error(f"Error in toggle_state: {str(e)}")
-        return jsonify({"success": False, "enabled": _system_enabled})
+        logger.error("Error in toggle_state: %s", e)
+        return jsonify({"success": False, "enabled": _snapshot.system_enabled})
 
 
-@app.route('/api/prayer-times')
+@bp.route('/api/prayer-times')
 def api_prayer_times():
     """Günlük vakit saatlerini döndürür (dashboard timeline için).
-    Tüm vakitler geçmişse yarının vakitlerini döner."""
-    tz = pytz.timezone('Europe/Istanbul')
-    now = datetime.now(tz)
-    current_minutes = now.hour * 60 + now.minute
+    Tüm vakitler geçmişse yarının vakitlerini döner.
+    ?district=<şehir adı veya ilçe id> ile başka bir konum istenebilir."""
+    district_id, city, error = _district_arg()
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    now = _now()
+    tl = _get_timeline(now, district_id, city)
+    _touch_timeline(tl["district_id"])
+    district_id = tl["district_id"]
+
+    # Tüm vakitler geçmiş mi: dakika başı bugünün son vaktine ulaştı mı
+    minute_ts = int(now.timestamp()) - now.second
+    is_tomorrow = minute_ts >= tl["vakit_epochs"][len(VAKIT_ORDER) - 1]
+    day = now + timedelta(days=1) if is_tomorrow else now
+
+    # Vakitler store'da yoksa offline hesaptır; UI bunu devre durumuyla birlikte gösterir
+    upstream_state = _breaker["state"]
+    tag = (f"pt-{day.strftime('%Y%m%d')}-{district_id}-{_district_revisions.get(district_id, 0)}"
+           f"-{upstream_state}")
+    return _conditional_response(
+        tag, lambda: jsonify({
+            'times': get_prayer_times(city=city, date=day, district_id=district_id),
+            'is_tomorrow': is_tomorrow,
+            'source': "diyanet" if _store_get(district_id, day.strftime('%Y-%m-%d')) else "offline",
+            'upstream': upstream_state,
+        })
+    )
 
-    times = get_prayer_times()
 
-    # Tüm vakitler geçmiş mi kontrol et
-    all_passed = True
-    for key in VAKIT_ORDER:
-        t = times.get(key, "00:00")
-        h, m = map(int, t.split(':'))
-        if h * 60 + m > current_minutes:
-            all_passed = False
-            break
+@bp.route('/api/upstream')
+def api_upstream():
+    """Diyanet bağlantısının devre kesici durumu ("offline" iken vakitler offline hesaptır)."""
+    return jsonify({"success": True, **_breaker_status()})
+
+
+@bp.route('/api/providers')
+def api_providers():
+    """Vakit sağlayıcılarının hedge bütçeleri, kazanma / hata sayıları ve son uyuşmazlıklar."""
+    return jsonify({"success": True, **_providers_status()})
 
-    if all_passed:
-        tomorrow = now + timedelta(days=1)
-        times = get_prayer_times(date=tomorrow)
-        return jsonify({'times': times, 'is_tomorrow': True})
 
-    return jsonify({'times': times, 'is_tomorrow': False})
+@bp.route('/api/prayer-times/offline-check')
+def api_offline_check():
+    """Offline hesaplanan vakitleri store'daki Diyanet verisiyle karşılaştırır."""
+    tolerance = request.args.get('tolerance', OFFLINE_TOLERANCE_MINUTES, type=int)
+    return jsonify({"success": True, **_verify_offline_times(tolerance)})
 
 
-@app.route('/api/schedules', methods=['GET'])
+@bp.route('/api/districts')
+def api_districts():
+    """Konum araması (search-as-you-type): ?q=<önek>&limit=<n>.
+
+    Türkçe harf ve aksan farkları yok sayılır ("kadikoy" → "Kadıköy").
+    """
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', DISTRICT_SEARCH_DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= DISTRICT_SEARCH_MAX_LIMIT:
+        return jsonify({"success": False,
+                        "error": f"limit 1 ile {DISTRICT_SEARCH_MAX_LIMIT} arasında olmalı"}), 400
+
+    results = [
+        {"id": district_id, "name": name, "city": city,
+         "province": PROVINCE_NAMES.get(city, city), "center": center}
+        for district_id, name, city, center in search_districts(query, limit)
+    ]
+    return jsonify({"success": True, "query": query, "results": results})
+
+
+@bp.route('/api/schedules', methods=['GET'])
 def get_schedules():
-    """Tüm zamanlamaları listele."""
-    tz = pytz.timezone('Europe/Istanbul')
-    now = datetime.now(tz)
-    current_day = now.weekday()
+    """Tüm zamanlamaları listele.
 
-    result = []
-    for s in _schedules:
-        result.append({
-            **s,
-            "is_active_now": _check_schedule_active(s),
-            "day_names": [DAY_NAMES_TR[d] for d in s.get("days", [])]
-        })
+    ?since=<rev>&boot=<id> verilirse yalnızca o revizyondan sonra değişen
+    zamanlamalar ve silinen id'ler döner (delta). Revizyon sayacı her açılışta
+    sıfırlandığından "boot" verilmemişse veya farklıysa (ya da silme geçmişi
+    unutulduysa) tam liste döner ve "full": true olur. Değişmeyen
+    zamanlamaların is_active_now alanı için tam liste kullanılmalıdır.
+    """
+    now = _now()
+    snap = _snapshot
+
+    since = request.args.get('since', type=int)
+    boot = request.args.get('boot')
+    full = (since is None or boot != _BOOT_ID or since > snap.schedules_revision
+            or since < snap.tombstone_floor)
+
+    def build():
+        current_day = now.weekday()
+        result = []
+        for s in snap.schedules:
+            if not full and snap.schedule_revs.get(s["id"], 0) <= since:
+                continue
+            result.append({
+                **s,
+                "is_active_now": _check_schedule_active(s, now, snap),
+                "day_names": [DAY_NAMES_TR[d] for d in s.get("days", [])]
+            })
+
+        payload = {
+            "success": True,
+            "schedules": result,
+            "revision": snap.schedules_revision,
+            "boot": _BOOT_ID,
+            "full": full,
+            "current_day": current_day,
+            "current_day_name": DAY_NAMES_TR[current_day]
+        }
+        if not full:
+            payload["deleted"] = [i for i, rev in snap.tombstones.items() if rev > since]
+        return jsonify(payload)
+
+    # is_active_now dakikaya bağlı olduğundan ETag dakikayı da içerir
+    tag = f"sc-{int(now.timestamp()) // 60}-{snap.schedules_revision}-{since if not full else 'full'}"
+    return _conditional_response(tag, build)
 
-    return jsonify({
-        "success": True,
-        "schedules": result,
-        "current_day": current_day,
-        "current_day_name": DAY_NAMES_TR[current_day]
-    })
 
+def _apply_schedule_changes(creates=(), updates=(), deletes=(), replace=False):
+    """Doğrulanmış değişiklikleri yeni bir snapshot olarak yayınlar ve tek bir
+    journal commit'i ile kalıcı yapar.
 
-@app.route('/api/schedules', methods=['POST'])
+    creates: [alanlar], updates: [(id, alanlar)], deletes: {id}; replace=True
+    mevcut tüm zamanlamaları siler. Güncellenecek / silinecek bir id artık yoksa
+    KeyError fırlatır ve hiçbir şey uygulanmaz.
+    (oluşturulanlar, güncellenenler, silinen id'ler) döner.
+    """
+    with _write_lock:
+        changes = len(creates) + len(updates) + (len(_snapshot.schedules) if replace else len(deletes))
+        draft = _schedule_draft(_snapshot, changes)
+        schedules = draft["schedules"]
+        if replace:
+            deletes = set(schedules)
+        for schedule_id in [*deletes, *(schedule_id for schedule_id, _fields in updates)]:
+            if schedule_id not in schedules:
+                raise KeyError(schedule_id)
+
+        records = []
+        created = []
+        for fields in creates:
+            schedule = {
+                "id": draft["next_id"],
+                "pause_time": fields['pause_time'],
+                "resume_time": fields['resume_time'],
+                "days": fields['days'],
+                "label": fields['label'],
+                "enabled": fields['enabled']
+            }
+            draft["next_id"] += 1
+            _draft_put(draft, schedule)
+            records.append({"op": "put", "schedule": schedule, "next_id": draft["next_id"]})
+            created.append(schedule)
+
+        updated = []
+        for schedule_id, fields in updates:
+            schedule = {**schedules[schedule_id], **fields}
+            _draft_put(draft, schedule)
+            records.append({"op": "put", "schedule": schedule, "next_id": draft["next_id"]})
+            updated.append(schedule)
+
+        deleted = sorted(deletes)
+        for schedule_id in deleted:
+            _draft_delete(draft, schedule_id)
+            records.append({"op": "delete", "id": schedule_id, "next_id": draft["next_id"]})
+
+        if not records:
+            return created, updated, deleted
+        _publish_schedule_draft(draft)
+        done = _journal_enqueue(records)
+
+    with _profile_phase("disk_write"):
+        done.wait()
+    _notify_state_change()
+    return created, updated, deleted
+
+
+@bp.route('/api/schedules', methods=['POST'])
 def add_schedule():
     """Yeni zamanlama ekle."""
-    global _schedule_next_id
-
     try:
         data = request.get_json() or {}
 
-        if 'pause_time' not in data:
-            return jsonify({"success": False, "error": "pause_time gerekli"}), 400
+        fields, error = _validate_schedule_fields(data)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
 
-        if not _validate_time_format(data['pause_time']):
-            return jsonify({"success": False, "error": "Geçersiz pause_time formatı (HH:MM)"}), 400
+        schedule = _apply_schedule_changes(creates=[fields])[0][0]
 
-        resume_time = data.get('resume_time')
-        if resume_time and not _validate_time_format(resume_time):
-            return jsonify({"success": False, "error": "Geçersiz resume_time formatı (HH:MM)"}), 400
+        logger.info("Schedule added: #%s %s-%s days=%s", schedule['id'], schedule['pause_time'],
+                    schedule.get('resume_time', 'süresiz'), schedule['days'])
 
-        days = data.get('days', [])
-        if not isinstance(days, list):
-            return jsonify({"success": False, "error": "days bir liste olmalı"}), 400
-        for d in days:
-            if not isinstance(d, int) or d < 0 or d > 6:
-                return jsonify({"success": False, "error": "days 0-6 arası integer olmalı"}), 400
+        return jsonify({"success": True, "schedule": schedule})
 
-        schedule = {
-            "id": _schedule_next_id,
-            "pause_time": data['pause_time'],
-            "resume_time": resume_time,
-            "days": sorted(days),
-            "label": data.get('label', ''),
-            "enabled": True
-        }
+    except Exception as e:
+        logger.error("Error adding schedule: %s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route('/api/schedules/<int:schedule_id>', methods=['PUT'])
+def update_schedule(schedule_id):
+    """Zamanlama güncelle (enabled toggle, zaman değişikliği vb.)."""
+    try:
+        data = request.get_json() or {}
+
+        if schedule_id not in _snapshot.intervals:
+            return jsonify({"success": False, "error": "Zamanlama bulunamadı"}), 404
 
-        _schedules.append(schedule)
-        _schedule_next_id += 1
-        _save_schedules()
+        # Önce tüm alanları doğrula, sonra uygula (index yarım güncellemede kalmasın)
+        fields, error = _validate_schedule_fields(data, partial=True)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
 
-        logger.info(f"Schedule added: #{schedule['id']} {schedule['pause_time']}-{schedule.get('resume_time', 'süresiz')} days={schedule['days']}")
+        schedule = _apply_schedule_changes(updates=[(schedule_id, fields)])[1][0]
+        logger.info("Schedule updated: #%s", schedule_id)
 
         return jsonify({"success": True, "schedule": schedule})
 
+    except KeyError:
+        return jsonify({"success": False, "error": "Zamanlama bulunamadı"}), 404
+
     except Exception as e:
-        logger.error(f"Error adding schedule: {str(e)}")
+        logger.error("Error updating schedule: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/schedules/<int:schedule_id>', methods=['PUT'])
-def update_schedule(schedule_id):
-    """Zamanlama güncelle (enabled toggle, zaman değişikliği vb.)."""
+@bp.route('/api/schedules/<int:schedule_id>', methods=['DELETE'])
+def delete_schedule(schedule_id):
+    """Zamanlama sil."""
+    try:
+        _apply_schedule_changes(deletes={schedule_id})
+    except KeyError:
+        return jsonify({"success": False, "error": "Zamanlama bulunamadı"}), 404
+    logger.info("Schedule deleted: #%s", schedule_id)
+
+    return jsonify({"success": True})
+
+
+# ============================================================
+# SIMULATION
+# ============================================================
+# State makinesi bir zaman aralığı için olay bazlı çözülür: günlük vakitlerden
+# pause pencereleri, haftalık index'ten zamanlama aralıkları derlenir ve
+# yalnızca bu aralıkların sınırlarında state hesaplanır. Bir yıl birkaç bin
+# sınır noktasıdır; saniye saniye yürümeye gerek kalmaz.
+
+# Tek simülasyonda izin verilen en uzun aralık
+SIMULATION_MAX_DAYS = 400
+
+
+def _store_get_range(district_id, start_str, end_str):
+    """Store'daki [start_str, end_str] günlerini {date_str: times} olarak döndürür."""
+    try:
+        with _store_lock:
+            rows = _store_db().execute(
+                "SELECT date, fajr, dhuhr, asr, maghrib, isha FROM prayer_times"
+                " WHERE district_id = ? AND date >= ? AND date <= ?",
+                (district_id, start_str, end_str)
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.error("Prayer store read error: %s", e)
+        return {}
+    return {row[0]: dict(zip(VAKIT_ORDER, row[1:])) for row in rows}
+
+
+def _simulation_prayer_days(district_id, city, first_day, days):
+    """Her gün için vakitler; store'da olmayan günler offline hesaplanır."""
+    last_day = first_day + timedelta(days=days - 1)
+    stored = _store_get_range(district_id, first_day.strftime('%Y-%m-%d'),
+                              last_day.strftime('%Y-%m-%d'))
+    if len(stored) == days:
+        return sorted(stored.items())
+    offline = compute_prayer_times_bulk([city], first_day, days)[city]
+    return [(date_str, stored.get(date_str, times)) for date_str, times in offline]
+
+
+def _simulation_vakits(prayer_days, tz):
+    """Günlük vakitlerden (vakit_key, epoch) çiftleri üretir."""
+    for date_str, times in prayer_days:
+        y, m, d = map(int, date_str.split('-'))
+        midnight = int(tz.localize(datetime(y, m, d)).timestamp())
+        for key in VAKIT_ORDER:
+            h, mi = map(int, times[key].split(':'))
+            yield key, midnight + h * 3600 + mi * 60
+
+
+def _simulation_vakit_epochs(prayer_days, tz):
+    for _key, epoch in _simulation_vakits(prayer_days, tz):
+        yield epoch
+
+
+def _tile_weekly(ranges, start_dt, end_ts):
+    """Haftalık dakika aralıklarını start_dt'nin haftasından end_ts'e kadar
+    epoch aralıklarına döşer. Aralıkların ek alanları (sebep vb.) korunur;
+    sonuç hafta ve aralık sırasındadır."""
+    tz = start_dt.tzinfo
+    monday = start_dt.date() - timedelta(days=start_dt.weekday())
+    intervals = []
+    while True:
+        base = int(tz.localize(datetime(monday.year, monday.month, monday.day)).timestamp())
+        if base >= end_ts:
+            break
+        intervals.extend((base + a * 60, base + b * 60, *rest) for a, b, *rest in ranges)
+        monday += timedelta(days=7)
+    return intervals
+
+
+# Son derlenen haftalık aktif aralıklar: (index, aralıklar). Her yayın yeni
+# bir index array'i ürettiğinden kimlikle karşılaştırılır.
+_weekly_runs_cache = None
+
+
+def _weekly_runs(snap):
+    """Index'te en az bir zamanlamanın aktif olduğu birleştirilmiş haftalık
+    aralıklar: [(başlangıç, bitiş, başlatan zamanlama, en son biten zamanlama), ...].
+
+    Snapshot başına bir kez derlenir. Bir aralık index'te sıfırdan çıktığı
+    dakikada en az bir zamanlama başlar, sıfıra indiği dakikada biri biter;
+    sebepler bu dakikalardan bulunur.
+    """
+    global _weekly_runs_cache
+    cached = _weekly_runs_cache
+    if cached is not None and cached[0] is snap.index:
+        return cached[1]
+
+    index = snap.index
+    runs = []
+    run_start = None
+    for minute in range(WEEK_MINUTES):
+        if index[minute]:
+            if run_start is None:
+                run_start = minute
+        elif run_start is not None:
+            runs.append((run_start, minute))
+            run_start = None
+    if run_start is not None:
+        runs.append((run_start, WEEK_MINUTES))
+
+    if runs:
+        # Aynı dakikada başlayanlardan en uzunu, bitenlerden en erken başlayanı
+        starts = {}
+        ends = {}
+        for schedule in snap.schedules:
+            for start, end in snap.intervals.get(schedule["id"], ()):
+                if start not in starts or end > starts[start][0]:
+                    starts[start] = (end, schedule)
+                if end not in ends or start < ends[end][0]:
+                    ends[end] = (start, schedule)
+        runs = [(start, end, starts[start][1], ends[end][1]) for start, end in runs]
+    _weekly_runs_cache = (index, runs)
+    return runs
+
+
+def _schedule_points(start_dt, end_ts):
+    """Haftalık index'i start_dt'nin haftasından end_ts'e kadar döşer;
+    aktif zamanlaması olan aralıkların birleştirilmiş sınırlarını döndürür."""
+    runs = [(start, end) for start, end, _first, _last in _weekly_runs(_snapshot)]
+    if not runs:
+        return array('q')
+    return _merge_intervals(_tile_weekly(runs, start_dt, end_ts))
+
+
+def simulate(start, end, step=None, district_id=None, city=None):
+    """[start, end) aralığındaki tüm ACTIVE / PAUSING / MANUAL_PAUSE geçişleri.
+
+    start / end tz-aware datetime'dır. step (saniye) verilirse state yalnızca
+    start + k*step anlarında örneklenir (UI poll'u gibi); step'ten kısa süren
+    durumlar görünmeyebilir. [(epoch, state), ...] döner; ilk eleman start
+    anındaki state'tir. Sistem açık (DISABLED değil) varsayılır.
+    """
+    if district_id is None:
+        district_id = _default_district_id()
+    if city is None:
+        resolved = _resolve_district(district_id)
+        city = resolved[1] if resolved else "ISTANBUL"
+
+    tz = _tz()
+    start = start.astimezone(tz)
+    start_ts = int(start.timestamp())
+    end_ts = int(end.timestamp())
+
+    # Gece yarısına sarkan pencereler için önceki gün de derlenir
+    first_day = start.date() - timedelta(days=1)
+    days = (end.astimezone(tz).date() - first_day).days + 1
+    prayer_days = _simulation_prayer_days(district_id, city, first_day, days)
+    pause = _pause_points(_simulation_vakit_epochs(prayer_days, tz))
+    manual = _schedule_points(start, end_ts)
+
+    bounds = {start_ts}
+    for points in (pause, manual):
+        lo = bisect.bisect_right(points, start_ts)
+        hi = bisect.bisect_left(points, end_ts)
+        bounds.update(points[lo:hi])
+    if step:
+        # Her sınır, ondan sonraki ilk örnekleme anında görülür
+        bounds = {start_ts + -(-(b - start_ts) // step) * step for b in bounds}
+        bounds = {b for b in bounds if b < end_ts}
+
+    transitions = []
+    last_state = None
+    for ts in sorted(bounds):
+        if bisect.bisect_right(manual, ts) % 2:
+            state = "MANUAL_PAUSE"
+        elif bisect.bisect_right(pause, ts) % 2:
+            state = "PAUSING"
+        else:
+            state = "ACTIVE"
+        if state != last_state:
+            transitions.append((ts, state))
+            last_state = state
+    return transitions
+
+
+def _parse_simulation_time(value, default):
+    """ISO 8601 zamanı ayrıştırır; saat dilimi yoksa İstanbul kabul edilir."""
+    if value is None:
+        return default
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = _tz().localize(parsed)
+    return parsed
+
+
+@bp.route('/api/simulate')
+def api_simulate():
+    """State makinesini bir zaman aralığı için simüle eder.
+
+    ?start=&end= ISO 8601 (varsayılan: şimdiden itibaren 24 saat),
+    ?step=<saniye> ile poll örneklemesi, ?district= ile konum.
+    """
+    district_id, city, error = _district_arg()
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    try:
+        start = _parse_simulation_time(request.args.get('start'), _now())
+        end = _parse_simulation_time(request.args.get('end'), start + timedelta(days=1))
+    except ValueError:
+        return jsonify({"success": False, "error": "Geçersiz tarih formatı (ISO 8601)"}), 400
+    step = request.args.get('step', type=int)
+
+    if end <= start:
+        return jsonify({"success": False, "error": "end, start'tan sonra olmalı"}), 400
+    if end - start > timedelta(days=SIMULATION_MAX_DAYS):
+        return jsonify({"success": False,
+                        "error": f"Aralık en fazla {SIMULATION_MAX_DAYS} gün olabilir"}), 400
+    if step is not None and step <= 0:
+        return jsonify({"success": False, "error": "step pozitif olmalı"}), 400
+
+    tz = _tz()
+    transitions = simulate(start, end, step, district_id, city)
+    return jsonify({
+        "success": True,
+        "start": start.astimezone(tz).isoformat(),
+        "end": end.astimezone(tz).isoformat(),
+        "step": step,
+        "count": len(transitions),
+        "transitions": [
+            {"time": datetime.fromtimestamp(ts, tz).isoformat(), "state": state}
+            for ts, state in transitions
+        ],
+    })
+
+
+# ============================================================
+# NEXT EVENTS
+# ============================================================
+# Sıradaki mute / unmute geçişleri. İstemci bunlarla yerel zamanlayıcı kurar
+# ve /state poll'unu seyrek bir tutarlılık kontrolüne indirebilir. Vakit ve
+# zamanlama pencereleri simülasyondaki gibi derlenir, ancak her pencere
+# sebebini (vakit / zamanlama id) taşır. Çakışan ya da bitişik pencereler
+# (gece yarısını geçenler dahil) tek bir mute aralığıdır.
+
+NEXT_EVENTS_DEFAULT_COUNT = 10
+NEXT_EVENTS_MAX_COUNT = 100
+# İlk bakılan ufuk; yeterli olay yoksa SIMULATION_MAX_DAYS'e kadar ikiye katlanır
+NEXT_EVENTS_INITIAL_DAYS = 2
+
+
+def _schedule_cause(schedule):
+    return {"type": "schedule", "id": schedule["id"], "label": schedule.get("label", "")}
+
+
+def _mute_windows(start, end_ts, district_id, city, snap):
+    """[(başlangıç, bitiş, başlatan sebep, biten sebep), ...] ham mute pencereleri.
+
+    Zamanlamalar tek tek değil, index'in birleştirilmiş haftalık aralıkları
+    olarak döşenir; maliyet zamanlama sayısından bağımsızdır.
+    """
+    tz = start.tzinfo
+    first_day = start.date() - timedelta(days=1)
+    days = (datetime.fromtimestamp(end_ts, tz).date() - first_day).days + 1
+    prayer_days = _simulation_prayer_days(district_id, city, first_day, days)
+
+    windows = []
+    for key, epoch in _simulation_vakits(prayer_days, tz):
+        pause_start = epoch - PRE_PAUSE_OFFSET_SECONDS
+        cause = {"type": "prayer", "vakit": key, "name": VAKIT_NAMES.get(key, key)}
+        windows.append((pause_start, pause_start + PAUSE_DURATION_SECONDS, cause, cause))
+
+    # Hafta sınırında bitişik aralıklar tek pencere olur
+    merged = []
+    for run_start, run_end, first, last in _tile_weekly(_weekly_runs(snap), start, end_ts):
+        if merged and run_start <= merged[-1][1]:
+            merged[-1][1] = run_end
+            merged[-1][3] = last
+        else:
+            merged.append([run_start, run_end, first, last])
+    windows.extend((run_start, run_end, _schedule_cause(first), _schedule_cause(last))
+                   for run_start, run_end, first, last in merged)
+    return windows
+
+
+def next_events(now, count, district_id=None, city=None, snap=None):
+    """now'dan sonraki ilk count mute / unmute geçişi.
+
+    (şu an mute mı, [(epoch, "mute"|"unmute", sebep), ...]) döner. Mute
+    sebebi aralığı başlatan, unmute sebebi en son biten penceredir. Sistem
+    kapalıysa hiçbir şey susturulmaz; liste boştur.
+
+    Ufuk yeterli olay bulunana kadar genişler. Vakitler günlük, zamanlamalar
+    haftalık tekrarlar; bir haftalık genişleme yeni olay getirmediyse sonrakiler
+    de getirmez (ör. sürekli mute) ve arama durur.
+    """
+    if snap is None:
+        snap = _snapshot
+    if not snap.system_enabled:
+        return False, []
+    if district_id is None:
+        district_id = _default_district_id()
+    if city is None:
+        resolved = _resolve_district(district_id)
+        city = resolved[1] if resolved else "ISTANBUL"
+
+    now = now.astimezone(_tz())
+    now_ts = int(now.timestamp())
+    horizon = NEXT_EVENTS_INITIAL_DAYS
+    previous = None
+    while True:
+        end_ts = now_ts + horizon * 86400
+        windows = sorted(_mute_windows(now, end_ts, district_id, city, snap),
+                         key=lambda w: (w[0], -w[1]))
+        # Nöbetçi son açık aralığı kapatır
+        windows.append((math.inf, math.inf, None, None))
+
+        muted = False
+        events = []
+        run_end = None
+        for start, end, start_cause, end_cause in windows:
+            if run_end is not None and start > run_end:
+                if run_start <= now_ts < run_end:
+                    muted = True
+                if now_ts < run_start < end_ts:
+                    events.append((run_start, "mute", run_start_cause))
+                # Ufka değen aralık ufkun ötesinde uzayabilir; bitişi kesin değil
+                if now_ts < run_end < end_ts:
+                    events.append((run_end, "unmute", run_end_cause))
+                run_end = None
+            if start_cause is None:
+                break
+            if run_end is None:
+                run_start, run_end = start, end
+                run_start_cause, run_end_cause = start_cause, end_cause
+            elif end > run_end:
+                run_end, run_end_cause = end, end_cause
+
+        if len(events) >= count or horizon >= SIMULATION_MAX_DAYS:
+            return muted, events[:count]
+        if previous is not None and horizon - previous[0] >= 7 and len(events) == previous[1]:
+            return muted, events
+        previous = (horizon, len(events))
+        horizon = min(horizon * 2, SIMULATION_MAX_DAYS)
+
+
+@bp.route('/api/next-events')
+def api_next_events():
+    """Sıradaki mute / unmute geçişleri (?count=N, ?district=).
+
+    Her olay kesin epoch'u, sebebini ve hesaplandığı revizyonu taşır; revizyon
+    değiştiğinde (zamanlama, ayar, vakit verisi) istemci listeyi yenilemelidir.
+    """
+    district_id, city, error = _district_arg()
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    count = request.args.get('count', NEXT_EVENTS_DEFAULT_COUNT, type=int)
+    if not 1 <= count <= NEXT_EVENTS_MAX_COUNT:
+        return jsonify({"success": False,
+                        "error": f"count 1 ile {NEXT_EVENTS_MAX_COUNT} arasında olmalı"}), 400
+
+    snap = _snapshot
+    revision = f"{_BOOT_ID}-{snap.version}-{_prayer_tag(district_id)}"
+    now = _now()
+    muted, events = next_events(now, count, district_id, city, snap)
+
+    tz = _tz()
+    return jsonify({
+        "success": True,
+        "now": int(now.timestamp()),
+        "enabled": snap.system_enabled,
+        "muted": muted,
+        "revision": revision,
+        "events": [
+            {"epoch": ts, "time": datetime.fromtimestamp(ts, tz).isoformat(),
+             "action": action, "cause": cause, "revision": revision}
+            for ts, action, cause in events
+        ],
+    })
+
+
+# ============================================================
+# CALENDAR
+# ============================================================
+# Uzun aralıklar için gün gün NDJSON takvim: vakitler, pause pencereleri ve
+# etkin zamanlama pencereleri. Günler CALENDAR_CHUNK_DAYS'lik parçalar halinde
+# yerel store'dan (yoksa offline hesapla) okunur ve hemen yazılır; bellek
+# kullanımı aralığın uzunluğundan bağımsızdır, upstream'e istek atılmaz.
+
+CALENDAR_MAX_DAYS = 366
+CALENDAR_CHUNK_DAYS = 31
+
+
+def _calendar_chunk(district_id, city, first_day, days):
+    """[(date_str, times, kaynak), ...]; store'da olmayan günler offline hesaplanır."""
+    last_day = first_day + timedelta(days=days - 1)
+    stored = _store_get_range(district_id, first_day.strftime('%Y-%m-%d'),
+                              last_day.strftime('%Y-%m-%d'))
+    if len(stored) == days:
+        return [(date_str, times, "diyanet") for date_str, times in sorted(stored.items())]
+    offline = compute_prayer_times_bulk([city], first_day, days)[city]
+    return [
+        (date_str, stored[date_str], "diyanet") if date_str in stored
+        else (date_str, times, "offline")
+        for date_str, times in offline
+    ]
+
+
+def _calendar_lines(first_day, days, district_id, city, snap):
+    """Her gün için bir NDJSON satırı üretir."""
+    tz = _tz()
+
+    def iso(ts):
+        return datetime.fromtimestamp(ts, tz).isoformat()
+
+    # Zamanlama pencereleri haftanın gününe göre bir kez gruplanır
+    weekday_windows = [[] for _ in range(7)]
+    for schedule in snap.schedules:
+        for start, end in snap.intervals.get(schedule["id"], ()):
+            weekday_windows[start // DAY_MINUTES].append(
+                (start % DAY_MINUTES, end - start, schedule))
+    for windows in weekday_windows:
+        windows.sort(key=lambda w: w[0])
+
+    for offset in range(0, days, CALENDAR_CHUNK_DAYS):
+        chunk_first = first_day + timedelta(days=offset)
+        chunk = _calendar_chunk(district_id, city, chunk_first,
+                                min(CALENDAR_CHUNK_DAYS, days - offset))
+        for date_str, times, source in chunk:
+            y, m, d = map(int, date_str.split('-'))
+            day = datetime(y, m, d)
+            midnight = int(tz.localize(day).timestamp())
+            weekday = day.weekday()
+
+            pause_windows = []
+            for key in VAKIT_ORDER:
+                h, mi = map(int, times[key].split(':'))
+                pause_start = midnight + h * 3600 + mi * 60 - PRE_PAUSE_OFFSET_SECONDS
+                pause_windows.append({
+                    "vakit": key,
+                    "name": VAKIT_NAMES.get(key, key),
+                    "start": iso(pause_start),
+                    "end": iso(pause_start + PAUSE_DURATION_SECONDS),
+                })
+
+            schedule_windows = [
+                {"id": schedule["id"], "label": schedule.get("label", ""),
+                 "start": iso(midnight + start * 60),
+                 "end": iso(midnight + (start + length) * 60)}
+                for start, length, schedule in weekday_windows[weekday]
+            ]
+
+            yield json.dumps({
+                "date": date_str,
+                "weekday": weekday,
+                "day_name": DAY_NAMES_TR[weekday],
+                "source": source,
+                "prayer_times": {key: times[key] for key in VAKIT_ORDER},
+                "pause_windows": pause_windows,
+                "schedule_windows": schedule_windows,
+            }, ensure_ascii=False) + '\n'
+
+
+@bp.route('/api/calendar')
+def api_calendar():
+    """Gün gün takvimi NDJSON olarak stream eder.
+
+    ?from=&to= YYYY-MM-DD (dahil; varsayılan: bugünden itibaren 7 gün),
+    ?district= ile konum. En fazla CALENDAR_MAX_DAYS gün.
+    """
+    district_id, city, error = _district_arg()
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    try:
+        first_day = datetime.strptime(request.args['from'], '%Y-%m-%d') \
+            if 'from' in request.args else _now().replace(tzinfo=None)
+        first_day = first_day.replace(hour=0, minute=0, second=0, microsecond=0)
+        last_day = datetime.strptime(request.args['to'], '%Y-%m-%d') \
+            if 'to' in request.args else first_day + timedelta(days=6)
+    except ValueError:
+        return jsonify({"success": False, "error": "Geçersiz tarih formatı (YYYY-MM-DD)"}), 400
+
+    days = (last_day - first_day).days + 1
+    if days < 1:
+        return jsonify({"success": False, "error": "to, from'dan önce olamaz"}), 400
+    if days > CALENDAR_MAX_DAYS:
+        return jsonify({"success": False,
+                        "error": f"Aralık en fazla {CALENDAR_MAX_DAYS} gün olabilir"}), 400
+
+    if district_id is None:
+        district_id = _default_district_id()
+    if city is None:
+        resolved = _resolve_district(district_id)
+        city = resolved[1] if resolved else "ISTANBUL"
+
+    body = _calendar_lines(first_day, days, district_id, city, _snapshot)
+    return Response(body, mimetype='application/x-ndjson')
+
+
+# ============================================================
+# BULK SCHEDULE API / IMPORT / EXPORT
+# ============================================================
+# Toplu işlemler önce tamamen doğrulanır; tek bir hata bile varsa hiçbir şey
+# uygulanmaz. Geçerliyse hepsi tek journal commit'i ile kalıcı hale gelir.
+
+# Import/batch hatalarında en fazla bu kadar hata döndürülür
+BULK_MAX_ERRORS = 100
+
+# iCalendar'da haftalık tekrarın başlangıcı için sabit bir Pazartesi
+ICS_ANCHOR_MONDAY = datetime(2024, 1, 1)
+ICS_WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+def _bulk_error_response(errors):
+    return jsonify({"success": False, "error": "Doğrulama hatası, hiçbir değişiklik uygulanmadı",
+                    "errors": errors[:BULK_MAX_ERRORS]}), 400
+
+
+def _is_schedule_id(value):
+    """Zamanlama id'si int olmalı (bool hariç)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@bp.route('/api/schedules/batch', methods=['POST'])
+def batch_schedules():
+    """Toplu ekle / güncelle / sil: {"create": [...], "update": [{"id": .., ...}], "delete": [id]}."""
     try:
         data = request.get_json() or {}
+        creates_in = data.get('create', [])
+        updates_in = data.get('update', [])
+        deletes_in = data.get('delete', [])
+        if not all(isinstance(x, list) for x in (creates_in, updates_in, deletes_in)):
+            return jsonify({"success": False, "error": "create, update ve delete liste olmalı"}), 400
+
+        by_id = _snapshot.intervals
+        errors = []
+
+        creates = []
+        for i, item in enumerate(creates_in):
+            fields, error = _validate_schedule_fields(item)
+            if error:
+                errors.append({"op": "create", "index": i, "error": error})
+            else:
+                creates.append(fields)
+
+        deletes = set()
+        for i, schedule_id in enumerate(deletes_in):
+            if not _is_schedule_id(schedule_id):
+                errors.append({"op": "delete", "index": i, "error": "Geçersiz zamanlama id"})
+                continue
+            if schedule_id not in by_id:
+                errors.append({"op": "delete", "index": i, "error": "Zamanlama bulunamadı"})
+            deletes.add(schedule_id)
+
+        updates = []
+        updated_ids = set()
+        for i, item in enumerate(updates_in):
+            schedule_id = item.get('id') if isinstance(item, dict) else None
+            if not _is_schedule_id(schedule_id):
+                errors.append({"op": "update", "index": i, "error": "Geçersiz zamanlama id"})
+                continue
+            if schedule_id not in by_id:
+                errors.append({"op": "update", "index": i, "error": "Zamanlama bulunamadı"})
+                continue
+            if schedule_id in deletes or schedule_id in updated_ids:
+                errors.append({"op": "update", "index": i, "error": "Aynı zamanlama birden fazla işlemde"})
+                continue
+            fields, error = _validate_schedule_fields(item, partial=True)
+            if error:
+                errors.append({"op": "update", "index": i, "error": error})
+                continue
+            updated_ids.add(schedule_id)
+            updates.append((schedule_id, fields))
+
+        if errors:
+            return _bulk_error_response(errors)
+
+        created, updated, deleted = _apply_schedule_changes(creates, updates, deletes)
+        logger.info("Schedules batch: %s created, %s updated, %s deleted",
+                    len(created), len(updated), len(deleted))
 
-        schedule = next((s for s in _schedules if s["id"] == schedule_id), None)
-        if not schedule:
-            return jsonify({"success": False, "error": "Zamanlama bulunamadı"}), 404
+        return jsonify({
+            "success": True,
+            "created": created,
+            "updated": updated,
+            "deleted": deleted
+        })
 
-        if 'pause_time' in data:
-            if not _validate_time_format(data['pause_time']):
-                return jsonify({"success": False, "error": "Geçersiz pause_time"}), 400
-            schedule['pause_time'] = data['pause_time']
+    except KeyError:
+        # Doğrulamadan sonra başka bir istek zamanlamayı silmiş
+        return jsonify({"success": False, "error": "Zamanlama bulunamadı"}), 404
 
-        if 'resume_time' in data:
-            if data['resume_time'] and not _validate_time_format(data['resume_time']):
-                return jsonify({"success": False, "error": "Geçersiz resume_time"}), 400
-            schedule['resume_time'] = data['resume_time']
+    except Exception as e:
+        logger.error("Error in schedules batch: %s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        if 'days' in data:
-            days = data['days']
-            if not isinstance(days, list):
-                return jsonify({"success": False, "error": "days bir liste olmalı"}), 400
-            schedule['days'] = sorted(days)
 
-        if 'label' in data:
-            schedule['label'] = data['label']
+def _ics_escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
 
-        if 'enabled' in data:
-            schedule['enabled'] = bool(data['enabled'])
 
-        _save_schedules()
-        logger.info(f"Schedule updated: #{schedule_id}")
+def _ics_unescape(text):
+    return (text.replace('\\n', '\n').replace('\\N', '\n').replace('\\,', ',')
+            .replace('\\;', ';').replace('\\\\', '\\'))
 
-        return jsonify({"success": True, "schedule": schedule})
+
+def _schedule_to_ics(schedule, stamp):
+    """Zamanlamayı haftalık tekrarlayan bir VEVENT'e çevirir.
+
+    Gece yarısını geçen pencerelerde iCalendar bitişi ertesi güne yazar; bu
+    uygulamadaki "aynı günün sabahı" anlamını korumak için X-PAUSETIME-*
+    alanları da eklenir ve import önce bunlara bakar.
+    """
+    days = schedule.get("days") or []
+    first_day = days[0] if days else 0
+    start_day = ICS_ANCHOR_MONDAY + timedelta(days=first_day)
+    pause_minutes = _time_to_minutes(schedule["pause_time"])
+    start = start_day + timedelta(minutes=pause_minutes)
+    if schedule.get("resume_time"):
+        resume_minutes = _time_to_minutes(schedule["resume_time"])
+        end_day = start_day if resume_minutes > pause_minutes else start_day + timedelta(days=1)
+        end = end_day + timedelta(minutes=resume_minutes)
+    else:
+        end = start_day + timedelta(days=1)
+
+    if days and len(days) < 7:
+        rrule = "FREQ=WEEKLY;BYDAY=" + ",".join(ICS_WEEKDAYS[d] for d in days)
+    else:
+        rrule = "FREQ=DAILY"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:schedule-{schedule['id']}@pausetime",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;TZID=Europe/Istanbul:{start.strftime('%Y%m%dT%H%M%S')}",
+        f"DTEND;TZID=Europe/Istanbul:{end.strftime('%Y%m%dT%H%M%S')}",
+        f"RRULE:{rrule}",
+        f"SUMMARY:{_ics_escape(schedule.get('label') or 'PauseTime')}",
+        f"STATUS:{'CONFIRMED' if schedule.get('enabled', True) else 'CANCELLED'}",
+        f"X-PAUSETIME-PAUSE:{schedule['pause_time']}",
+        f"X-PAUSETIME-DAYS:{','.join(str(d) for d in days)}",
+        f"X-PAUSETIME-ENABLED:{'TRUE' if schedule.get('enabled', True) else 'FALSE'}",
+    ]
+    if schedule.get("resume_time"):
+        lines.append(f"X-PAUSETIME-RESUME:{schedule['resume_time']}")
+    lines.append("END:VEVENT")
+    return "".join(line + "\r\n" for line in lines)
+
+
+def _unfold_ics_lines(lines):
+    """RFC 5545 satır katlamasını açar (boşlukla başlayan satır öncekinin devamıdır)."""
+    previous = None
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and previous is not None:
+            previous += line[1:]
+            continue
+        if previous is not None:
+            yield previous
+        previous = line
+    if previous is not None:
+        yield previous
+
+
+def _iter_ics_events(lines):
+    """iCalendar satırlarından VEVENT'leri {özellik: (parametreler, değer)} olarak üretir."""
+    event = None
+    for line in _unfold_ics_lines(lines):
+        if line == "BEGIN:VEVENT":
+            event = {}
+        elif line == "END:VEVENT":
+            if event is not None:
+                yield event
+            event = None
+        elif event is not None and ':' in line:
+            head, value = line.split(':', 1)
+            name, _sep, params = head.partition(';')
+            event[name.upper()] = (params.upper(), value)
+
+
+def _ics_event_to_schedule(event):
+    """VEVENT'i zamanlama alanlarına (doğrulanmamış) çevirir."""
+    if "X-PAUSETIME-PAUSE" in event:
+        days_value = event.get("X-PAUSETIME-DAYS", ("", ""))[1]
+        data = {
+            "pause_time": event["X-PAUSETIME-PAUSE"][1],
+            "resume_time": event.get("X-PAUSETIME-RESUME", ("", None))[1],
+            "days": [int(d) for d in days_value.split(',') if d.strip().isdigit()],
+            "enabled": event.get("X-PAUSETIME-ENABLED", ("", "TRUE"))[1].upper() != "FALSE",
+        }
+    else:
+        params, start_value = event.get("DTSTART", ("", ""))
+        if "VALUE=DATE" in params or 'T' not in start_value:
+            raise ValueError("Tüm gün etkinlikleri desteklenmiyor")
+        start = datetime.strptime(start_value[:15], '%Y%m%dT%H%M%S')
+        # UTC saat yerel saate çevrilince gece yarısı geçilirse BYDAY günleri de kayar
+        day_shift = 0
+        if start_value.endswith('Z'):
+            local_start = start + timedelta(hours=TURKEY_UTC_OFFSET_HOURS)
+            day_shift = (local_start.date() - start.date()).days
+            start = local_start
+        resume_time = None
+        if "DTEND" in event:
+            end_value = event["DTEND"][1]
+            end = datetime.strptime(end_value[:15], '%Y%m%dT%H%M%S')
+            if end_value.endswith('Z'):
+                end += timedelta(hours=TURKEY_UTC_OFFSET_HOURS)
+            # Gün sonuna kadar süren pencere = süresiz
+            if not (end.hour == 0 and end.minute == 0 and end.date() > start.date()):
+                resume_time = end.strftime('%H:%M')
+
+        rrule = dict(
+            part.split('=', 1) for part in event.get("RRULE", ("", ""))[1].split(';') if '=' in part
+        )
+        if rrule.get("FREQ") == "DAILY":
+            days = []
+        elif rrule.get("BYDAY"):
+            days = sorted({(ICS_WEEKDAYS.index(d[-2:]) + day_shift) % 7
+                           for d in rrule["BYDAY"].split(',') if d[-2:] in ICS_WEEKDAYS})
+        else:
+            days = [start.weekday()]
+        data = {
+            "pause_time": start.strftime('%H:%M'),
+            "resume_time": resume_time,
+            "days": days,
+            "enabled": event.get("STATUS", ("", ""))[1].upper() != "CANCELLED",
+        }
+
+    summary = _ics_unescape(event.get("SUMMARY", ("", ""))[1])
+    data["label"] = "" if summary == "PauseTime" else summary
+    return data
+
+
+def _iter_request_lines():
+    """İstek gövdesini satır satır (tamamını belleğe almadan) okur."""
+    stream = request.stream
+    if not isinstance(stream, io.BufferedIOBase):
+        # werkzeug'un LimitedStream'i satır başına birkaç okuma yapar
+        stream = io.BufferedReader(stream, 64 * 1024)
+    for raw in stream:
+        yield raw.decode('utf-8-sig')
+
+
+@bp.route('/api/schedules/import', methods=['POST'])
+def import_schedules():
+    """NDJSON (satır başına bir zamanlama) veya iCalendar import eder.
+
+    ?format=ndjson|ics (varsayılan Content-Type'a göre), ?mode=append|replace.
+    Tüm kayıtlar doğrulanmadan hiçbir şey uygulanmaz.
+    """
+    try:
+        fmt = request.args.get('format')
+        if fmt is None:
+            fmt = 'ics' if 'calendar' in (request.content_type or '') else 'ndjson'
+        mode = request.args.get('mode', 'append')
+        if fmt not in ('ndjson', 'ics') or mode not in ('append', 'replace'):
+            return jsonify({"success": False, "error": "format ndjson|ics, mode append|replace olmalı"}), 400
+
+        creates = []
+        errors = []
+        if fmt == 'ndjson':
+            items = enumerate(_iter_request_lines(), 1)
+        else:
+            items = enumerate(_iter_ics_events(_iter_request_lines()), 1)
+
+        for position, item in items:
+            try:
+                if fmt == 'ndjson':
+                    if not item.strip():
+                        continue
+                    item = json.loads(item)
+                else:
+                    item = _ics_event_to_schedule(item)
+            except ValueError as e:
+                errors.append({"index": position, "error": str(e)})
+                continue
+            fields, error = _validate_schedule_fields(item)
+            if error:
+                errors.append({"index": position, "error": error})
+            else:
+                creates.append(fields)
+            if len(errors) >= BULK_MAX_ERRORS:
+                break
+
+        if errors:
+            return _bulk_error_response(errors)
+
+        created, _updated, deleted = _apply_schedule_changes(creates, replace=(mode == 'replace'))
+        logger.info("Schedules imported (%s, %s): %s created, %s replaced",
+                    fmt, mode, len(created), len(deleted))
+
+        return jsonify({"success": True, "imported": len(created), "deleted": len(deleted)})
 
     except Exception as e:
-        logger.error(f"Error updating schedule: {str(e)}")
+        logger.error("Error importing schedules: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/schedules/<int:schedule_id>', methods=['DELETE'])
-def delete_schedule(schedule_id):
-    """Zamanlama sil."""
-    global _schedules
+@bp.route('/api/schedules/export')
+def export_schedules():
+    """Zamanlamaları NDJSON veya iCalendar olarak stream eder (?format=ndjson|ics)."""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'ics'):
+        return jsonify({"success": False, "error": "format ndjson|ics olmalı"}), 400
 
-    before_count = len(_schedules)
-    _schedules = [s for s in _schedules if s["id"] != schedule_id]
+    schedules = _snapshot.schedules
 
-    if len(_schedules) == before_count:
-        return jsonify({"success": False, "error": "Zamanlama bulunamadı"}), 404
+    if fmt == 'ndjson':
+        body = (json.dumps(s, ensure_ascii=False) + '\n' for s in schedules)
+        mimetype = 'application/x-ndjson'
+    else:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+        def body():
+            yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//PauseTime//Schedules//TR\r\n"
+            for schedule in schedules:
+                yield _schedule_to_ics(schedule, stamp)
+            yield "END:VCALENDAR\r\n"
+        body = body()
+        mimetype = 'text/calendar'
+
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="pausetime-schedules.{fmt}"'
+    return response
+
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus metin formatında metrikler."""
+    gauges = {
+        "pausetime_schedules": len(_snapshot.schedules),
+        "pausetime_prayer_cache_entries": len(prayer_times_cache),
+        "pausetime_upstream_breaker_open": int(_breaker["state"] != "closed"),
+    }
+    return Response(_render_metrics(gauges), mimetype='text/plain; version=0.0.4')
 
-    _save_schedules()
-    logger.info(f"Schedule deleted: #{schedule_id}")
 
-    return jsonify({"success": True})
+@bp.route('/debug/logs')
+def debug_logs():
+    """Son log kayıtları (en yenisi sonda). ?limit=<n>, ?level=WARNING gibi."""
+    limit = request.args.get('limit', 100, type=int)
+    min_level = logging.getLevelName(request.args.get('level', 'DEBUG').upper())
+    if not isinstance(min_level, int):
+        return jsonify({"success": False, "error": "Geçersiz level"}), 400
+
+    records = [r for r in list(_log_ring) if logging.getLevelName(r["level"]) >= min_level]
+    if limit > 0:
+        records = records[-limit:]
+    return jsonify({"success": True, "logs": records})
+
+
+@bp.route('/debug/profiles')
+def debug_profiles():
+    """Diskteki istek profillerinin özeti (en yenisi sonda)."""
+    directory = _profiles_dir()
+    profiles = []
+    with _profile_store_lock:
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            try:
+                with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profiles.append({key: record.get(key) for key in
+                             ("id", "time", "method", "route", "status", "duration_ms", "slow",
+                              "phases_ms")})
+    enabled, rate, slow_ms = _profile_config()
+    return jsonify({"success": True, "enabled": enabled, "sample_rate": rate,
+                    "slow_ms": slow_ms, "profiles": profiles})
+
+
+@bp.route('/debug/profiles/<profile_id>')
+def debug_profile(profile_id):
+    """Tek bir profili indirir; ?format=collapsed ile flamegraph girdisi (stack sayım)."""
+    if not all(c.isdigit() or c == '-' for c in profile_id):
+        return jsonify({"success": False, "error": "Geçersiz profil id"}), 400
+    path = os.path.join(_profiles_dir(), profile_id + '.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "Profil bulunamadı"}), 404
+
+    if request.args.get('format') == 'collapsed':
+        body = "".join(f"{stack} {count}\n" for stack, count in record["samples"].items())
+        response = Response(body, mimetype='text/plain')
+        extension = 'txt'
+    else:
+        response = jsonify(record)
+        extension = 'json'
+    response.headers['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.{extension}"'
+    return response
 
 
 # ============================================================
 # SETTINGS ENDPOINTS
 # ============================================================
 
-@app.route('/settings', methods=['GET'])
+@bp.route('/settings', methods=['GET'])
 def get_settings():
     """Mevcut ayarları döndürür."""
-    return jsonify({"success": True, "settings": _settings})
+    snap = _snapshot
+    return _conditional_response(
+        f"se-{snap.settings_revision}", lambda: jsonify({"success": True, "settings": snap.settings})
+    )
 
 
-@app.route('/settings', methods=['PUT'])
+@bp.route('/settings', methods=['PUT'])
 def update_settings():
     """Ayarları güncelle (partial update)."""
-    global _settings
-
     try:
         data = request.get_json() or {}
 
         if 'city' in data:
             if not isinstance(data['city'], str) or not data['city'].strip():
                 return jsonify({"success": False, "error": "city boş olamaz"}), 400
-            _settings['city'] = data['city'].strip().upper()
 
-        if 'launch_on_startup' in data:
-            _settings['launch_on_startup'] = bool(data['launch_on_startup'])
+        if 'profile_sample_rate' in data:
+            rate = data['profile_sample_rate']
+            if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+                return jsonify({"success": False, "error": "profile_sample_rate 0 ile 1 arasında olmalı"}), 400
+
+        if 'profile_slow_ms' in data:
+            slow_ms = data['profile_slow_ms']
+            if isinstance(slow_ms, bool) or not isinstance(slow_ms, (int, float)) or slow_ms < 0:
+                return jsonify({"success": False, "error": "profile_slow_ms negatif olamaz"}), 400
+
+        district = None
+        if data.get('district') is not None:
+            district = _resolve_district(data['district'])
+            if district is None:
+                return jsonify({"success": False,
+                                "error": f"Bilinmeyen ilçe: {data['district']}"}), 400
+
+        with _write_lock:
+            settings = dict(_snapshot.settings)
+
+            if 'city' in data:
+                settings['city'] = data['city'].strip().upper()
+                settings['district'] = None
+
+            if 'district' in data:
+                # İlçe seçimi şehri de ilçenin iline çeker (offline hesap için)
+                if district is None or district[0] == DIYANET_DISTRICT_IDS.get(district[1]):
+                    settings['district'] = None
+                else:
+                    settings['district'] = district[0]
+                if district is not None:
+                    settings['city'] = district[1]
+
+            if 'launch_on_startup' in data:
+                settings['launch_on_startup'] = bool(data['launch_on_startup'])
+
+            if 'start_minimized_to_tray' in data:
+                settings['start_minimized_to_tray'] = bool(data['start_minimized_to_tray'])
+
+            if 'close_to_tray' in data:
+                settings['close_to_tray'] = bool(data['close_to_tray'])
+
+            if 'profiling' in data:
+                settings['profiling'] = bool(data['profiling'])
 
-        if 'start_minimized_to_tray' in data:
-            _settings['start_minimized_to_tray'] = bool(data['start_minimized_to_tray'])
+            for key in ('profile_sample_rate', 'profile_slow_ms'):
+                if key in data:
+                    settings[key] = data[key]
 
-        if 'close_to_tray' in data:
-            _settings['close_to_tray'] = bool(data['close_to_tray'])
+            _publish(settings=settings, settings_revision=_snapshot.settings_revision + 1)
+
+        # Disk yazımı zamanlama değişikliklerini ve yayınları bekletmesin
+        with _settings_save_lock:
+            _save_settings(_snapshot.settings)
 
         # Konum değiştiyse cache'i temizle
-        if 'city' in data:
+        if 'city' in data or 'district' in data:
             prayer_times_cache.clear()
-            logger.info(f"Prayer cache cleared (settings changed)")
+            _bump_prayer_revision()
+            _start_prayer_prefetch()
+            logger.info("Prayer cache cleared (settings changed)")
 
-        _save_settings(_settings)
-        logger.info(f"Settings updated: {list(data.keys())}")
+        _notify_state_change()
+        logger.info("Settings updated: %s", list(data.keys()))
 
-        return jsonify({"success": True, "settings": _settings})
+        return jsonify({"success": True, "settings": settings})
 
     except Exception as e:
-        logger.error(f"Error updating settings: {str(e)}")
+        logger.error("Error updating settings: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 
 # ============================================================
 
-if __name__ == '__main__':
-    import sys
-    if '--dev' in sys.argv:
-        app.run(debug=True)
+# ============================================================
+# WORKER MODE (ÇOK SÜREÇ)
+# ============================================================
+# `python app.py --workers N`: sahip (owner) süreç ayarları ve zamanlamaları
+# yükler, tüm yazıları ve kalıcılığı üstlenir; N işçi süreç aynı portu devralıp
+# istekleri GIL'i paylaşmadan sunar. İşçiler değiştiren istekleri (POST / PUT /
+# DELETE) sahip sürecin yalnızca localhost'taki iç portuna iletir.
+#
+# Sahip her yayında derlenmiş snapshot'ı (zamanlamalar, haftalık index,
+# ayarlar, revizyonlar, varsayılan konumun timeline'ı, devre durumu) mmap'lenmiş
+# bir dosyaya yazar. Dosyada iki yuva vardır: yazı boştaki yuvaya yapılır ve
+# başlıktaki 8 baytlık nesil sayacı artırılarak yayınlanır; bu tek yazı tüm
+# işçiler için görünürlük noktasıdır. İşçiler her istekte yalnızca nesli okur,
+# değiştiyse yeni snapshot'ı bir kez çözüp kendi _snapshot'ı olarak yayınlar.
+# Sahip bir yazıyı cevaplamadan önce yayınladığından, cevabı alan istemci
+# sonraki isteğinde hangi işçiye düşerse düşsün yazıyı görür.
+
+WORKER_OWNER_PORT = (int(os.environ['PAUSETIME_WORKER_OWNER'])
+                     if os.environ.get('PAUSETIME_WORKER_OWNER') else None)
+WORKER_INDEX = (int(os.environ['PAUSETIME_WORKER_INDEX'])
+                if os.environ.get('PAUSETIME_WORKER_INDEX') else None)
+SHARED_SNAPSHOT_FILE = os.path.join(APP_DATA_DIR, 'snapshot.mmap')
+# İşçide stream abonelerini uyandırmak ve sahibin ölümünü fark etmek için
+SHARED_WATCH_INTERVAL_SECONDS = 0.5
+# Bir yuva büyüdüğünde ayrılan en küçük alan
+SHARED_MIN_SLOT_BYTES = 64 * 1024
+WORKER_RESTART_DELAY_SECONDS = 1
+WORKER_FORWARD_TIMEOUT_SECONDS = 30
+WORKER_FORWARD_METHODS = frozenset(('POST', 'PUT', 'DELETE', 'PATCH'))
+# İletilen cevaptan işçinin cevabına taşınan başlıklar (CORS işçide eklenir)
+WORKER_FORWARD_HEADERS = frozenset(('content-type', 'etag', 'cache-control', 'content-disposition'))
+
+_shared_writer = None
+_shared_reader = None
+_shared_lock = threading.Lock()
+_shared_dirty = threading.Event()
+_shared_generation = 0
+
+
+class _SharedSnapshotFile:
+    """Başlık + iki yuvalı mmap dosyası.
+
+    Başlık: magic, nesil, (ofset, uzunluk) × 2. Nesil n'in verisi n % 2
+    yuvasındadır. Okuyucu nesli, yuvayı ve tekrar nesli okur; arada nesil
+    değiştiyse (yazıcı yuvayı yeniden kullandıysa) yeniden dener.
+    """
+    MAGIC = b'PTSNAP01'
+    HEADER = struct.Struct('<8sQQQQQ')
+    DATA_OFFSET = 64
+
+    def __init__(self, path, create=False):
+        flags = os.O_RDWR | (os.O_CREAT | os.O_TRUNC if create else 0)
+        self._fd = os.open(path, flags, 0o600)
+        if create:
+            os.ftruncate(self._fd, self.DATA_OFFSET)
+            os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, 0, 0, 0, 0, 0), 0)
+        self._map()
+        if self._mm[:8] != self.MAGIC:
+            raise ValueError(f"not a snapshot file: {path}")
+        # Yalnızca yazıcıda: yuva → (ofset, kapasite)
+        self._slots = [(0, 0), (0, 0)]
+
+    def _map(self):
+        self._mm = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+
+    def generation(self):
+        return struct.unpack_from('<Q', self._mm, 8)[0]
+
+    def write(self, payload):
+        """Yükü boştaki yuvaya yazar ve yeni nesli yayınlar."""
+        generation = self.generation() + 1
+        slot = generation % 2
+        offset, capacity = self._slots[slot]
+        if len(payload) > capacity:
+            # Yuva dosyanın sonunda yeniden ayrılır; eski alan boşa kalır
+            offset = len(self._mm)
+            capacity = max(2 * len(payload), SHARED_MIN_SLOT_BYTES)
+            os.ftruncate(self._fd, offset + capacity)
+            self._mm.close()
+            self._map()
+            self._slots[slot] = (offset, capacity)
+        self._mm[offset:offset + len(payload)] = payload
+        struct.pack_into('<QQ', self._mm, 16 + 16 * slot, offset, len(payload))
+        struct.pack_into('<Q', self._mm, 8, generation)
+        return generation
+
+    def read(self, known):
+        """(nesil, yük) döner; nesil known ile aynıysa yük None'dır."""
+        while True:
+            generation = self.generation()
+            if generation == known:
+                return generation, None
+            offset, length = struct.unpack_from('<QQ', self._mm, 16 + 16 * (generation % 2))
+            if offset + length > len(self._mm):
+                # Yazıcı dosyayı büyüttü
+                self._mm.close()
+                self._map()
+                continue
+            payload = self._mm[offset:offset + length]
+            if self.generation() == generation:
+                return generation, payload
+
+
+_SHARED_DOC_LEN = struct.Struct('<I')
+
+
+def _shared_encode(snap, tl):
+    """Snapshot'ı (JSON + ham index baytları) paylaşılan yük biçimine çevirir."""
+    doc = {
+        "boot_id": _BOOT_ID,
+        "version": snap.version,
+        "schedules": snap.schedules,
+        "next_id": snap.next_id,
+        "intervals": list(snap.intervals.items()),
+        "schedules_revision": snap.schedules_revision,
+        "schedule_revs": list(snap.schedule_revs.items()),
+        "tombstones": list(snap.tombstones.items()),
+        "tombstone_floor": snap.tombstone_floor,
+        "settings": snap.settings,
+        "settings_revision": snap.settings_revision,
+        "system_enabled": snap.system_enabled,
+        "prayer_revision": _prayer_revision,
+        "district_revisions": dict(_district_revisions),
+        "upstream": dict(_breaker),
+        "timeline": None if tl is None else {
+            "district_id": tl["district_id"],
+            "revision": tl["revision"],
+            "valid_until": tl["valid_until"],
+            "points": tl["points"].tolist(),
+            "vakit_epochs": tl["vakit_epochs"].tolist(),
+            "vakit_keys": tl["vakit_keys"],
+        },
+    }
+    body = json.dumps(doc, separators=(',', ':')).encode('utf-8')
+    return _SHARED_DOC_LEN.pack(len(body)) + body + snap.index.tobytes()
+
+
+def _shared_timeline():
+    """Varsayılan konumun güncel timeline'ı (yoksa veya eskidiyse None)."""
+    district_id = _default_district_id()
+    tl = _timelines.get(district_id)
+    if tl is None or tl["revision"] != _district_revisions.get(district_id, 0):
+        return None
+    return tl
+
+
+def _shared_write():
+    """Sahip: mevcut snapshot'ı paylaşılan dosyaya yayınlar."""
+    with _shared_lock:
+        # Snapshot kilit içinde okunur: sonraki yazı asla daha eski bir snapshot taşımaz
+        _shared_writer.write(_shared_encode(_snapshot, _shared_timeline()))
+
+
+def _shared_changed():
+    """Sahip: snapshot dışı paylaşılan veri (vakitler, devre) değişti; yayıncıyı uyandırır."""
+    if _shared_writer is not None:
+        _shared_dirty.set()
+
+
+def _shared_publisher_loop():
+    """Sahip: varsayılan konumun timeline'ını güncel tutar ve değiştikçe yayınlar."""
+    published = None
+    while True:
+        _shared_dirty.clear()
+        timeout = TIMELINE_FALLBACK_TTL_SECONDS
+        try:
+            now = _now()
+            tl = _get_timeline(now)
+            timeout = max(tl["valid_until"] - now.timestamp(), 1)
+            key = (id(tl), _prayer_revision, _breaker["state"], _breaker["failures"])
+            if key != published:
+                _shared_write()
+                published = key
+        except Exception as e:
+            logger.error("Shared snapshot publish failed: %s", e)
+        _shared_dirty.wait(timeout)
+
+
+def _shared_adopt(payload):
+    """İşçi: paylaşılan yükü çözüp yerel snapshot olarak yayınlar."""
+    global _snapshot, _prayer_revision, _district_revisions, _BOOT_ID
+    (length,) = _SHARED_DOC_LEN.unpack_from(payload)
+    doc = json.loads(payload[_SHARED_DOC_LEN.size:_SHARED_DOC_LEN.size + length])
+    # ETag'ler ve ?since= revizyonları hangi işçiden gelirse gelsin geçerli olsun
+    _BOOT_ID = doc["boot_id"]
+    index = array('i')
+    index.frombytes(payload[_SHARED_DOC_LEN.size + length:])
+
+    prayer_changed = doc["prayer_revision"] != _prayer_revision
+    _district_revisions = doc["district_revisions"]
+    _prayer_revision = doc["prayer_revision"]
+    with _breaker_lock:
+        _breaker.update(doc["upstream"])
+    if prayer_changed:
+        # Sahip yeni vakitleri store'a yazdı; bellek cache'i store'dan tazelensin
+        prayer_times_cache.clear()
+    if doc["timeline"] is not None:
+        tl = doc["timeline"]
+        _timeline_put({
+            "district_id": tl["district_id"],
+            "revision": tl["revision"],
+            "valid_until": tl["valid_until"],
+            "points": array('q', tl["points"]),
+            "vakit_epochs": array('q', tl["vakit_epochs"]),
+            "vakit_keys": tuple(tl["vakit_keys"]),
+        })
+
+    with _write_lock:
+        _snapshot = _Snapshot(
+            version=doc["version"],
+            schedules=tuple(doc["schedules"]),
+            next_id=doc["next_id"],
+            index=index,
+            intervals={int(k): [tuple(r) for r in v] for k, v in doc["intervals"]},
+            schedules_revision=doc["schedules_revision"],
+            schedule_revs={int(k): v for k, v in doc["schedule_revs"]},
+            tombstones={int(k): v for k, v in doc["tombstones"]},
+            tombstone_floor=doc["tombstone_floor"],
+            settings=doc["settings"],
+            settings_revision=doc["settings_revision"],
+            system_enabled=doc["system_enabled"],
+        )
+    _notify_state_change()
+
+
+def _shared_sync():
+    """İşçi: nesil değiştiyse yeni snapshot'ı alır (değişmediyse tek okuma)."""
+    global _shared_generation
+    if _shared_reader.generation() == _shared_generation:
+        return
+    with _shared_lock:
+        generation, payload = _shared_reader.read(_shared_generation)
+        if payload is not None:
+            _shared_adopt(payload)
+            _shared_generation = generation
+
+
+def _shared_watch_loop(owner_pid):
+    """İşçi: stream aboneleri için yayınları izler; sahip ölürse süreci bitirir."""
+    while True:
+        time.sleep(SHARED_WATCH_INTERVAL_SECONDS)
+        if os.getppid() != owner_pid:
+            logger.error("Owner process exited, worker %s stopping", WORKER_INDEX)
+            os._exit(1)
+        try:
+            _shared_sync()
+        except Exception as e:
+            logger.error("Shared snapshot sync failed: %s", e)
+
+
+def _worker_attach():
+    """İşçi: sahibin yayınladığı snapshot'a bağlanır."""
+    global _shared_reader
+    _shared_reader = _SharedSnapshotFile(SHARED_SNAPSHOT_FILE)
+    _shared_sync()
+    threading.Thread(target=_shared_watch_loop, args=(os.getppid(),),
+                     name="shared-watch", daemon=True).start()
+
+
+def _worker_owner_request(method, path, body=b'', headers=None):
+    """Sahibin iç portuna istek atar; (http.client cevabı, gövde) döner."""
+    import http.client
+    conn = http.client.HTTPConnection(LISTEN_HOST, WORKER_OWNER_PORT,
+                                      timeout=WORKER_FORWARD_TIMEOUT_SECONDS)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response, response.read()
+    finally:
+        conn.close()
+
+
+def _worker_request_fetch(district_id, start_date):
+    """İşçi: eksik vakitlerin çekimini sahipten ister (ilçe / gün başına tek istek)."""
+    key = (district_id, start_date.strftime('%Y-%m-%d'))
+    with _inflight_lock:
+        if key in _inflight_fetches:
+            return
+        _inflight_fetches.add(key)
+
+    def run():
+        try:
+            _worker_owner_request('POST', f"/internal/fetch?district={district_id}&date={key[1]}")
+        except OSError as e:
+            logger.error("Fetch request to owner failed for %s: %s", district_id, e)
+        finally:
+            with _inflight_lock:
+                _inflight_fetches.discard(key)
+
+    threading.Thread(target=run, name=f"prayer-fetch-{district_id}", daemon=True).start()
+
+
+@bp.before_app_request
+def _worker_request_start():
+    """İşçi: güncel snapshot'ı alır; değiştiren istekleri sahibe iletir."""
+    if _shared_reader is None:
+        return None
+    _shared_sync()
+    if request.method not in WORKER_FORWARD_METHODS:
+        return None
+    headers = {}
+    if request.content_type:
+        headers['Content-Type'] = request.content_type
+    try:
+        response, body = _worker_owner_request(request.method, request.full_path.rstrip('?'),
+                                               request.get_data(), headers)
+    except OSError as e:
+        logger.error("Forward to owner failed: %s", e)
+        return jsonify({"success": False, "error": "Sahip süreç yanıt vermiyor"}), 503
+    # Sahip cevaplamadan önce yayınladı; bu işçi de yazıyı hemen görsün
+    _shared_sync()
+    return Response(body, status=response.status,
+                    headers=[(k, v) for k, v in response.getheaders()
+                             if k.lower() in WORKER_FORWARD_HEADERS])
+
+
+@bp.route('/internal/fetch', methods=['POST'])
+def internal_fetch():
+    """Sahip: işçinin istediği ilçe / gün için vakit çekimini başlatır."""
+    if _shared_writer is None:
+        return jsonify({"success": False, "error": "Yalnızca çok süreçli modda"}), 404
+    resolved = _resolve_district(request.args.get('district', ''))
+    try:
+        day = _tz().localize(datetime.strptime(request.args.get('date', ''), '%Y-%m-%d'))
+    except ValueError:
+        day = None
+    if resolved is None or day is None:
+        return jsonify({"success": False, "error": "district ve date (YYYY-MM-DD) gerekli"}), 400
+    _fetch_prayer_times_async(resolved[0], day)
+    return jsonify({"success": True})
+
+
+_worker_procs = {}
+_workers_stopping = False
+
+
+def _worker_count_arg():
+    """--workers N / --workers=N veya PAUSETIME_WORKERS (0: tek süreç)."""
+    for i, arg in enumerate(sys.argv):
+        if arg == '--workers' and i + 1 < len(sys.argv):
+            return int(sys.argv[i + 1])
+        if arg.startswith('--workers='):
+            return int(arg.split('=', 1)[1])
+    return int(os.environ.get('PAUSETIME_WORKERS') or 0)
+
+
+def _supervise_worker(n, owner_port):
+    """İşçiyi başlatır; beklenmedik şekilde çıkarsa yeniden başlatır."""
+    import subprocess
+    fd = _listen_socket.fileno()
+    env = dict(os.environ, PAUSETIME_WORKER_FD=str(fd), PAUSETIME_WORKER_OWNER=str(owner_port),
+               PAUSETIME_WORKER_INDEX=str(n))
+    env.pop('PAUSETIME_WORKERS', None)
+    args = [sys.executable, os.path.abspath(__file__)] + (['--lite'] if LITE_ENGINE else [])
+    while not _workers_stopping:
+        proc = subprocess.Popen(args, env=env, pass_fds=(fd,))
+        _worker_procs[n] = proc
+        code = proc.wait()
+        if _workers_stopping:
+            return
+        logger.error("Worker %s exited with code %s, restarting", n, code)
+        time.sleep(WORKER_RESTART_DELAY_SECONDS)
+
+
+def _stop_workers():
+    global _workers_stopping
+    _workers_stopping = True
+    for proc in list(_worker_procs.values()):
+        proc.terminate()
+    for proc in list(_worker_procs.values()):
+        try:
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+
+
+def _run_owner(count):
+    """Sahip süreç: durumu yükler, paylaşılan snapshot'ı yayınlar, işçileri başlatır
+    ve iç portu sunar. Yalnızca POSIX (socket fd'si işçilere devredilir)."""
+    global _shared_writer
+    import signal
+
+    if os.name != 'posix':
+        raise SystemExit("--workers requires a POSIX platform")
+    application = create_app()
+    # İşçiler store'u yalnızca okur; tablo önceden hazır olsun
+    _store_db()
+    _shared_writer = _SharedSnapshotFile(SHARED_SNAPSHOT_FILE, create=True)
+    _shared_write()
+    threading.Thread(target=_shared_publisher_loop, name="shared-publisher", daemon=True).start()
+    _start_prayer_refresh()
+
+    internal_socket = socket.create_server((LISTEN_HOST, 0))
+    owner_port = internal_socket.getsockname()[1]
+    atexit.register(_stop_workers)
+    signal.signal(signal.SIGTERM, lambda *_args: sys.exit(0))
+    for n in range(count):
+        threading.Thread(target=_supervise_worker, args=(n, owner_port),
+                         name=f"worker-{n}", daemon=True).start()
+    logger.info("PauseTime owner serving %s workers on %s:%s (internal port %s)",
+                count, LISTEN_HOST, LISTEN_PORT, owner_port)
+    _serve(application, internal_socket)
+
+
+# ============================================================
+# APP FACTORY
+# ============================================================
+
+_runtime_ready = False
+_runtime_lock = threading.Lock()
+
+
+def _init_runtime():
+    """Disk'teki ayar ve zamanlamaları yükler; süreç başına bir kez çalışır."""
+    global _runtime_ready, prayer_times_cache, _journal_entries
+    with _runtime_lock:
+        if _runtime_ready:
+            return
+        os.makedirs(APP_DATA_DIR, exist_ok=True)
+        _configure_logging()
+        if WORKER_OWNER_PORT is not None:
+            # İşçi diskten yüklemez; durum sahibin yayınladığı snapshot'tan gelir
+            prayer_times_cache = _create_prayer_cache()
+            _worker_attach()
+            _runtime_ready = True
+            return
+        logger.info("Settings file: %s", SETTINGS_FILE)
+        settings = _load_settings()
+        prayer_times_cache = _create_prayer_cache()
+        schedules, next_id, _journal_entries = _load_schedules()
+        with _write_lock:
+            _publish(settings=settings,
+                     **_schedule_fields(schedules, next_id, _snapshot.schedules_revision))
+        _runtime_ready = True
+
+
+def create_app():
+    """Flask uygulamasını (lite motorda liteserver.Application) oluşturur ve
+    kalıcı durumu yükler.
+
+    Arka plan işleri (Diyanet prefetch, gece yenilemesi) burada başlamaz;
+    sunucuyu çalıştıran taraf _start_prayer_refresh() çağırır.
+    """
+    if LITE_ENGINE:
+        import liteserver
+        _init_runtime()
+        return liteserver.Application(bp)
+
+    from flask import Flask
+    from flask_cors import CORS
+
+    _init_runtime()
+    flask_app = Flask(__name__)
+    CORS(flask_app)
+    flask_app.register_blueprint(bp)
+    return flask_app
+
+
+def _serve(application, sock):
+    """Uygulamayı önceden dinlemeye alınmış socket üzerinde sunar (bloklar)."""
+    if LITE_ENGINE:
+        import liteserver
+        liteserver.serve(application, sockets=[sock])
     else:
         from waitress import serve
-        logger.info("PauseTime backend starting on 127.0.0.1:5000")
-        serve(app, host='127.0.0.1', port=5000, threads=4)
+        # channel_request_lookahead: kopan stream bağlantıları ilk heartbeat'te fark edilsin
+        serve(application, sockets=[sock], threads=WAITRESS_THREADS,
+              channel_request_lookahead=1)
+
+
+if __name__ == '__main__':
+    worker_count = _worker_count_arg()
+    if worker_count and WORKER_OWNER_PORT is None and '--dev' not in sys.argv:
+        _run_owner(worker_count)
+    else:
+        application = create_app()
+        if WORKER_OWNER_PORT is None:
+            _start_prayer_refresh()
+        if '--dev' in sys.argv and not LITE_ENGINE:
+            application.run(host=LISTEN_HOST, port=LISTEN_PORT, debug=True)
+        else:
+            if WORKER_INDEX is not None:
+                logger.info("PauseTime worker %s starting on %s:%s", WORKER_INDEX,
+                            LISTEN_HOST, LISTEN_PORT)
+            else:
+                logger.info("PauseTime backend%s starting on %s:%s",
+                            " (lite)" if LITE_ENGINE else "", LISTEN_HOST, LISTEN_PORT)
+            _serve(application, _listen_socket)
@@ -0,0 +1,105 @@
+"""
+Sidecar soğuk başlangıç ölçümü ve regresyon kontrolü.
+
+`python app.py` süreci başlatılır (Tauri'nin sidecar'ı başlattığı gibi) ve
+süreç exec'inden ilk başarılı `/state` cevabına kadar geçen süre ölçülür. Her
+çalıştırma boş bir veri dizini ve yerel Diyanet stub'ı kullanır.
+
+    python bench/cold_start.py                  # 5 çalıştırma, bütçeye göre kontrol
+    python bench/cold_start.py --runs 10 --budget-ms 1000
+
+Ortanca süre bütçeyi aşarsa çıkış kodu 1 olur (CI'da regresyon kontrolü).
+"""
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from diyanet_stub import start_stub
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# README'deki bütçe: exec → ilk /state cevabı (ortanca)
+DEFAULT_BUDGET_MS = 750
+DEFAULT_TIMEOUT_SECONDS = 30
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _measure_once(api_base, timeout):
+    """Tek bir soğuk başlangıç: (socket_ms, first_state_ms) döner."""
+    data_dir = tempfile.mkdtemp(prefix="pausetime-cold-")
+    port = _free_port()
+    env = dict(os.environ, APPDATA=data_dir, PAUSETIME_DIYANET_API=api_base,
+               PAUSETIME_PORT=str(port))
+    socket_ms = None
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "app.py")], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"app.py exited with code {proc.returncode}")
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+            try:
+                conn.connect()
+                if socket_ms is None:
+                    socket_ms = (time.perf_counter() - started) * 1000
+                conn.request("GET", "/state")
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    return socket_ms, (time.perf_counter() - started) * 1000
+            except (ConnectionError, http.client.HTTPException, socket.timeout):
+                time.sleep(0.002)
+            finally:
+                conn.close()
+        raise RuntimeError("timed out waiting for /state")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PauseTime sidecar soğuk başlangıç ölçümü")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="ortanca exec → ilk /state süresi için üst sınır")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    server, _config, api_base = start_stub()
+    try:
+        samples = [_measure_once(api_base, args.timeout) for _ in range(args.runs)]
+    finally:
+        server.shutdown()
+
+    socket_ms = [s for s, _ in samples if s is not None]
+    state_ms = [t for _, t in samples]
+    median = statistics.median(state_ms)
+    if socket_ms:
+        print(f"socket accepting: median {statistics.median(socket_ms):.0f} ms")
+    print(f"first /state:     median {median:.0f} ms, max {max(state_ms):.0f} ms "
+          f"({args.runs} runs, budget {args.budget_ms:.0f} ms)")
+
+    if median > args.budget_ms:
+        print("FAIL: cold start over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Yerel Diyanet (ezanvakti.imsakiyem.com) stub sunucusu.
+
+Benchmark'lar gerçek API yerine bu sunucuya yönlendirilir
+(PAUSETIME_DIYANET_API=http://127.0.0.1:<port>/api). Gecikme ve hata oranı
+ayarlanabilir; vakitler tarih ve ilçe id'sinden deterministik üretilir.
+--shift-minutes ile tüm vakitler kaydırılır (sağlayıcı uyuşmazlığı denemesi).
+
+    python bench/diyanet_stub.py --port 8089 --latency-ms 50 --failure-rate 0.1
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PERIOD_DAYS = {"daily": 1, "weekly": 7, "monthly": 30, "yearly": 365}
+PATH_RE = re.compile(r"^/api/prayer-times/(\d+)/(daily|weekly|monthly|yearly)$")
+
+
+def _fake_times(district_id, day, shift_minutes=0):
+    """İlçe ve güne göre deterministik, gerçeğe yakın vakitler."""
+    # Yıl içinde ±75 dakikalık salınım, ilçeye göre birkaç dakika kayma
+    phase = (day.timetuple().tm_yday - 172) / 365.0 * 6.283185
+    swing = int(75 * math.cos(phase))
+    shift = int(district_id) % 7 + shift_minutes
+
+    def hhmm(minutes):
+        minutes %= 24 * 60
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    return {
+        "imsak": hhmm(5 * 60 + 30 - swing + shift),
+        "gunes": hhmm(7 * 60 - swing + shift),
+        "ogle": hhmm(13 * 60 + 5 + shift),
+        "ikindi": hhmm(16 * 60 + 10 + swing // 2 + shift),
+        "aksam": hhmm(18 * 60 + 45 + swing + shift),
+        "yatsi": hhmm(20 * 60 + 10 + swing + shift),
+    }
+
+
+class StubConfig:
+    def __init__(self, latency_ms=0.0, failure_rate=0.0, seed=None, shift_minutes=0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.shift_minutes = shift_minutes
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+
+def _make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Başlık ve gövde ayrı paketlerde gidip Nagle gecikmesine takılmasın
+        disable_nagle_algorithm = True
+        wbufsize = 64 * 1024
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            with config.lock:
+                config.requests += 1
+                fail = config.random.random() < config.failure_rate
+                if fail:
+                    config.failures += 1
+
+            if config.latency_ms:
+                time.sleep(config.latency_ms / 1000.0)
+
+            match = PATH_RE.match(url.path)
+            if not match:
+                self._send(404, {"success": False, "error": "not found"})
+                return
+            if fail:
+                self._send(503, {"success": False, "error": "stub failure"})
+                return
+
+            district_id, period = match.groups()
+            start_str = parse_qs(url.query).get("startDate", [date.today().isoformat()])[0]
+            start = date.fromisoformat(start_str)
+            data = []
+            for i in range(PERIOD_DAYS[period]):
+                day = start + timedelta(days=i)
+                data.append({"date": f"{day.isoformat()}T00:00:00.000Z",
+                             "times": _fake_times(district_id, day, config.shift_minutes)})
+            self._send(200, {"success": True, "data": data})
+
+    return Handler
+
+
+def start_stub(port=0, latency_ms=0.0, failure_rate=0.0, seed=None, shift_minutes=0):
+    """Stub'ı arka plan thread'inde başlatır. (server, config, base_url) döner."""
+    config = StubConfig(latency_ms, failure_rate, seed, shift_minutes)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="diyanet-stub", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    return server, config, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Diyanet API stub sunucusu")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--shift-minutes", type=int, default=0)
+    args = parser.parse_args()
+
+    server, _config, base_url = start_stub(args.port, args.latency_ms, args.failure_rate, args.seed,
+                                           args.shift_minutes)
+    print(f"Diyanet stub listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Sunucu motorları için API sözleşmesi ve kaynak kullanımı kontrolü.
+
+Aynı HTTP test takımı varsayılan motora (Flask + waitress) ve lite motora
+(`app.py --lite`, yalnızca standart kütüphane) karşı çalıştırılır. Her motor
+boş bir veri dizini ve yerel Diyanet stub'ı ile ayrı bir süreç olarak başlar.
+Takımdan sonra süreçlerin RSS'i ve boşta CPU kullanımı ölçülür (Linux /proc).
+
+    python bench/engine_contract.py                    # iki motor, hedeflere göre kontrol
+    python bench/engine_contract.py --engines lite --idle-seconds 30
+
+Bir kontrol başarısız olursa, iki motorun cevapları (durum kodu ve JSON
+anahtarları) ayrışırsa ya da lite motor RSS / boşta CPU hedefini aşarsa çıkış
+kodu 1 olur.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from diyanet_stub import start_stub
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENGINES = {
+    "default": [],
+    "lite": ["--lite"],
+    # Sahip + 2 işçi; RSS / CPU yalnızca sahip sürecindir
+    "workers": ["--workers", "2"],
+}
+
+# README'deki hedefler (yalnızca lite motor için zorunlu)
+DEFAULT_RSS_TARGET_MB = 40
+DEFAULT_IDLE_CPU_TARGET_PERCENT = 0.5
+DEFAULT_IDLE_SECONDS = 10
+DEFAULT_TIMEOUT_SECONDS = 30
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Client:
+    def __init__(self, port):
+        self.port = port
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, headers, parsed_json_or_text) döner."""
+        headers = dict(headers or {})
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+            headers.setdefault("Content-Type", "application/json")
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            raw = response.read()
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+        finally:
+            conn.close()
+        text = raw.decode("utf-8")
+        if response_headers.get("content-type", "").startswith("application/json"):
+            return response.status, response_headers, json.loads(text)
+        return response.status, response_headers, text
+
+
+def _shape(value):
+    """Karşılaştırma için cevabın yapısı: anahtar kümeleri, değerler değil."""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        return [_shape(value[0])] if value else []
+    return type(value).__name__
+
+
+def run_suite(client):
+    """Sözleşme takımı. [(ad, hata_veya_None, (status, shape))] döner."""
+    results = []
+
+    def check(name, method, path, body=None, headers=None, status=200, expect=None):
+        code, response_headers, data = client.request(method, path, body, headers)
+        origin = (headers or {}).get("Origin")
+        error = None
+        if code != status:
+            error = f"status {code}, expected {status}"
+        elif response_headers.get("access-control-allow-origin") not in ("*", origin):
+            error = "missing CORS header"
+        elif expect is not None:
+            error = expect(data, response_headers)
+        shape = _shape(data) if isinstance(data, (dict, list)) else None
+        results.append((name, error, (code, shape)))
+        return data, response_headers
+
+    def success(data, _headers):
+        if not (isinstance(data, dict) and data.get("success") is True):
+            return f"unexpected body {data!r}"
+        return None
+
+    def failure(data, _headers):
+        if not (isinstance(data, dict) and data.get("success") is False and data.get("error")):
+            return f"unexpected body {data!r}"
+        return None
+
+    _state, headers = check("state", "GET", "/state",
+                            expect=lambda d, h: None if "state" in d and h.get("etag") else "no state/etag")
+    check("state 304", "GET", "/state", headers={"If-None-Match": headers.get("etag", "")}, status=304)
+    check("preflight", "OPTIONS", "/settings",
+          headers={"Origin": "tauri://localhost", "Access-Control-Request-Method": "PUT",
+                   "Access-Control-Request-Headers": "content-type"})
+    check("toggle off", "POST", "/state/toggle", {"enabled": False},
+          expect=lambda d, h: None if d.get("enabled") is False else f"unexpected body {d!r}")
+    check("toggle on", "POST", "/state/toggle", {"enabled": True},
+          expect=lambda d, h: None if d.get("enabled") is True else f"unexpected body {d!r}")
+    check("prayer times", "GET", "/api/prayer-times",
+          expect=lambda d, h: None if d.get("times") else f"unexpected body {d!r}")
+    check("prayer times bad district", "GET", "/api/prayer-times?district=YOKBOYLEYER",
+          status=400, expect=failure)
+
+    created, _ = check("schedule create", "POST", "/api/schedules",
+                       {"pause_time": "10:00", "resume_time": "10:30", "days": [0, 1, 2], "label": "a"},
+                       expect=success)
+    schedule_id = created.get("schedule", {}).get("id") if isinstance(created, dict) else None
+    check("schedule create invalid", "POST", "/api/schedules", {"pause_time": "25:99"},
+          status=400, expect=failure)
+    check("schedule update", "PUT", f"/api/schedules/{schedule_id}", {"enabled": False}, expect=success)
+    check("schedule update missing", "PUT", "/api/schedules/99999", {"enabled": False},
+          status=404, expect=failure)
+    check("schedule list", "GET", "/api/schedules",
+          expect=lambda d, h: None if len(d.get("schedules", [])) == 1 else f"unexpected body {d!r}")
+    check("schedule batch", "POST", "/api/schedules/batch",
+          {"create": [{"pause_time": "12:00", "days": [4]}, {"pause_time": "14:00", "days": [5]}],
+           "delete": [schedule_id]}, expect=success)
+    check("schedule export", "GET", "/api/schedules/export?format=ndjson",
+          expect=lambda d, h: None if len(d.strip().splitlines()) == 2 else f"unexpected body {d!r}")
+    check("schedule import", "POST", "/api/schedules/import?mode=replace",
+          body='{"pause_time": "08:00"}\n{"pause_time": "09:00", "days": [1]}\n',
+          headers={"Content-Type": "application/x-ndjson"},
+          expect=lambda d, h: None if d.get("imported") == 2 else f"unexpected body {d!r}")
+    check("schedule delete missing", "DELETE", "/api/schedules/99999", status=404, expect=failure)
+
+    check("settings", "GET", "/settings", expect=success)
+    check("settings update", "PUT", "/settings", {"city": "ANKARA"}, expect=success)
+    check("settings invalid", "PUT", "/settings", {"city": ""}, status=400, expect=failure)
+
+    check("not found", "GET", "/yok", status=404)
+    check("method not allowed", "DELETE", "/state", status=405)
+    return results
+
+
+def _read_rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return None
+
+
+def _read_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        # comm parantez içinde boşluk içerebilir; alanlar ')' sonrasından sayılır
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(fields[11]) + int(fields[12])) / ticks
+
+
+def run_engine(engine, api_base, idle_seconds, timeout):
+    """Motoru başlatır, takımı çalıştırır ve kaynak kullanımını ölçer."""
+    data_dir = tempfile.mkdtemp(prefix=f"pausetime-{engine}-")
+    port = _free_port()
+    env = dict(os.environ, APPDATA=data_dir, PAUSETIME_DIYANET_API=api_base,
+               PAUSETIME_PORT=str(port))
+    env.pop("PAUSETIME_ENGINE", None)
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "app.py")] + ENGINES[engine],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = Client(port)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{engine} engine exited with code {proc.returncode}")
+            try:
+                if client.request("GET", "/state")[0] == 200:
+                    break
+            except (ConnectionError, http.client.HTTPException, socket.timeout):
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"timed out waiting for {engine} engine")
+            time.sleep(0.05)
+
+        # Arka plan prefetch'i bitsin; vakitler store'a yazılmış olsun
+        time.sleep(1)
+        results = run_suite(client)
+
+        cpu_before = _read_cpu_seconds(proc.pid)
+        time.sleep(idle_seconds)
+        idle_cpu = (_read_cpu_seconds(proc.pid) - cpu_before) / idle_seconds * 100
+        rss_mb = _read_rss_kb(proc.pid) / 1024
+        return results, rss_mb, idle_cpu
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PauseTime motor sözleşmesi ve kaynak kontrolü")
+    parser.add_argument("--engines", default="default,lite",
+                        help="virgülle ayrılmış motorlar: default, lite, workers")
+    parser.add_argument("--rss-target-mb", type=float, default=DEFAULT_RSS_TARGET_MB,
+                        help="lite motor için takım sonrası RSS üst sınırı")
+    parser.add_argument("--idle-cpu-target", type=float, default=DEFAULT_IDLE_CPU_TARGET_PERCENT,
+                        help="lite motor için boşta CPU üst sınırı (yüzde)")
+    parser.add_argument("--idle-seconds", type=float, default=DEFAULT_IDLE_SECONDS)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engine(s): {', '.join(unknown)}")
+
+    server, _config, api_base = start_stub()
+    try:
+        runs = {engine: run_engine(engine, api_base, args.idle_seconds, args.timeout)
+                for engine in engines}
+    finally:
+        server.shutdown()
+
+    failed = False
+    for engine, (results, rss_mb, idle_cpu) in runs.items():
+        errors = [(name, error) for name, error, _ in results if error]
+        print(f"{engine:8s} {len(results) - len(errors)}/{len(results)} checks passed, "
+              f"RSS {rss_mb:.1f} MB, idle CPU {idle_cpu:.2f}%")
+        for name, error in errors:
+            print(f"  FAIL {name}: {error}")
+        failed = failed or bool(errors)
+
+    if len(runs) > 1:
+        baseline_engine, *others = runs
+        baseline = runs[baseline_engine][0]
+        for engine in others:
+            for (name, _, expected), (_, _, actual) in zip(baseline, runs[engine][0]):
+                if expected != actual:
+                    print(f"  MISMATCH {name}: {baseline_engine} {expected} != {engine} {actual}")
+                    failed = True
+
+    if "lite" in runs:
+        _results, rss_mb, idle_cpu = runs["lite"]
+        if rss_mb > args.rss_target_mb:
+            print(f"FAIL: lite RSS {rss_mb:.1f} MB over target {args.rss_target_mb:.0f} MB")
+            failed = True
+        if idle_cpu > args.idle_cpu_target:
+            print(f"FAIL: lite idle CPU {idle_cpu:.2f}% over target {args.idle_cpu_target}%")
+            failed = True
+
+    if failed:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Vakit sağlayıcı zinciri (hedge'li çekim) kontrolü.
+
+Yerel Diyanet stub'ları birincil / ikincil sağlayıcı olarak kullanılır; app
+süreç içinde import edilir ve her senaryo kendi zincirini kurar:
+
+- hızlı birincil: hedge başlamaz, birincil kazanır
+- yavaş birincil: ikincil, birincilin p95 bütçesi dolunca başlar ve kazanır
+- hata veren birincil: ikincil bütçe beklenmeden başlar
+- kaydırılmış ikincil: geç gelen birincil cevabıyla uyuşmazlık işaretlenir
+- dosya sağlayıcı: JSON dosyasından sunulur, değişince yeniden okunur
+- hata veren birincil + boş ikincil: hata fırlatılır (devre kesici hata sayar)
+
+    python bench/provider_check.py
+    python bench/provider_check.py --slow-ms 1500 --shift-minutes 10
+
+Bir senaryo başarısız olursa çıkış kodu 1 olur.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from diyanet_stub import _fake_times, start_stub  # noqa: E402
+
+DISTRICT_ID = "9541"
+WARMUP_FETCHES = 12
+
+
+def _import_app(data_dir):
+    os.environ["APPDATA"] = data_dir
+    sys.path.insert(0, ROOT_DIR)
+    import app
+    import logging
+    app.create_app()
+    logging.getLogger(app.__name__).setLevel(logging.CRITICAL)
+    return app
+
+
+def _use_chain(app, spec):
+    """Zinciri kurar ve hedge bütçesi gözlenen p95'e otursun diye ısıtır."""
+    app._providers = app._build_providers(spec)
+    for _ in range(WARMUP_FETCHES):
+        app._fetch_prayer_times_range(DISTRICT_ID, datetime.now())
+    app._provider_disagreements.clear()
+    return app._providers
+
+
+def _timed_fetch(app):
+    started = time.perf_counter()
+    rows = app._fetch_prayer_times_range(DISTRICT_ID, datetime.now())
+    return rows, time.perf_counter() - started
+
+
+def _winner(providers, wins_before):
+    for provider in providers:
+        if provider.wins > wins_before[provider.name]:
+            return provider.name
+    return None
+
+
+def _write_times_file(path, days, shift_minutes=0):
+    start = datetime.now().date()
+    data = {DISTRICT_ID: [
+        {"date": (start + timedelta(days=i)).isoformat(),
+         "times": _fake_times(DISTRICT_ID, start + timedelta(days=i), shift_minutes)}
+        for i in range(days)
+    ]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PauseTime vakit sağlayıcı zinciri kontrolü")
+    parser.add_argument("--slow-ms", type=float, default=800,
+                        help="yavaş birincil senaryosunda birincil stub gecikmesi")
+    parser.add_argument("--shift-minutes", type=int, default=5,
+                        help="uyuşmazlık senaryosunda ikincil stub'ın kayması")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="pausetime-providers-")
+    primary, primary_config, primary_url = start_stub()
+    secondary, secondary_config, secondary_url = start_stub()
+    shifted, _shifted_config, shifted_url = start_stub(shift_minutes=args.shift_minutes)
+    failures = []
+
+    def check(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        app = _import_app(data_dir)
+        spec = f"imsakiyem={primary_url},imsakiyem={secondary_url}"
+
+        providers = _use_chain(app, spec)
+        budget = providers[0].hedge_budget()
+        wins = {p.name: p.wins for p in providers}
+        rows, elapsed = _timed_fetch(app)
+        winner = _winner(providers, wins)
+        check("fast primary", winner == "imsakiyem" and len(rows) == 30,
+              f"winner={winner} rows={len(rows)} {elapsed * 1000:.1f} ms (budget {budget * 1000:.0f} ms)")
+
+        primary_config.latency_ms = args.slow_ms
+        wins = {p.name: p.wins for p in providers}
+        rows, elapsed = _timed_fetch(app)
+        winner = _winner(providers, wins)
+        check("slow primary hedged", winner == "imsakiyem-2" and elapsed < args.slow_ms / 1000,
+              f"winner={winner} {elapsed * 1000:.1f} ms (primary {args.slow_ms:.0f} ms, "
+              f"budget {budget * 1000:.0f} ms)")
+        primary_config.latency_ms = 0
+
+        primary_config.failure_rate = 1.0
+        wins = {p.name: p.wins for p in providers}
+        rows, elapsed = _timed_fetch(app)
+        winner = _winner(providers, wins)
+        check("failing primary", winner == "imsakiyem-2" and elapsed < budget,
+              f"winner={winner} {elapsed * 1000:.1f} ms")
+        primary_config.failure_rate = 0.0
+
+        providers = _use_chain(app, f"imsakiyem={primary_url},imsakiyem={shifted_url}")
+        primary_config.latency_ms = args.slow_ms
+        _timed_fetch(app)
+        # Geç gelen birincil cevabı kazananla karşılaştırılır
+        deadline = time.monotonic() + args.slow_ms / 1000 + 2
+        while not app._provider_disagreements and time.monotonic() < deadline:
+            time.sleep(0.05)
+        flagged = list(app._provider_disagreements)
+        check("disagreement flagged",
+              bool(flagged) and flagged[0]["diff_minutes"] == args.shift_minutes,
+              f"{flagged[0] if flagged else 'none'}")
+        primary_config.latency_ms = 0
+
+        times_file = os.path.join(data_dir, "times.json")
+        _write_times_file(times_file, 30)
+        providers = _use_chain(app, f"file={times_file},imsakiyem={primary_url}")
+        requests_before = primary_config.requests
+        rows, elapsed = _timed_fetch(app)
+        check("file provider", len(rows) == 30 and primary_config.requests == requests_before,
+              f"rows={len(rows)} {elapsed * 1000:.2f} ms, upstream requests "
+              f"{primary_config.requests - requests_before}")
+        _write_times_file(times_file, 30, shift_minutes=1)
+        os.utime(times_file, (time.time() + 1, time.time() + 1))
+        rows, _elapsed = _timed_fetch(app)
+        expected = app._parse_api_times(_fake_times(DISTRICT_ID, datetime.now().date(), 1))
+        check("file provider reload", rows[0][1] == expected, f"first day {rows[0][1]}")
+
+        # Birincil hata verirken ikincilin boş cevabı upstream ayakta sayılmamalı
+        empty_file = os.path.join(data_dir, "empty.json")
+        with open(empty_file, "w", encoding="utf-8") as f:
+            json.dump({}, f)
+        app._providers = app._build_providers(f"imsakiyem={primary_url},file={empty_file}")
+        primary_config.failure_rate = 1.0
+        try:
+            rows = app._fetch_prayer_times_range(DISTRICT_ID, datetime.now())
+            outcome = f"returned {len(rows)} rows"
+        except OSError as e:
+            outcome = f"raised {type(e).__name__}"
+        primary_config.failure_rate = 0.0
+        check("failing primary, empty secondary", outcome.startswith("raised"), outcome)
+    finally:
+        for server in (primary, secondary, shifted):
+            server.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if failures:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+"""
+PauseTime backend benchmark'ları.
+
+Sıcak yollar (state hesabı, zamanlama kontrolleri, vakit cache'i) ve waitress
+altında uçtan uca /state ile /api/schedules throughput'u ölçülür. Upstream
+olarak bench/diyanet_stub.py kullanılır; gerçek API'ye istek gitmez. Sonuçlar
+sürümler arası karşılaştırma için JSON olarak yazılır.
+
+    python bench/run_bench.py                       # tüm senaryolar
+    python bench/run_bench.py --schedules 10,1000 --concurrency 1,4 --duration 1
+    python bench/run_bench.py --upstream-latency-ms 50 --upstream-failure-rate 0.2
+    python bench/run_bench.py --workers 0,2,4       # çok süreçli mod (0: tek süreç)
+    python bench/run_bench.py --compare eski.json   # önceki sonuçla kıyasla
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from diyanet_stub import start_stub  # noqa: E402
+
+DEFAULT_SCHEDULE_COUNTS = "10,100,1000,10000,100000"
+DEFAULT_CONCURRENCY = "1,4,16"
+
+
+# ============================================================
+# ÖLÇÜM
+# ============================================================
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _summarize(samples_ns, elapsed_s, errors=0):
+    """Gecikme örneklerinden (ns) istatistik üretir (mikrosaniye)."""
+    ordered = sorted(samples_ns)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "ops_per_sec": round(count / elapsed_s, 1) if elapsed_s else 0.0,
+        "mean_us": round(sum(ordered) / count / 1000.0, 2) if count else 0.0,
+        "p50_us": round(_percentile(ordered, 0.50) / 1000.0, 2),
+        "p95_us": round(_percentile(ordered, 0.95) / 1000.0, 2),
+        "p99_us": round(_percentile(ordered, 0.99) / 1000.0, 2),
+    }
+
+
+def _time_call(fn, duration, setup=None):
+    """fn'i duration saniye boyunca tekrar tekrar çağırıp her çağrıyı ölçer."""
+    samples = []
+    clock = time.perf_counter_ns
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        if setup is not None:
+            setup()
+        t0 = clock()
+        fn()
+        samples.append(clock() - t0)
+    return _summarize(samples, time.perf_counter() - start)
+
+
+def _generate_schedules(count, seed=42):
+    """Programatik üretilmiş zamanlamalar (gerçek kullanımdaki karışıma yakın)."""
+    rng = random.Random(seed)
+    schedules = []
+    for i in range(1, count + 1):
+        pause = rng.randrange(24 * 60)
+        resume = rng.choice([None, (pause + rng.randrange(1, 12 * 60)) % (24 * 60)])
+        schedules.append({
+            "id": i,
+            "pause_time": f"{pause // 60:02d}:{pause % 60:02d}",
+            "resume_time": None if resume is None else f"{resume // 60:02d}:{resume % 60:02d}",
+            "days": sorted(rng.sample(range(7), rng.randrange(8))),
+            "label": f"bench-{i}",
+            "enabled": rng.random() < 0.9,
+        })
+    return schedules
+
+
+# ============================================================
+# UYGULAMA KURULUMU
+# ============================================================
+
+def _prepare_env(data_dir, api_base):
+    """app import edilmeden önce veri dizinini ve upstream adresini ayarlar."""
+    os.environ["APPDATA"] = data_dir
+    os.environ["PAUSETIME_DIYANET_API"] = api_base
+
+
+def _import_app():
+    sys.path.insert(0, ROOT_DIR)
+    import app
+    import logging
+    app.create_app()
+    # Benchmark sırasında log I/O ölçümü bozmasın
+    logging.getLogger(app.__name__).setLevel(logging.WARNING)
+    return app
+
+
+def _load_schedules_into(app, schedules):
+    """Zamanlamaları çalışan modüle yükleyip index ve revizyonları yeniler."""
+    with app._write_lock:
+        revision = app._snapshot.schedules_revision + 1
+        app._publish(schedules_revision=revision,
+                     **app._schedule_fields(schedules, len(schedules) + 1, revision))
+
+
+def _wait_for_prayer_data(app, timeout=10.0):
+    """Arka plan çekimi bitip bugünün verisi store'a girene kadar bekler."""
+    district_id = app.DIYANET_DISTRICT_IDS.get(app._snapshot.settings.get("city", "ISTANBUL"), "9541")
+    today = datetime.now().strftime('%Y-%m-%d')
+    app.get_prayer_times()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if app._store_get(district_id, today) is not None:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# ============================================================
+# SENARYOLAR
+# ============================================================
+
+def bench_hot_paths(app, schedule_counts, duration):
+    """Fonksiyon seviyesinde sıcak yol ölçümleri."""
+    results = []
+    _wait_for_prayer_data(app)
+
+    for count in schedule_counts:
+        schedules = _generate_schedules(count)
+        _load_schedules_into(app, schedules)
+        probe = schedules[len(schedules) // 2]
+        params = {"schedules": count}
+
+        cases = [
+            ("_get_current_state", app._get_current_state, None),
+            ("_check_schedule_active", lambda: app._check_schedule_active(probe), None),
+            ("_is_any_schedule_active", app._is_any_schedule_active, None),
+        ]
+        for name, fn, setup in cases:
+            results.append({"name": name, "params": params, **_time_call(fn, duration, setup)})
+
+    # Vakit cache'i zamanlama sayısından bağımsız
+    results.append({"name": "get_prayer_times.cache_hit", "params": {},
+                    **_time_call(app.get_prayer_times, duration)})
+    results.append({"name": "get_prayer_times.store_hit", "params": {},
+                    **_time_call(app.get_prayer_times, duration,
+                                 setup=app.prayer_times_cache.clear)})
+
+    # Store'da olmayan tarih: offline hesap + (birleştirilmiş) arka plan çekimi
+    far = [datetime.now() + timedelta(days=400)]
+
+    def cold_setup():
+        far[0] += timedelta(days=1)
+    results.append({"name": "get_prayer_times.cold_miss", "params": {},
+                    **_time_call(lambda: app.get_prayer_times(date=far[0]), duration,
+                                 setup=cold_setup)})
+    return results
+
+
+def bench_upstream(app, duration):
+    """Upstream (stub) üzerinden aylık çekim gecikmesi ve hata sayısı."""
+    samples = []
+    errors = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    day = datetime.now()
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter_ns()
+        try:
+            app._fetch_prayer_times_range("9541", day)
+        except Exception:
+            errors += 1
+        samples.append(time.perf_counter_ns() - t0)
+    return [{"name": "upstream.fetch_month", "params": {},
+             **_summarize(samples, time.perf_counter() - start, errors)}]
+
+
+def _start_server_process(schedule_count, api_base, data_dir):
+    """Ayrı bir süreçte waitress sunucusu başlatır; (proc, port) döner."""
+    env = dict(os.environ, APPDATA=data_dir, PAUSETIME_DIYANET_API=api_base)
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--serve-schedules", str(schedule_count)],
+        stdout=subprocess.PIPE, env=env, text=True,
+    )
+    line = proc.stdout.readline()
+    if not line.startswith("PORT "):
+        proc.kill()
+        raise RuntimeError(f"Benchmark server failed to start: {line!r}")
+    return proc, int(line.split()[1])
+
+
+def _load_worker(port, path, deadline, samples, errors, lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    local = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter_ns()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                local_errors += 1
+        except Exception:
+            local_errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local.append(time.perf_counter_ns() - t0)
+    conn.close()
+    with lock:
+        samples.extend(local)
+        errors[0] += local_errors
+
+
+def bench_http(schedule_counts, concurrency_levels, duration, api_base, data_dir):
+    """waitress altında uçtan uca throughput (keep-alive istemciler)."""
+    results = []
+    for count in schedule_counts:
+        proc, port = _start_server_process(count, api_base, data_dir)
+        try:
+            for path in ("/state", "/api/schedules"):
+                for concurrency in concurrency_levels:
+                    samples, errors, lock = [], [0], threading.Lock()
+                    start = time.perf_counter()
+                    deadline = start + duration
+                    workers = [
+                        threading.Thread(target=_load_worker,
+                                         args=(port, path, deadline, samples, errors, lock))
+                        for _ in range(concurrency)
+                    ]
+                    for w in workers:
+                        w.start()
+                    for w in workers:
+                        w.join()
+                    results.append({
+                        "name": f"http GET {path}",
+                        "params": {"schedules": count, "concurrency": concurrency},
+                        **_summarize(samples, time.perf_counter() - start, errors[0]),
+                    })
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_app_process(worker_count, schedules, api_base, data_dir):
+    """`app.py --workers N` sürecini başlatır, zamanlamaları API üzerinden
+    import eder; (proc, port) döner. N=0 tek süreçtir."""
+    port = _free_port()
+    env = dict(os.environ, APPDATA=data_dir, PAUSETIME_DIYANET_API=api_base,
+               PAUSETIME_PORT=str(port))
+    args = [sys.executable, os.path.join(ROOT_DIR, "app.py")]
+    if worker_count:
+        args += ["--workers", str(worker_count)]
+    proc = subprocess.Popen(args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while True:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            body = "".join(json.dumps({k: v for k, v in s.items() if k != "id"}) + "\n"
+                           for s in schedules)
+            conn.request("POST", "/api/schedules/import?mode=replace", body=body.encode("utf-8"),
+                         headers={"Content-Type": "application/x-ndjson"})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                raise RuntimeError(f"schedule import failed with {response.status}")
+            return proc, port
+        except (ConnectionError, http.client.HTTPException, socket.timeout):
+            if proc.poll() is not None or time.time() > deadline:
+                proc.kill()
+                raise RuntimeError("app.py failed to start")
+            time.sleep(0.05)
+
+
+def _load_process(port, path, duration):
+    """Ayrı süreçte yük istemcisi (istemci tarafı GIL ölçümü sınırlamasın)."""
+    samples, errors, lock = [], [0], threading.Lock()
+    _load_worker(port, path, time.perf_counter() + duration, samples, errors, lock)
+    return samples, errors[0]
+
+
+def bench_http_workers(schedule_counts, concurrency_levels, worker_counts, duration,
+                       api_base, data_dir):
+    """Çok süreçli mod: işçi sayısına göre uçtan uca throughput (istemciler ayrı süreçlerde)."""
+    results = []
+    with multiprocessing.Pool(max(concurrency_levels)) as pool:
+        for worker_count in worker_counts:
+            for count in schedule_counts:
+                run_dir = tempfile.mkdtemp(prefix=f"w{worker_count}-", dir=data_dir)
+                proc, port = _start_app_process(worker_count, _generate_schedules(count),
+                                                api_base, run_dir)
+                try:
+                    for path in ("/state", "/api/schedules"):
+                        for concurrency in concurrency_levels:
+                            start = time.perf_counter()
+                            runs = pool.starmap(_load_process, [(port, path, duration)] * concurrency)
+                            elapsed = time.perf_counter() - start
+                            samples = [x for run_samples, _ in runs for x in run_samples]
+                            results.append({
+                                "name": f"http GET {path}",
+                                "params": {"schedules": count, "concurrency": concurrency,
+                                           "workers": worker_count},
+                                **_summarize(samples, elapsed, sum(e for _, e in runs)),
+                            })
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=10)
+    return results
+
+
+def _serve(schedule_count):
+    """--serve modu: zamanlamaları yükleyip waitress'i rastgele portta çalıştırır."""
+    from waitress import create_server
+
+    app = _import_app()
+    _load_schedules_into(app, _generate_schedules(schedule_count))
+    _wait_for_prayer_data(app)
+    server = create_server(app.create_app(), host="127.0.0.1", port=0,
+                           threads=app.WAITRESS_THREADS)
+    print(f"PORT {server.effective_port}", flush=True)
+    server.run()
+
+
+# ============================================================
+# RAPOR
+# ============================================================
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def _result_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def _print_results(results, baseline=None):
+    base = {_result_key(r): r for r in (baseline or {}).get("results", [])}
+    print(f"{'benchmark':<34} {'params':<32} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'Δ ops/s':>9}")
+    for r in results:
+        params = ", ".join(f"{k}={v}" for k, v in r["params"].items())
+        delta = ""
+        old = base.get(_result_key(r))
+        if old and old["ops_per_sec"]:
+            delta = f"{(r['ops_per_sec'] / old['ops_per_sec'] - 1) * 100:+.1f}%"
+        print(f"{r['name']:<34} {params:<32} {r['ops_per_sec']:>12.1f} {r['p50_us']:>10.2f} "
+              f"{r['p99_us']:>10.2f} {delta:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PauseTime backend benchmark'ları")
+    parser.add_argument("--schedules", default=DEFAULT_SCHEDULE_COUNTS,
+                        help="Virgülle ayrılmış zamanlama sayıları")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY,
+                        help="Virgülle ayrılmış eşzamanlı istemci sayıları")
+    parser.add_argument("--duration", type=float, default=2.0, help="Senaryo başına saniye")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0)
+    parser.add_argument("--upstream-failure-rate", type=float, default=0.0)
+    parser.add_argument("--skip-http", action="store_true", help="Uçtan uca testleri atla")
+    parser.add_argument("--workers", default="",
+                        help="Virgülle ayrılmış işçi sayıları (app.py --workers; 0: tek süreç)")
+    parser.add_argument("--output", default=os.path.join(ROOT_DIR, "bench_results.json"))
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--serve-schedules", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve_schedules)
+        return
+
+    schedule_counts = [int(x) for x in args.schedules.split(",") if x]
+    concurrency_levels = [int(x) for x in args.concurrency.split(",") if x]
+
+    stub, stub_config, api_base = start_stub(latency_ms=args.upstream_latency_ms,
+                                             failure_rate=args.upstream_failure_rate, seed=1)
+    data_dir = tempfile.mkdtemp(prefix="pausetime-bench-")
+    _prepare_env(data_dir, api_base)
+    app = _import_app()
+
+    results = []
+    results += bench_hot_paths(app, schedule_counts, args.duration)
+    results += bench_upstream(app, args.duration)
+    if not args.skip_http:
+        results += bench_http(schedule_counts, concurrency_levels, args.duration, api_base, data_dir)
+    if args.workers:
+        worker_counts = [int(x) for x in args.workers.split(",") if x]
+        results += bench_http_workers(schedule_counts, concurrency_levels, worker_counts,
+                                      args.duration, api_base, data_dir)
+    stub.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if not k.startswith("serve")},
+            "upstream_requests": stub_config.requests,
+            "upstream_failures": stub_config.failures,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_results(results, baseline)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,629 @@
+"""
+PauseTime için yalnızca standart kütüphaneyle çalışan hafif sunucu motoru.
+
+`python app.py --lite` veya PAUSETIME_ENGINE=lite ile seçilir. app.py'nin
+kullandığı Flask / werkzeug / flask_cors / waitress / requests / pytz /
+cachetools yüzeyinin küçük bir alt kümesini sağlar; route'lar, state makinesi
+ve zamanlama mantığı aynen app.py'den gelir. Böylece iki motor aynı API
+sözleşmesini sunar (bkz. bench/engine_contract.py) ama lite motorda bu
+paketlerin hiçbiri belleğe yüklenmez.
+
+Kapsam bilinçli olarak dardır: app.py'nin gerçekten kullandığı şeyler.
+Yeni bir Flask özelliği kullanılmaya başlanırsa buraya da eklenmelidir.
+"""
+import io
+import json
+import logging
+import re
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from datetime import timedelta, tzinfo
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# serve_forever'ın boşta uyanma aralığı; shutdown() kullanılmadığından uzun tutulur
+POLL_INTERVAL_SECONDS = 30
+# İstek gövdesi üst sınırı (import için yeterli)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+# ============================================================
+# SAAT DİLİMİ (pytz yerine)
+# ============================================================
+
+class IstanbulTZ(tzinfo):
+    """Europe/Istanbul: Eylül 2016'dan beri sabit UTC+3, yaz saati yok.
+
+    pytz'deki localize / normalize arayüzünü taklit eder. 2016 öncesi tarihler
+    için yaz saati uygulanmaz; lite motor geçmiş aralıklar için yaklaşıktır.
+    """
+    zone = 'Europe/Istanbul'
+    _offset = timedelta(hours=3)
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def tzname(self, dt):
+        return '+03'
+
+    def fromutc(self, dt):
+        return (dt + self._offset).replace(tzinfo=self)
+
+    def localize(self, dt):
+        return dt.replace(tzinfo=self)
+
+    def normalize(self, dt):
+        return dt.astimezone(self)
+
+    def __repr__(self):
+        return '<IstanbulTZ UTC+03>'
+
+
+# ============================================================
+# TTL CACHE (cachetools yerine)
+# ============================================================
+
+class TTLCache:
+    """LRU + TTL cache; cachetools.TTLCache'in app.py'nin kullandığı kısmı.
+
+    Kapasite dolduğunda popitem() ile en az kullanılan kayıt atılır (alt
+    sınıflar popitem'i ezerek sayabilir). Süresi dolan kayıtlar erişimde düşer.
+    """
+
+    def __init__(self, maxsize, ttl, timer=None):
+        import time
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer or time.monotonic
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[1] <= self.timer():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._expire()
+            full = key not in self._data and len(self._data) >= self.maxsize
+        if full:
+            self.popitem()
+        with self._lock:
+            self._data[key] = (value, self.timer() + self.ttl)
+            self._data.move_to_end(key)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def popitem(self):
+        with self._lock:
+            if not self._data:
+                raise KeyError('popitem(): cache is empty')
+            key, (value, _expires) = self._data.popitem(last=False)
+        return key, value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _expire(self):
+        now = self.timer()
+        while self._data:
+            key, (_value, expires) = next(iter(self._data.items()))
+            if expires > now:
+                break
+            del self._data[key]
+
+
+_MISSING = object()
+
+
+# ============================================================
+# HTTP İSTEMCİSİ (requests yerine)
+# ============================================================
+
+class RequestException(OSError):
+    """Upstream isteği başarısız (requests.RequestException karşılığı)."""
+
+
+class HTTPError(RequestException):
+    """4xx / 5xx cevap (requests.HTTPError karşılığı)."""
+
+
+class _ClientResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.content = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+class Session:
+    """requests.Session'ın app.py'nin kullandığı get() kısmı (urllib ile)."""
+
+    def __init__(self):
+        self.headers = {}
+
+    def get(self, url, params=None, timeout=None):
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+        req = urllib.request.Request(url, headers=self.headers)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                return _ClientResponse(response.status, response.read())
+        except urllib.error.HTTPError as e:
+            return _ClientResponse(e.code, e.read())
+        except (urllib.error.URLError, OSError) as e:
+            raise RequestException(str(e)) from e
+
+
+# ============================================================
+# WEB (Flask / werkzeug yerine)
+# ============================================================
+
+def quote_etag(etag, weak=False):
+    if '"' in etag:
+        raise ValueError('invalid etag')
+    etag = f'"{etag}"'
+    return 'W/' + etag if weak else etag
+
+
+class _Headers:
+    """Büyük/küçük harf duyarsız, sıralı başlık listesi."""
+
+    def __init__(self, items=None):
+        self._items = []
+        for key, value in (items.items() if isinstance(items, dict) else items or ()):
+            self._items.append((key, str(value)))
+
+    def __setitem__(self, key, value):
+        lower = key.lower()
+        self._items = [(k, v) for k, v in self._items if k.lower() != lower]
+        self._items.append((key, str(value)))
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        lower = key.lower()
+        for k, v in self._items:
+            if k.lower() == lower:
+                return v
+        return default
+
+    def items(self):
+        return list(self._items)
+
+
+class Response:
+    """werkzeug Response'un app.py'nin kullandığı kısmı.
+
+    response: str, bytes veya str/bytes üreten bir iterable (stream).
+    """
+
+    def __init__(self, response=None, status=200, headers=None, mimetype=None):
+        self.status_code = status
+        self.headers = _Headers(headers)
+        if 'Content-Type' not in self.headers:
+            mimetype = mimetype or 'text/html'
+            if mimetype.startswith('text/') and 'charset' not in mimetype:
+                mimetype += '; charset=utf-8'
+            self.headers['Content-Type'] = mimetype
+        if response is None:
+            response = b''
+        if isinstance(response, str):
+            response = response.encode('utf-8')
+        self.response = response
+        self._on_close = []
+
+    @property
+    def mimetype(self):
+        return self.headers.get('Content-Type', '').split(';')[0]
+
+    @property
+    def is_streamed(self):
+        return not isinstance(self.response, bytes)
+
+    def get_data(self):
+        if self.is_streamed:
+            self.response = b''.join(
+                chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in self.response)
+        return self.response
+
+    def set_etag(self, etag, weak=False):
+        self.headers['ETag'] = quote_etag(etag, weak)
+
+    def call_on_close(self, func):
+        self._on_close.append(func)
+        return func
+
+    def close(self):
+        close = getattr(self.response, 'close', None)
+        if close is not None:
+            close()
+        for func in self._on_close:
+            func()
+
+
+def jsonify(*args, **kwargs):
+    """Flask'ın varsayılan JSON sağlayıcısıyla aynı biçim (sıralı anahtar, kompakt)."""
+    data = args[0] if len(args) == 1 else (list(args) or kwargs)
+    body = json.dumps(data, ensure_ascii=True, sort_keys=True, separators=(',', ':')) + '\n'
+    return Response(body, mimetype='application/json')
+
+
+class Rule:
+    _CONVERTERS = {'int': (r'\d+', int), 'string': (r'[^/]+', str)}
+
+    def __init__(self, rule, methods, view):
+        self.rule = rule
+        self.methods = {m.upper() for m in methods} | ({'HEAD'} if 'GET' in methods else set())
+        self.view = view
+        self._converters = {}
+        pattern = ''
+        for part in re.split(r'(<[^>]+>)', rule):
+            if part.startswith('<'):
+                converter, _, name = part[1:-1].rpartition(':')
+                regex, convert = self._CONVERTERS[converter or 'string']
+                self._converters[name] = convert
+                pattern += f'(?P<{name}>{regex})'
+            else:
+                pattern += re.escape(part)
+        self._regex = re.compile(pattern + '$')
+
+    def match(self, path):
+        m = self._regex.match(path)
+        if m is None:
+            return None
+        return {name: self._converters[name](value) for name, value in m.groupdict().items()}
+
+
+class Blueprint:
+    """Route ve istek kancalarını toplar (flask.Blueprint karşılığı)."""
+
+    def __init__(self, name, import_name):
+        self.name = name
+        self.rules = []
+        self.before_request_funcs = []
+        self.after_request_funcs = []
+        self.teardown_request_funcs = []
+
+    def route(self, rule, methods=('GET',)):
+        def decorator(view):
+            self.rules.append(Rule(rule, methods, view))
+            return view
+        return decorator
+
+    def before_app_request(self, func):
+        self.before_request_funcs.append(func)
+        return func
+
+    def after_app_request(self, func):
+        self.after_request_funcs.append(func)
+        return func
+
+    def teardown_app_request(self, func):
+        self.teardown_request_funcs.append(func)
+        return func
+
+
+class _Args(dict):
+    """Query string (tek değerli); werkzeug MultiDict.get(type=) davranışıyla."""
+
+    def get(self, key, default=None, type=None):
+        if key not in self:
+            return default
+        value = self[key]
+        if type is not None:
+            try:
+                return type(value)
+            except (ValueError, TypeError):
+                return default
+        return value
+
+
+class _ETags:
+    def __init__(self, header):
+        self._star = False
+        self._tags = set()
+        for part in (header or '').split(','):
+            part = part.strip()
+            if part == '*':
+                self._star = True
+            elif part:
+                if part.startswith('W/'):
+                    part = part[2:]
+                self._tags.add(part.strip('"'))
+
+    def contains_weak(self, etag):
+        return self._star or etag in self._tags
+
+
+class JSONError(ValueError):
+    """İstek gövdesi JSON değil veya ayrıştırılamadı (Flask 400/415 karşılığı)."""
+
+
+class _Request:
+    def __init__(self, method, target, headers, body):
+        split = urllib.parse.urlsplit(target)
+        self.method = method
+        self.path = urllib.parse.unquote(split.path) or '/'
+        self.full_path = f"{split.path}?{split.query}"
+        self.args = _Args((k, v[0]) for k, v in
+                          urllib.parse.parse_qs(split.query, keep_blank_values=True).items())
+        self.headers = headers
+        self.content_type = headers.get('Content-Type')
+        self.if_none_match = _ETags(headers.get('If-None-Match'))
+        self.environ = {}
+        self.url_rule = None
+        self._body = body
+        self.stream = io.BytesIO(body)
+
+    def get_data(self):
+        return self._body
+
+    def get_json(self, silent=False):
+        mimetype = (self.content_type or '').split(';')[0].strip()
+        try:
+            if mimetype != 'application/json' and not mimetype.endswith('+json'):
+                raise JSONError('Content-Type must be application/json')
+            return json.loads(self._body.decode('utf-8'))
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+
+class _RequestProxy:
+    """Geçerli thread'in isteğine yönlendiren vekil (flask.request karşılığı)."""
+
+    def __init__(self, local):
+        object.__setattr__(self, '_local', local)
+
+    def __getattr__(self, name):
+        return getattr(self._local.request, name)
+
+
+_request_local = threading.local()
+request = _RequestProxy(_request_local)
+
+
+# werkzeug'un HTML hata sayfaları (Flask motoruyla aynı gövde)
+_ERROR_PAGES = {
+    404: ("Not Found", "The requested URL was not found on the server. If you entered the URL "
+                       "manually please check your spelling and try again."),
+    405: ("Method Not Allowed", "The method is not allowed for the requested URL."),
+    413: ("Request Entity Too Large", "The data value transmitted exceeds the capacity limit."),
+    500: ("Internal Server Error", "The server encountered an internal error and was unable to "
+                                   "complete your request. Either the server is overloaded or "
+                                   "there is an error in the application."),
+}
+
+# flask_cors varsayılanları
+CORS_ALLOW_METHODS = 'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'
+
+
+def _error_response(status):
+    title, description = _ERROR_PAGES[status]
+    body = (f"<!doctype html>\n<html lang=en>\n<title>{status} {title}</title>\n"
+            f"<h1>{title}</h1>\n<p>{description}</p>\n")
+    return Response(body, status=status)
+
+
+class Application:
+    """Blueprint'i çalıştırır; flask_cors'un varsayılanı gibi her cevaba CORS ekler
+    (Origin varsa yansıtılır, yoksa '*')."""
+
+    def __init__(self, blueprint):
+        self.blueprint = blueprint
+
+    def _match(self, path, method):
+        allowed = set()
+        for rule in self.blueprint.rules:
+            kwargs = rule.match(path)
+            if kwargs is None:
+                continue
+            if method in rule.methods:
+                return rule, kwargs, None
+            allowed |= rule.methods
+        return None, None, allowed
+
+    def _make_response(self, value):
+        status = None
+        if isinstance(value, tuple):
+            value, status = value
+        if not isinstance(value, Response):
+            value = jsonify(value)
+        if status is not None:
+            value.status_code = status
+        return value
+
+    def handle(self, req):
+        """İsteği işler ve Response döndürür (kancalar dahil)."""
+        _request_local.request = req
+        error = None
+        try:
+            rule, kwargs, allowed = self._match(req.path, req.method)
+            req.url_rule = rule
+
+            if rule is None and req.method == 'OPTIONS' and allowed:
+                # CORS preflight / otomatik OPTIONS cevabı
+                response = Response(status=200)
+                response.headers['Allow'] = ', '.join(sorted(allowed | {'OPTIONS'}))
+                if 'Access-Control-Request-Method' in req.headers:
+                    response.headers['Access-Control-Allow-Methods'] = CORS_ALLOW_METHODS
+                    requested = req.headers.get('Access-Control-Request-Headers')
+                    if requested:
+                        response.headers['Access-Control-Allow-Headers'] = requested
+            else:
+                response = None
+                for func in self.blueprint.before_request_funcs:
+                    value = func()
+                    if value is not None:
+                        response = self._make_response(value)
+                        break
+                if response is None:
+                    if rule is None and allowed:
+                        response = _error_response(405)
+                        response.headers['Allow'] = ', '.join(sorted(allowed | {'OPTIONS'}))
+                    elif rule is None:
+                        response = _error_response(404)
+                    else:
+                        try:
+                            response = self._make_response(rule.view(**kwargs))
+                        except Exception:
+                            logger.exception("Unhandled error in %s %s", req.method, req.path)
+                            response = _error_response(500)
+                # Flask gibi ters kayıt sırasıyla
+                for func in reversed(self.blueprint.after_request_funcs):
+                    response = func(response)
+
+            origin = req.headers.get('Origin')
+            response.headers['Access-Control-Allow-Origin'] = origin or '*'
+            if origin:
+                response.headers['Vary'] = 'Origin'
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Flask gibi her durumda, ters kayıt sırasıyla
+            for func in reversed(self.blueprint.teardown_request_funcs):
+                try:
+                    func(error)
+                except Exception:
+                    logger.exception("Error in teardown of %s %s", req.method, req.path)
+            _request_local.request = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def version_string(self):
+        return 'PauseTime'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            total = 0
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    # Trailer başlıkları boş satıra kadar
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                total += size
+                if total > MAX_BODY_BYTES:
+                    raise ValueError('body too large')
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError('body too large')
+        return self.rfile.read(length) if length else b''
+
+    def _dispatch(self):
+        try:
+            body = self._read_body()
+        except ValueError:
+            self.close_connection = True
+            self._send(_error_response(413))
+            return
+        req = _Request(self.command, self.path, self.headers, body)
+        self._send(self.server.application.handle(req))
+
+    def _send(self, response):
+        try:
+            self.send_response(response.status_code)
+            for key, value in response.headers.items():
+                self.send_header(key, value)
+            no_body = self.command == 'HEAD' or response.status_code in (204, 304)
+            if not response.is_streamed:
+                if response.status_code != 304:
+                    self.send_header('Content-Length', str(len(response.response)))
+                self.end_headers()
+                if not no_body:
+                    self.wfile.write(response.response)
+                return
+            if no_body:
+                self.end_headers()
+                return
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in response.response:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            response.close()
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = do_HEAD = _dispatch
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+
+def serve(application, sockets):
+    """Uygulamayı önceden dinlemeye alınmış socket üzerinde sunar.
+
+    Bağlantı başına bir thread açılır; stream aboneleri app.py'de sınırlıdır.
+    """
+    sock = sockets[0]
+    server = _Server(sock.getsockname()[:2], _Handler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.server_address = sock.getsockname()[:2]
+    server.application = application
+    server.serve_forever(poll_interval=POLL_INTERVAL_SECONDS)
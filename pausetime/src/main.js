@@ -882,13 +882,73 @@ function initEvents() {
   initSettingsEvents()
 }
 
-// Polling başlat (5 saniyede bir)
+// State stream (SSE) — backend state değiştiğinde push eder.
+// Stream kurulamazsa 5 saniyelik polling'e düşülür ve stream periyodik olarak yeniden denenir.
+const STATE_POLL_INTERVAL = 5000
+const PRAYER_POLL_INTERVAL = 60000
+const STREAM_RETRY_INTERVAL = 30000
+
+let stateStream = null
+let statePollTimer = null
+let prayerPollTimer = null
+
+function startStatePolling() {
+  if (statePollTimer) return
+  fetchState()
+  statePollTimer = setInterval(fetchState, STATE_POLL_INTERVAL)
+  prayerPollTimer = setInterval(fetchPrayerTimes, PRAYER_POLL_INTERVAL)
+}
+
+function stopStatePolling() {
+  if (!statePollTimer) return
+  clearInterval(statePollTimer)
+  clearInterval(prayerPollTimer)
+  statePollTimer = null
+  prayerPollTimer = null
+}
+
+function startStateStream() {
+  if (stateStream) return
+  if (typeof EventSource === 'undefined') {
+    startStatePolling()
+    return
+  }
+
+  stateStream = new EventSource(`${API_BASE}/state/stream`)
+
+  stateStream.addEventListener('state', (event) => {
+    stopStatePolling()
+    const data = JSON.parse(event.data)
+    // Zamanlama sayıları değiştiyse listeyi yenile
+    if (data.schedules_active !== lastState.schedules_active || data.schedules_total !== lastState.schedules_total) {
+      fetchSchedules()
+    }
+    // Sıradaki vakit değiştiyse (ör. Yatsı sonrası yarının vakitleri) timeline'ı yenile
+    if (data.vakit !== lastState.vakit) {
+      fetchPrayerTimes()
+    }
+    applyState(data)
+  })
+
+  stateStream.addEventListener('prayer-times', () => fetchPrayerTimes())
+
+  stateStream.onerror = () => {
+    // EventSource geçici hatalarda kendisi yeniden bağlanır; kapandıysa polling'e düş
+    if (stateStream && stateStream.readyState === EventSource.CLOSED) {
+      stateStream = null
+      updateConnectionBadge(false)
+      startStatePolling()
+      setTimeout(startStateStream, STREAM_RETRY_INTERVAL)
+    }
+  }
+}
+
+// Stream + yedek polling başlat
 function startPolling() {
   fetchState()
   fetchPrayerTimes()
   fetchSchedules()
-  setInterval(fetchState, 5000)
-  setInterval(fetchPrayerTimes, 60000) // Vakit saatleri dakikada bir
+  startStateStream()
   setInterval(fetchSchedules, 10000)   // Zamanlamalar 10 saniyede bir
 }
 
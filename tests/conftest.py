@@ -0,0 +1,47 @@
+"""
+Testler app'i süreç içinde import eder. Veri dizini import'tan önce geçici bir
+dizine yönlendirilir; her test kendi zamanlama dosyalarını ve boş bir
+zamanlama listesiyle başlar.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="pausetime-tests-")
+sys.path.insert(0, ROOT_DIR)
+
+import app as pausetime  # noqa: E402
+
+_application = pausetime.create_app()
+
+
+@pytest.fixture
+def app():
+    return pausetime
+
+
+@pytest.fixture
+def client():
+    return _application.test_client()
+
+
+@pytest.fixture(autouse=True)
+def schedule_files(tmp_path, monkeypatch):
+    """Zamanlama dosyalarını teste özel dizine taşır ve listeyi boşaltır."""
+    base = str(tmp_path / "schedules.json")
+    monkeypatch.setattr(pausetime, "APP_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(pausetime, "SCHEDULES_FILE", base)
+    monkeypatch.setattr(pausetime, "SCHEDULES_BACKUP_FILE", base + ".bak")
+    monkeypatch.setattr(pausetime, "SCHEDULES_JOURNAL_FILE", base + ".journal")
+    monkeypatch.setattr(pausetime, "SCHEDULES_JOURNAL_BACKUP_FILE", base + ".journal.bak")
+    monkeypatch.setattr(pausetime, "SCHEDULES_JOURNAL_COMPACTING_FILE",
+                        base + ".journal.compacting")
+    with pausetime._write_lock:
+        pausetime._publish(**pausetime._schedule_fields(
+            [], 1, pausetime._snapshot.schedules_revision))
+    yield base
+    if pausetime._compact_thread is not None:
+        pausetime._compact_thread.join(5)
@@ -0,0 +1,73 @@
+import pytest
+
+
+@pytest.fixture
+def district_table(app, tmp_path, monkeypatch):
+    """Geçici bir ilçe tablosu yükler; index bir sonraki aramada yeniden kurulur."""
+    def load(rows):
+        path = tmp_path / "districts.tsv"
+        path.write_text("# il\tilçe\tid\n" + "".join("\t".join(row) + "\n" for row in rows),
+                        encoding="utf-8")
+        monkeypatch.setattr(app, "DISTRICTS_FILE", str(path))
+        monkeypatch.setattr(app, "_district_index", None)
+    monkeypatch.setattr(app, "_district_index", None)
+    return load
+
+
+def _names(results):
+    return [name for _id, name, _city, _center in results]
+
+
+def test_province_search_folds_turkish_letters(app, district_table):
+    district_table([])
+
+    assert _names(app.search_districts("istan")) == ["İstanbul"]
+    assert _names(app.search_districts("IĞDIR")) == ["Iğdır"]
+    assert _names(app.search_districts("canak")) == ["Çanakkale"]
+    assert app.search_districts("") == []
+    assert len(app.search_districts("k", limit=3)) == 3
+
+
+def test_without_a_table_only_province_centres_resolve(app, district_table):
+    district_table([])
+
+    assert app._resolve_district("izmir") == (app.DIYANET_DISTRICT_IDS["IZMIR"], "IZMIR")
+    assert app._resolve_district("Bornova") is None
+
+
+def test_loaded_table_adds_districts_after_province_centres(app, district_table):
+    district_table([("IZMIR", "Bornova", "90001"), ("ISTANBUL", "Merkez", "90002"),
+                    ("ANKARA", "Merkez", "90003"), ("BOLU", "Bolu", "90004")])
+
+    results = app.search_districts("bo")
+    assert _names(results) == ["Bolu", "Bolu", "Bornova"]
+    assert [center for *_rest, center in results] == [True, False, False]
+    assert app._resolve_district("bornova") == ("90001", "IZMIR")
+    assert app._resolve_district("90002") == ("90002", "ISTANBUL")
+    # Aynı adlı ilçeler yalnızca il ile birlikte çözülür
+    assert app._resolve_district("merkez") is None
+    assert app._resolve_district("ankara merkez") == ("90003", "ANKARA")
+
+
+def test_districts_endpoint(client, district_table):
+    district_table([("IZMIR", "Bornova", "90001")])
+
+    body = client.get("/api/districts?q=born").get_json()
+    assert body["results"] == [{"id": "90001", "name": "Bornova", "city": "IZMIR",
+                                "province": "İzmir", "center": False}]
+    assert client.get("/api/districts?q=a&limit=0").status_code == 400
+
+
+def test_district_setting_moves_city_and_resets_on_city_change(app, client, district_table):
+    district_table([("IZMIR", "Bornova", "90001")])
+    try:
+        client.put("/settings", json={"district": "Bornova"})
+        assert app._default_location() == ("90001", "IZMIR")
+
+        client.put("/settings", json={"city": "ANKARA"})
+        assert app._default_location() == (app.DIYANET_DISTRICT_IDS["ANKARA"], "ANKARA")
+
+        response = client.put("/settings", json={"district": "Atlantis"})
+        assert response.status_code == 400
+    finally:
+        client.put("/settings", json={"city": "ISTANBUL"})
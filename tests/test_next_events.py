@@ -0,0 +1,49 @@
+from datetime import datetime
+
+
+def _monday_midnight(app):
+    return app._tz().localize(datetime(2025, 1, 6))
+
+
+def test_overlapping_schedules_form_one_window_with_both_causes(app, client):
+    created = client.post("/api/schedules/batch", json={"create": [
+        {"pause_time": "00:30", "resume_time": "01:00", "days": [0]},
+        {"pause_time": "00:45", "resume_time": "01:30", "days": [0]},
+    ]}).get_json()["created"]
+    first, second = (s["id"] for s in created)
+
+    muted, events = app.next_events(_monday_midnight(app), 2, "9541", "ISTANBUL")
+
+    assert muted is False
+    assert [action for _ts, action, _cause in events] == ["mute", "unmute"]
+    assert events[1][0] - events[0][0] == 60 * 60
+    assert (events[0][2]["id"], events[1][2]["id"]) == (first, second)
+
+
+def test_schedule_window_repeats_weekly(app, client):
+    client.post("/api/schedules", json={"pause_time": "00:30", "resume_time": "01:00",
+                                        "days": [2]})
+
+    _muted, events = app.next_events(_monday_midnight(app), 100, "9541", "ISTANBUL")
+
+    schedule_mutes = [ts for ts, action, cause in events
+                      if action == "mute" and cause["type"] == "schedule"]
+    assert len(schedule_mutes) >= 2
+    assert schedule_mutes[1] - schedule_mutes[0] == 7 * 86400
+
+
+def test_always_muted_stops_widening_the_horizon(app, client, monkeypatch):
+    client.post("/api/schedules", json={"pause_time": "00:00", "resume_time": None, "days": []})
+    horizons = []
+    mute_windows = app._mute_windows
+
+    def counting(start, end_ts, *args):
+        horizons.append(end_ts)
+        return mute_windows(start, end_ts, *args)
+
+    monkeypatch.setattr(app, "_mute_windows", counting)
+    muted, events = app.next_events(_monday_midnight(app), 5, "9541", "ISTANBUL")
+
+    assert muted is True
+    assert events == []
+    assert (horizons[-1] - horizons[0]) // 86400 < 30
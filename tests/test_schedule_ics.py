@@ -0,0 +1,73 @@
+FOREIGN_UTC_EVENT = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "BEGIN:VEVENT",
+    "UID:standup@example.com",
+    # Pazartesi 22:00 UTC = Salı 01:00 İstanbul
+    "DTSTART:20240101T220000Z",
+    "DTEND:20240101T233000Z",
+    "RRULE:FREQ=WEEKLY;BYDAY=MO,WE",
+    "SUMMARY:Gece nöbeti",
+    "END:VEVENT",
+    "END:VCALENDAR",
+    "",
+])
+
+
+def _import_ics(client, body, mode="replace"):
+    return client.post(f"/api/schedules/import?format=ics&mode={mode}",
+                       data=body.encode("utf-8"), content_type="text/calendar")
+
+
+def _export_ics(client):
+    return client.get("/api/schedules/export?format=ics").get_data(as_text=True)
+
+
+def _fields(schedule):
+    return {k: schedule[k] for k in ("pause_time", "resume_time", "days", "label", "enabled")}
+
+
+def _without_pausetime_fields(ics):
+    return "".join(line for line in ics.splitlines(keepends=True)
+                   if not line.startswith("X-PAUSETIME-"))
+
+
+def test_utc_event_across_midnight_shifts_byday(app, client):
+    response = _import_ics(client, FOREIGN_UTC_EVENT)
+
+    assert response.get_json()["imported"] == 1
+    assert _fields(app._snapshot.schedules[0]) == {
+        "pause_time": "01:00", "resume_time": "02:30", "days": [1, 3],
+        "label": "Gece nöbeti", "enabled": True,
+    }
+
+
+def test_ics_round_trip_keeps_shifted_days(app, client):
+    _import_ics(client, FOREIGN_UTC_EVENT)
+    original = _fields(app._snapshot.schedules[0])
+
+    exported = _export_ics(client)
+    assert "RRULE:FREQ=WEEKLY;BYDAY=TU,TH" in exported
+    assert "DTSTART;TZID=Europe/Istanbul:20240102T010000" in exported
+
+    _import_ics(client, exported)
+    assert _fields(app._snapshot.schedules[0]) == original
+
+    # Yalnızca standart alanları okuyan bir takvim de aynı zamanlamayı görür
+    _import_ics(client, _without_pausetime_fields(exported))
+    assert _fields(app._snapshot.schedules[0]) == original
+
+
+def test_ics_round_trip_of_overnight_and_open_ended_schedules(app, client):
+    client.post("/api/schedules/batch", json={"create": [
+        {"pause_time": "23:00", "resume_time": "06:00", "days": [6], "label": "Gece"},
+        {"pause_time": "21:30", "resume_time": None, "days": [], "enabled": False},
+    ]})
+    original = [_fields(s) for s in app._snapshot.schedules]
+    exported = _export_ics(client)
+
+    _import_ics(client, exported)
+    assert [_fields(s) for s in app._snapshot.schedules] == original
+
+    _import_ics(client, _without_pausetime_fields(exported))
+    assert [_fields(s) for s in app._snapshot.schedules] == original
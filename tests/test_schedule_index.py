@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+MIXED_SCHEDULES = [
+    {"pause_time": "09:00", "resume_time": "10:30", "days": [0, 2, 4]},
+    {"pause_time": "23:00", "resume_time": "06:00", "days": [6]},
+    {"pause_time": "22:15", "resume_time": None, "days": []},
+    {"pause_time": "12:00", "resume_time": "12:00", "days": [1]},
+    {"pause_time": "07:00", "resume_time": "08:00", "days": [3], "enabled": False},
+]
+
+
+def _assert_index_matches_rebuild(app):
+    snap = app._snapshot
+    index, intervals = app._build_schedule_index(snap.schedules)
+    assert snap.index == index
+    assert snap.intervals == intervals
+
+
+@pytest.mark.parametrize("threshold", [0, 1000], ids=["diff-array", "per-minute"])
+def test_incremental_index_matches_rebuild_after_mixed_batch(app, client, monkeypatch, threshold):
+    monkeypatch.setattr(app, "SCHEDULE_INDEX_DIFF_THRESHOLD", threshold)
+    created = client.post("/api/schedules/batch", json={"create": MIXED_SCHEDULES}).get_json()
+    ids = [s["id"] for s in created["created"]]
+    _assert_index_matches_rebuild(app)
+
+    response = client.post("/api/schedules/batch", json={
+        "create": [{"pause_time": "05:00", "resume_time": "05:30", "days": [5, 6]}],
+        "update": [
+            {"id": ids[0], "resume_time": "11:00", "days": [0, 1]},
+            {"id": ids[4], "enabled": True},
+            {"id": ids[2], "enabled": False},
+        ],
+        "delete": [ids[1]],
+    })
+
+    assert response.status_code == 200
+    assert len(app._snapshot.schedules) == 5
+    _assert_index_matches_rebuild(app)
+
+
+def _ndjson(schedules):
+    return "\n".join(json.dumps(s) for s in schedules)
+
+
+def test_import_replace_drops_existing_schedules(app, client):
+    existing = client.post("/api/schedules/batch", json={"create": MIXED_SCHEDULES[:2]}).get_json()
+    old_ids = {s["id"] for s in existing["created"]}
+
+    response = client.post("/api/schedules/import?format=ndjson&mode=replace",
+                           data=_ndjson(MIXED_SCHEDULES[2:]),
+                           content_type="application/x-ndjson")
+
+    assert response.get_json() == {"success": True, "imported": 3, "deleted": 2}
+    schedules = app._snapshot.schedules
+    assert [s["pause_time"] for s in schedules] == ["22:15", "12:00", "07:00"]
+    # Yeni kayıtlar silinen id'leri yeniden kullanmaz
+    assert not old_ids & {s["id"] for s in schedules}
+    assert min(s["id"] for s in schedules) > max(old_ids)
+    _assert_index_matches_rebuild(app)
+
+
+def test_import_append_keeps_existing_schedules(app, client):
+    client.post("/api/schedules/batch", json={"create": MIXED_SCHEDULES[:2]})
+
+    response = client.post("/api/schedules/import?format=ndjson&mode=append",
+                           data=_ndjson(MIXED_SCHEDULES[2:]),
+                           content_type="application/x-ndjson")
+
+    assert response.get_json() == {"success": True, "imported": 3, "deleted": 0}
+    assert len(app._snapshot.schedules) == 5
+    _assert_index_matches_rebuild(app)
+
+
+def test_import_replace_with_invalid_line_changes_nothing(app, client):
+    client.post("/api/schedules/batch", json={"create": MIXED_SCHEDULES[:2]})
+    before = app._snapshot.schedules
+
+    response = client.post("/api/schedules/import?format=ndjson&mode=replace",
+                           data=_ndjson([MIXED_SCHEDULES[2], {"pause_time": "25:00"}]),
+                           content_type="application/x-ndjson")
+
+    assert response.status_code == 400
+    assert app._snapshot.schedules == before
+
+
+def _naive_active(schedule, weekday, minute):
+    """Zamanlama kuralının index'ten bağımsız, doğrudan okunuşu."""
+    if not schedule.get("enabled", True):
+        return False
+    if schedule["days"] and weekday not in schedule["days"]:
+        return False
+    hours, minutes = map(int, schedule["pause_time"].split(":"))
+    pause = hours * 60 + minutes
+    if not schedule["resume_time"]:
+        return minute >= pause
+    hours, minutes = map(int, schedule["resume_time"].split(":"))
+    resume = hours * 60 + minutes
+    if pause <= resume:
+        return pause <= minute < resume
+    # Gece yarısını geçen pencere aynı günün sabahını da kapsar
+    return minute >= pause or minute < resume
+
+
+def test_index_counts_match_schedule_rules(app, client):
+    client.post("/api/schedules/batch", json={"create": MIXED_SCHEDULES})
+    client.post("/api/schedules", json={"pause_time": "09:30", "resume_time": "09:45",
+                                        "days": [0]})
+    snap = app._snapshot
+
+    for week_minute in range(0, app.WEEK_MINUTES, 5):
+        weekday, minute = divmod(week_minute, app.DAY_MINUTES)
+        expected = sum(_naive_active(s, weekday, minute) for s in snap.schedules)
+        assert snap.index[week_minute] == expected, (weekday, minute)
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+
+
+def _schedule(schedule_id, pause_time="10:00", resume_time="11:00", days=(0,)):
+    return {"id": schedule_id, "pause_time": pause_time, "resume_time": resume_time,
+            "days": list(days), "label": "", "enabled": True}
+
+
+def _write_snapshot(path, schedules, next_id):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"schedules": schedules, "next_id": next_id}, f)
+
+
+def _write_journal(path, records, torn_tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write(torn_tail)
+
+
+def _put(schedule, next_id):
+    return {"op": "put", "schedule": schedule, "next_id": next_id}
+
+
+def test_replay_applies_journal_and_skips_torn_tail(app, schedule_files):
+    _write_snapshot(schedule_files, [_schedule(1), _schedule(2)], 3)
+    _write_journal(app.SCHEDULES_JOURNAL_FILE, [
+        _put(_schedule(3), 4),
+        _put(_schedule(1, pause_time="12:00"), 4),
+        {"op": "delete", "id": 2, "next_id": 4},
+    ], torn_tail='{"op": "put", "schedule": {"id": 4, "pause')
+
+    schedules, next_id, applied = app._load_schedules()
+
+    assert applied == 3
+    assert next_id == 4
+    assert {s["id"]: s["pause_time"] for s in schedules} == {1: "12:00", 3: "10:00"}
+
+
+def test_replay_is_idempotent_over_a_newer_snapshot(app, schedule_files):
+    # Sıkıştırma snapshot'ı yazdıktan sonra, günlük döndürülmeden kesildi
+    _write_snapshot(schedule_files, [_schedule(1, pause_time="12:00")], 2)
+    _write_journal(app.SCHEDULES_JOURNAL_FILE, [
+        _put(_schedule(1), 2),
+        _put(_schedule(1, pause_time="12:00"), 2),
+    ])
+
+    schedules, next_id, _applied = app._load_schedules()
+
+    assert [s["pause_time"] for s in schedules] == ["12:00"]
+    assert next_id == 2
+
+
+def test_corrupt_snapshot_falls_back_to_backup_and_previous_journal(app, schedule_files):
+    with open(schedule_files, "w", encoding="utf-8") as f:
+        f.write('{"schedules": [')
+    _write_snapshot(app.SCHEDULES_BACKUP_FILE, [_schedule(1)], 2)
+    _write_journal(app.SCHEDULES_JOURNAL_BACKUP_FILE, [_put(_schedule(2), 3)])
+    _write_journal(app.SCHEDULES_JOURNAL_COMPACTING_FILE, [_put(_schedule(3), 4)])
+    _write_journal(app.SCHEDULES_JOURNAL_FILE, [{"op": "delete", "id": 1, "next_id": 4}])
+
+    schedules, next_id, applied = app._load_schedules()
+
+    assert [s["id"] for s in schedules] == [2, 3]
+    assert next_id == 4
+    assert applied == 3
+
+
+def test_journal_backup_is_ignored_when_snapshot_is_intact(app, schedule_files):
+    _write_snapshot(schedule_files, [_schedule(1)], 2)
+    _write_journal(app.SCHEDULES_JOURNAL_BACKUP_FILE, [{"op": "delete", "id": 1, "next_id": 2}])
+
+    schedules, _next_id, applied = app._load_schedules()
+
+    assert [s["id"] for s in schedules] == [1]
+    assert applied == 0
+
+
+def test_compaction_does_not_delay_journal_commits(app, schedule_files, monkeypatch):
+    release = threading.Event()
+
+    def slow_save(snap=None):
+        release.wait(10)
+        return True
+
+    monkeypatch.setattr(app, "_save_schedules", slow_save)
+    monkeypatch.setattr(app, "SCHEDULES_COMPACT_THRESHOLD", 1)
+    monkeypatch.setattr(app, "_compact_thread", None)
+
+    first = app._journal_enqueue([_put(_schedule(1), 2)])
+    assert first.wait(5)
+    # Eşik aşıldı: günlük döndürülür, snapshot yazımı release'e kadar bekler
+    deadline = time.monotonic() + 5
+    while app._compact_thread is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    compact_thread = app._compact_thread
+    assert compact_thread is not None and compact_thread.is_alive()
+
+    second = app._journal_enqueue([_put(_schedule(2), 3)])
+    assert second.wait(5)
+    assert compact_thread.is_alive()
+
+    release.set()
+    compact_thread.join(5)
+    with open(app.SCHEDULES_JOURNAL_BACKUP_FILE, encoding="utf-8") as f:
+        assert [json.loads(line)["schedule"]["id"] for line in f] == [1]
+    with open(app.SCHEDULES_JOURNAL_FILE, encoding="utf-8") as f:
+        assert [json.loads(line)["schedule"]["id"] for line in f] == [2]